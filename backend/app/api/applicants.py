@@ -1,12 +1,17 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
 from typing import List, Optional
 from app.models.applicant import Applicant, ApplicantCreate, ApplicantUpdate, ApplicationStatus
+from app.services.ingest_service import IngestService
 from app.utils.supabase_client import get_supabase
+from app.utils.upload import UploadTooLargeError, spooled_upload
 from datetime import datetime
+import asyncio
 import uuid
 
 router = APIRouter()
 
+ingest_service = IngestService()
+
 @router.get("/", response_model=List[Applicant])
 async def get_applicants(
     status: Optional[ApplicationStatus] = None,
@@ -133,16 +138,17 @@ async def upload_resume(applicant_id: str, file: UploadFile = File(...)):
     try:
         supabase = get_supabase()
 
-        # ファイルを読み込み
-        contents = await file.read()
-
-        # Supabase Storageにアップロード
-        file_path = f"resumes/{applicant_id}/{file.filename}"
-        storage_response = supabase.storage.from_("applicant-documents").upload(
-            file_path,
-            contents,
-            {"content-type": file.content_type}
-        )
+        # ファイルを読み込み（大きいファイルは一時ファイルに書き出し、ファイルから送る）
+        async with spooled_upload(file) as upload:
+            # Supabase Storageにアップロード（同期クライアントなのでスレッドで実行）
+            file_path = f"resumes/{applicant_id}/{file.filename}"
+            with upload.open_payload() as payload:
+                storage_response = await asyncio.to_thread(
+                    supabase.storage.from_("applicant-documents").upload,
+                    file_path,
+                    payload,
+                    {"content-type": file.content_type}
+                )
 
         # 公開URLを取得
         public_url = supabase.storage.from_("applicant-documents").get_public_url(file_path)
@@ -158,5 +164,48 @@ async def upload_resume(applicant_id: str, file: UploadFile = File(...)):
             "url": public_url
         }
 
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/ingest")
+async def ingest_resume(
+    file: UploadFile = File(...),
+    skill_ratio: float = Form(0.2),
+    mindset_ratio: float = Form(0.8)
+):
+    """
+    履歴書（PDF / Word）から応募者を登録
+
+    テキスト抽出後、構造化・選考ステージ推奨・不足情報の抽出・AI評価を1回のLLM呼び出しで行い、
+    評価済みの応募者として保存する。AI評価できなかった場合は保存せず503を返す。
+    """
+    try:
+        async with spooled_upload(file) as upload:
+            result = await ingest_service.ingest_file(
+                upload.source,
+                file.filename or "",
+                file.content_type or "",
+                skill_ratio=skill_ratio,
+                mindset_ratio=mindset_ratio
+            )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    if result.evaluation.degraded:
+        raise HTTPException(status_code=503, detail=result.evaluation.summary)
+
+    try:
+        applicant_id = await ingest_service.save(result)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "message": "Resume ingested successfully",
+        **ingest_service.to_response(result, applicant_id)
+    }
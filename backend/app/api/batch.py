@@ -1,17 +1,21 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from typing import List, Dict, Any
-from app.services.ai_evaluation_service import AIEvaluationService
-from app.models.applicant import ApplicantData, ApplicationStatus
-from app.utils.supabase_client import get_supabase
-from datetime import datetime
-import csv
-import io
-import uuid
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional
+from app.services.batch_service import BatchService, aenumerate
+from app.services.batch_job_service import BatchJobManager
+from app.services.export_service import ExportService
+from app.services.resume_batch_service import ResumeBatchService, iter_resume_uploads
+from app.utils.csv_stream import iter_upload_rows
+from app.utils.upload import UploadTooLargeError
+import json
 from pydantic import BaseModel
 
 router = APIRouter()
 
-ai_service = AIEvaluationService()
+batch_service = BatchService()
+job_manager = BatchJobManager(batch_service)
+export_service = ExportService()
+resume_batch_service = ResumeBatchService()
 
 class BatchEvaluationResult(BaseModel):
     total_count: int
@@ -23,171 +27,249 @@ class BatchEvaluationResult(BaseModel):
 async def batch_process_applicants(
     file: UploadFile = File(...),
     skill_ratio: float = 0.2,
-    mindset_ratio: float = 0.8
+    mindset_ratio: float = 0.8,
+    concurrency: Optional[int] = Query(None, ge=1, le=50),
+    encoding: Optional[str] = None,
+    packed: Optional[bool] = None
 ):
     """
     CSVから複数の応募者を一括処理
 
     CSVフォーマット:
     name, email, phone, education, work_experience, technical_skills, motivation, career_goals
+
+    concurrency: 同時に評価する行数（未指定時はBATCH_CONCURRENCY）
+    encoding: CSVの文字コード（未指定時はUTF-8 / Shift_JIS(CP932)を自動判定）
+    packed: 複数人を1リクエストでまとめて評価するか（未指定時はBATCH_PACKED_EVALUATION）
     """
     try:
-        # CSVファイルを読み込み
-        contents = await file.read()
-        csv_text = contents.decode("utf-8")
-        csv_reader = csv.DictReader(io.StringIO(csv_text))
-
-        supabase = get_supabase()
+        # CSVは読み込みながら評価に回す
+        results = await batch_service.process_rows(
+            iter_upload_rows(file, encoding=encoding),
+            skill_ratio=skill_ratio,
+            mindset_ratio=mindset_ratio,
+            concurrency=concurrency,
+            packed=packed
+        )
 
-        results = []
-        success_count = 0
-        error_count = 0
-
-        for row in csv_reader:
-            try:
-                # ApplicantDataオブジェクトを作成
-                applicant_data = _csv_row_to_applicant_data(row)
-
-                # AI評価実行
-                evaluation = await ai_service.evaluate_applicant(
-                    applicant_data,
-                    skill_ratio=skill_ratio,
-                    mindset_ratio=mindset_ratio
-                )
-
-                # DBに保存
-                applicant_id = str(uuid.uuid4())
-                applicant_record = {
-                    "id": applicant_id,
-                    "created_at": datetime.utcnow().isoformat(),
-                    "updated_at": datetime.utcnow().isoformat(),
-                    "name": applicant_data.name,
-                    "email": applicant_data.email,
-                    "phone": applicant_data.phone,
-                    "applicant_data": applicant_data.model_dump(),
-                    "evaluation": evaluation.model_dump(),
-                    "status": ApplicationStatus.SCREENING.value
-                }
-
-                response = supabase.table("applicants").insert(applicant_record).execute()
-
-                results.append({
-                    "name": applicant_data.name,
-                    "email": applicant_data.email,
-                    "status": "success",
-                    "applicant_id": applicant_id,
-                    "total_score": evaluation.total_score
-                })
-
-                success_count += 1
-
-            except Exception as e:
-                results.append({
-                    "name": row.get("name", "Unknown"),
-                    "email": row.get("email", "Unknown"),
-                    "status": "error",
-                    "error": str(e)
-                })
-                error_count += 1
+        success_count = sum(1 for r in results if r["status"] == "success")
 
         return BatchEvaluationResult(
             total_count=len(results),
             success_count=success_count,
-            error_count=error_count,
+            error_count=len(results) - success_count,
             results=results
         )
 
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/export-results")
-async def export_evaluation_results(
-    status: str = None,
-    min_score: float = None
+@router.post("/upload-csv/stream")
+async def batch_process_applicants_stream(
+    file: UploadFile = File(...),
+    skill_ratio: float = 0.2,
+    mindset_ratio: float = 0.8,
+    concurrency: Optional[int] = Query(None, ge=1, le=50),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$"),
+    encoding: Optional[str] = None,
+    packed: Optional[bool] = None
 ):
     """
-    評価結果をエクスポート（CSV形式）
+    CSVの一括処理結果を1行ずつストリーミングで返す
 
-    Args:
-        status: フィルタするステータス（オプション）
-        min_score: 最小スコア（オプション）
+    各行の処理が終わった順に {"type": "result", "row_index", "status", "applicant_id", "total_score" | "error", ...}
+    を送り、最後に {"type": "summary", "total_count", "success_count", "error_count"} を送る。
+    CSVの読み込みに失敗した場合は {"type": "error", "error"} を送って終了する。
+
+    format:
+        ndjson: 1行1JSON（application/x-ndjson）
+        sse: Server-Sent Events（text/event-stream）
+    """
+    async def event_stream():
+        # 結果は送信したら破棄し、件数だけ数える
+        total_count = 0
+        success_count = 0
+
+        try:
+            async for row_index, result in batch_service.iter_results(
+                aenumerate(iter_upload_rows(file, encoding=encoding)),
+                skill_ratio=skill_ratio,
+                mindset_ratio=mindset_ratio,
+                concurrency=concurrency,
+                packed=packed
+            ):
+                total_count += 1
+                if result["status"] == "success":
+                    success_count += 1
+                yield _format_event("result", {"row_index": row_index, **result}, format)
+        except Exception as e:
+            yield _format_event("error", {"error": str(e)}, format)
+            return
+
+        yield _format_event("summary", {
+            "total_count": total_count,
+            "success_count": success_count,
+            "error_count": total_count - success_count
+        }, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        event_stream(),
+        media_type=media_type,
+        # プロキシでバッファリングされないようにする
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/ingest-resumes")
+async def batch_ingest_resumes(
+    files: List[UploadFile] = File(...),
+    skill_ratio: float = 0.2,
+    mindset_ratio: float = 0.8,
+    concurrency: Optional[int] = Query(None, ge=1, le=50),
+    extract_concurrency: Optional[int] = Query(None, ge=1, le=16),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$")
+):
+    """
+    履歴書（PDF / Word）またはそれをまとめたZIPから応募者を一括登録し、ファイルごとの結果をストリーミングで返す
+
+    各ファイルは 抽出 → 構造化・評価 → 保存 の順に処理され、完了した順に
+    {"type": "result", "file_index", "filename", "status"（success / error / skipped）, ...} を送る。
+    最後に {"type": "summary", "total_count", "success_count", "error_count", "skipped_count"} を送る。
+
+    concurrency: 同時に構造化・評価するファイル数（未指定時はBATCH_CONCURRENCY）
+    extract_concurrency: 同時にテキスト抽出するファイル数（未指定時はBULK_INGEST_EXTRACT_CONCURRENCY）
+    """
+    async def event_stream():
+        counts = {"success": 0, "error": 0, "skipped": 0}
+
+        try:
+            async for result in resume_batch_service.iter_results(
+                iter_resume_uploads(files),
+                skill_ratio=skill_ratio,
+                mindset_ratio=mindset_ratio,
+                concurrency=concurrency,
+                extract_concurrency=extract_concurrency
+            ):
+                counts[result["status"]] += 1
+                yield _format_event("result", result, format)
+        except Exception as e:
+            yield _format_event("error", {"error": str(e)}, format)
+            return
+
+        yield _format_event("summary", {
+            "total_count": sum(counts.values()),
+            "success_count": counts["success"],
+            "error_count": counts["error"],
+            "skipped_count": counts["skipped"]
+        }, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(
+        event_stream(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/jobs", status_code=202)
+async def create_batch_job(
+    file: UploadFile = File(...),
+    skill_ratio: float = 0.2,
+    mindset_ratio: float = 0.8,
+    concurrency: Optional[int] = Query(None, ge=1, le=50),
+    encoding: Optional[str] = None
+):
+    """
+    CSVの一括処理をバックグラウンドジョブとして登録
+
+    処理完了を待たずにジョブIDを返す。進捗は GET /jobs/{job_id} で確認する。
     """
     try:
-        supabase = get_supabase()
-
-        query = supabase.table("applicants").select("*")
-
-        if status:
-            query = query.eq("status", status)
-
-        response = query.execute()
-
-        # CSVデータを構築
-        csv_data = []
-        for applicant in response.data:
-            evaluation = applicant.get("evaluation")
-            if evaluation:
-                total_score = evaluation.get("total_score", 0)
-
-                # min_scoreフィルタ
-                if min_score and total_score < min_score:
-                    continue
-
-                csv_data.append({
-                    "ID": applicant["id"],
-                    "名前": applicant["name"],
-                    "メール": applicant["email"],
-                    "ステータス": applicant["status"],
-                    "総合スコア": total_score,
-                    "スキルスコア": evaluation.get("skill_score", 0),
-                    "マインドセットスコア": evaluation.get("mindset_score", 0),
-                    "評価サマリー": evaluation.get("summary", ""),
-                    "作成日時": applicant["created_at"]
-                })
-
-        return {
-            "count": len(csv_data),
-            "data": csv_data
-        }
+        job_id = await job_manager.submit(
+            iter_upload_rows(file, encoding=encoding),
+            skill_ratio=skill_ratio,
+            mindset_ratio=mindset_ratio,
+            concurrency=concurrency
+        )
 
+        return await job_manager.get_progress(job_id)
+
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# ヘルパー関数
-def _csv_row_to_applicant_data(row: Dict[str, str]) -> ApplicantData:
-    """CSV行をApplicantDataオブジェクトに変換"""
+@router.get("/jobs/{job_id}")
+async def get_batch_job(job_id: str):
+    """ジョブの進捗（処理済み/成功/エラー件数、推定残り時間）を取得"""
+    progress = await job_manager.get_progress(job_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return progress
 
-    # カンマ区切りのリストを配列に変換
-    technical_skills = [s.strip() for s in row.get("technical_skills", "").split(",") if s.strip()]
-    soft_skills = [s.strip() for s in row.get("soft_skills", "").split(",") if s.strip()]
+@router.get("/jobs/{job_id}/results")
+async def get_batch_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """処理済みの行の結果を取得（ジョブ実行中でも途中結果を返す）"""
+    progress = await job_manager.get_progress(job_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Job not found")
 
-    # 学歴・職歴はJSON形式またはテキスト形式で受け取る想定
-    education = []
-    if row.get("education"):
-        try:
-            import json
-            education = json.loads(row["education"])
-        except:
-            education = [{"institution": row["education"]}]
+    return {
+        **progress,
+        "results": await job_manager.get_results(job_id, offset=offset, limit=limit)
+    }
 
-    work_experience = []
-    if row.get("work_experience"):
-        try:
-            import json
-            work_experience = json.loads(row["work_experience"])
-        except:
-            work_experience = [{"company": row["work_experience"]}]
-
-    return ApplicantData(
-        name=row.get("name", ""),
-        email=row.get("email", ""),
-        phone=row.get("phone"),
-        education=education,
-        work_experience=work_experience,
-        technical_skills=technical_skills,
-        soft_skills=soft_skills,
-        certifications=[],
-        motivation=row.get("motivation", ""),
-        career_goals=row.get("career_goals", ""),
-        additional_info=row.get("additional_info", "")
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_batch_job(job_id: str):
+    """実行中のジョブをキャンセル"""
+    progress = await job_manager.get_progress(job_id)
+    if not progress:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if not await job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job is already {progress['status']}")
+
+    return await job_manager.get_progress(job_id)
+
+@router.get("/export-results")
+async def export_evaluation_results(
+    status: str = None,
+    min_score: float = None,
+    format: str = Query("csv", pattern="^(csv|xlsx)$")
+):
+    """
+    評価結果をエクスポート（CSV / XLSX をストリーミングで返す）
+
+    Args:
+        status: フィルタするステータス（オプション）
+        min_score: 最小スコア（オプション）
+        format: csv（UTF-8 BOM付き）または xlsx
+    """
+    # 行の取得と出力はページ単位で行い、全件をメモリに載せない
+    # （同期ジェネレータなのでStreamingResponseがスレッドプールで実行する）
+    rows = export_service.iter_rows(status=status, min_score=min_score)
+
+    if format == "xlsx":
+        return StreamingResponse(
+            export_service.iter_xlsx(rows),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={"Content-Disposition": 'attachment; filename="evaluation_results.xlsx"'}
+        )
+
+    return StreamingResponse(
+        export_service.iter_csv(rows),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="evaluation_results.csv"'}
     )
+
+# ヘルパー関数
+def _format_event(event_type: str, payload: Dict[str, Any], format: str) -> str:
+    """ストリーミング用に1イベントを整形"""
+    if format == "sse":
+        return f"event: {event_type}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    return json.dumps({"type": event_type, **payload}, ensure_ascii=False) + "\n"
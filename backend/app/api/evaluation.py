@@ -1,18 +1,27 @@
+import asyncio
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List
 import uuid
 from app.services.ocr_service import OCRService
 from app.services.ai_evaluation_service import AIEvaluationService
+from app.services.evaluation_cache import get_evaluation_cache
+from app.services.extraction_cache import get_extraction_cache
+from app.services.file_processor_service import APPLICANT_DATA_SCHEMA
+from app.services.reweight_service import ReweightService
 from app.models.applicant import ApplicantData, EvaluationResult
+from app.utils.json_response import json_generation_config, parse_model
+from app.utils.llm_client import LLMClient, get_llm_client
+from app.utils.prompt_budget import prepare_document_text
+from app.utils.single_flight import flight_key, get_single_flight
 from app.utils.supabase_client import get_supabase
 from datetime import datetime
-import json
 
 router = APIRouter()
 
 # ocr_service = OCRService()
-# ai_service = AIEvaluationService()
+ai_service = AIEvaluationService()
+reweight_service = ReweightService()
 
 class ExtractRequest(BaseModel):
     applicant_id: str
@@ -27,66 +36,151 @@ class RatioUpdateRequest(BaseModel):
     skill_ratio: float
     mindset_ratio: float
 
+@router.get("/cache/stats")
+async def get_evaluation_cache_stats():
+    """AI評価キャッシュのヒット/ミス件数などを取得"""
+    # SQLiteの集計はスレッドで行う
+    return await asyncio.to_thread(get_evaluation_cache().stats)
+
+@router.get("/extraction-cache/stats")
+async def get_extraction_cache_stats():
+    """ファイル抽出（OCR）キャッシュのヒット/ミス件数・保持サイズなどを取得"""
+    cache = get_extraction_cache()
+    return await asyncio.to_thread(cache.stats) if cache else {"enabled": False}
+
 @router.post("/extract-data")
 async def extract_applicant_data(request: ExtractRequest):
     raise HTTPException(status_code=503, detail="OCR service is temporarily disabled for local testing.")
 
 @router.post("/evaluate")
 async def evaluate_applicant(request: EvaluateRequest):
-    raise HTTPException(status_code=503, detail="AI evaluation service is temporarily disabled for local testing.")
     """
     応募者を評価
 
     1. applicant_dataを取得
     2. AI評価実行
     3. 評価結果をDBに保存
+
+    同じ応募者・同じ入力の評価が実行中の場合は、新たに評価せずその結果を待つ。
+    AI評価できなかった場合（degraded）は保存せず503を返す。
     """
-    # try:
-    #     supabase = get_supabase()
-    #
-    #     # 応募者データを取得
-    #     applicant_response = supabase.table("applicants").select("*").eq("id", request.applicant_id).execute()
-    #
-    #     if not applicant_response.data:
-    #         raise HTTPException(status_code=404, detail="Applicant not found")
-    #
-    #     applicant = applicant_response.data[0]
-    #
-    #     if not applicant.get("applicant_data"):
-    #         raise HTTPException(status_code=400, detail="Applicant data not extracted yet")
-    #
-    #     # ApplicantDataオブジェクトに変換
-    #     applicant_data = ApplicantData(**applicant["applicant_data"])
-    #
-    #     # AI評価実行
-    #     evaluation = await ai_service.evaluate_applicant(
-    #         applicant_data,
-    #         skill_ratio=request.skill_ratio,
-    #         mindset_ratio=request.mindset_ratio
-    #     )
-    #
-    #     # 評価結果を保存
-    #     update_data = {
-    #         "evaluation": evaluation.model_dump(),
-    #         "updated_at": datetime.utcnow().isoformat(),
-    #         "status": "screening"  # ステータスを「審査中」に更新
-    #     }
-    #
-    #     response = supabase.table("applicants").update(update_data).eq("id", request.applicant_id).execute()
-    #
-    #     return {
-    #         "message": "Evaluation completed successfully",
-    #         "evaluation": evaluation
-    #     }
-    #
-    # except HTTPException:
-    #     raise
-    # except Exception as e:
-    #     raise HTTPException(status_code=500, detail=str(e))
+    try:
+        supabase = get_supabase()
+
+        # 応募者データを取得
+        applicant_response = supabase.table("applicants").select("*").eq("id", request.applicant_id).execute()
+
+        if not applicant_response.data:
+            raise HTTPException(status_code=404, detail="Applicant not found")
+
+        applicant = applicant_response.data[0]
+
+        if not applicant.get("applicant_data"):
+            raise HTTPException(status_code=400, detail="Applicant data not extracted yet")
+
+        # ApplicantDataオブジェクトに変換
+        applicant_data = ApplicantData(**applicant["applicant_data"])
+
+        # AI評価実行・保存（同時に来た同じ依頼は1回にまとめる）
+        key = flight_key("evaluate", request.applicant_id, applicant_data, request.skill_ratio, request.mindset_ratio)
+        evaluation = await get_single_flight().do(
+            key,
+            lambda: _evaluate_and_save(request.applicant_id, applicant_data, request.skill_ratio, request.mindset_ratio)
+        )
+
+        if evaluation.degraded:
+            raise HTTPException(status_code=503, detail=evaluation.summary)
+
+        return {
+            "message": "Evaluation completed successfully",
+            "evaluation": evaluation
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _evaluate_and_save(
+    applicant_id: str,
+    applicant_data: ApplicantData,
+    skill_ratio: Optional[float],
+    mindset_ratio: Optional[float]
+) -> EvaluationResult:
+    evaluation = await ai_service.evaluate_applicant(
+        applicant_data,
+        skill_ratio=skill_ratio,
+        mindset_ratio=mindset_ratio
+    )
+    if evaluation.degraded:
+        return evaluation
+
+    # 評価結果を保存
+    update_data = {
+        "evaluation": evaluation.model_dump(),
+        "updated_at": datetime.utcnow().isoformat(),
+        "status": "screening"  # ステータスを「審査中」に更新
+    }
+    supabase = get_supabase()
+    await asyncio.to_thread(supabase.table("applicants").update(update_data).eq("id", applicant_id).execute)
+    return evaluation
 
 @router.post("/{applicant_id}/update-ratio")
 async def update_evaluation_ratio(applicant_id: str, request: RatioUpdateRequest):
-    raise HTTPException(status_code=503, detail="AI re-evaluation service is temporarily disabled for local testing.")
+    """
+    評価比率を変更して総合スコアを再計算
+
+    保存済みのskill_score / mindset_scoreから計算するため、AIは再実行しない。
+    """
+    _validate_ratio(request.skill_ratio, request.mindset_ratio)
+
+    try:
+        evaluation = await reweight_service.reweight_applicant(
+            applicant_id, request.skill_ratio, request.mindset_ratio
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if evaluation is None:
+        raise HTTPException(status_code=404, detail="Applicant not found")
+
+    return {
+        "message": "Evaluation ratio updated successfully",
+        "evaluation": evaluation
+    }
+
+class BulkRatioUpdateRequest(BaseModel):
+    skill_ratio: float
+    mindset_ratio: float
+    status: Optional[str] = None
+    applicant_ids: Optional[List[str]] = None
+    dry_run: bool = False
+
+@router.post("/reweight")
+async def reweight_evaluations(request: BulkRatioUpdateRequest):
+    """
+    評価済みの応募者全員（またはstatus/IDで絞り込んだ応募者）の総合スコアを新しい比率で一括再計算
+
+    dry_run=Trueの場合は保存せずに再計算後のスコア分布だけを返す。
+    """
+    _validate_ratio(request.skill_ratio, request.mindset_ratio)
+
+    try:
+        return await reweight_service.reweight_many(
+            request.skill_ratio,
+            request.mindset_ratio,
+            status=request.status,
+            applicant_ids=request.applicant_ids,
+            dry_run=request.dry_run
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _validate_ratio(skill_ratio: float, mindset_ratio: float) -> None:
+    if not (0 <= skill_ratio <= 1 and 0 <= mindset_ratio <= 1) or abs(skill_ratio + mindset_ratio - 1) > 1e-6:
+        raise HTTPException(status_code=400, detail="skill_ratio and mindset_ratio must be between 0 and 1 and sum to 1")
 
 class ManualEvaluationItem(BaseModel):
     name: str
@@ -139,25 +233,27 @@ async def save_manual_evaluation(applicant_id: str, evaluation: ManualEvaluation
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def _structure_applicant_data(extracted_text: str) -> ApplicantData:
+async def _structure_applicant_data(
+    extracted_text: str,
+    llm: LLMClient = None,
+    applicant_id: Optional[str] = None
+) -> ApplicantData:
     """
     抽出されたテキストをGemini APIで構造化データに変換
-    """
-    from vertexai.generative_models import GenerativeModel
-    import vertexai
-    from app.utils.config import settings
-    import os
 
-    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = settings.google_application_credentials
-    vertexai.init(project=settings.google_cloud_project_id, location="us-central1")
+    同じテキストの構造化が実行中の場合は、新たに実行せずその結果を待つ。
+    """
+    key = flight_key("structure", applicant_id, extracted_text)
+    return await get_single_flight().do(key, lambda: _run_structuring(extracted_text, llm))
 
-    model = GenerativeModel("gemini-1.5-flash")
+async def _run_structuring(extracted_text: str, llm: LLMClient = None) -> ApplicantData:
+    llm = llm or get_llm_client()
 
     prompt = f"""
 以下は履歴書から抽出されたテキストです。このテキストから応募者情報を構造化してJSON形式で出力してください。
 
 【抽出テキスト】
-{extracted_text}
+{prepare_document_text(extracted_text)}
 
 【出力形式】
 以下のJSON形式で出力してください：
@@ -184,26 +280,20 @@ async def _structure_applicant_data(extracted_text: str) -> ApplicantData:
 """
 
     try:
-        response = model.generate_content(prompt)
-        result_text = response.text
-
-        # JSONパース
-        if "```json" in result_text:
-            json_start = result_text.find("```json") + 7
-            json_end = result_text.find("```", json_start)
-            result_text = result_text[json_start:json_end].strip()
-        elif "```" in result_text:
-            json_start = result_text.find("```") + 3
-            json_end = result_text.find("```", json_start)
-            result_text = result_text[json_start:json_end].strip()
-
-        data = json.loads(result_text)
-
-        # ApplicantDataオブジェクトに変換
-        data["extracted_text"] = extracted_text
-        data["ocr_confidence"] = 0.9  # 仮の値
+        result_text = await llm.generate(
+            prompt,
+            generation_config=json_generation_config(APPLICANT_DATA_SCHEMA),
+            purpose="structuring"
+        )
 
-        return ApplicantData(**data)
+        # JSONパースとApplicantDataへの検証
+        return parse_model(
+            result_text,
+            ApplicantData,
+            defaults={"name": "", "email": ""},
+            extracted_text=extracted_text,
+            ocr_confidence=0.9  # 仮の値
+        )
 
     except Exception as e:
         print(f"データ構造化エラー: {str(e)}")
@@ -1,8 +1,10 @@
+import asyncio
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import List
+from typing import Any, Dict, List
 from app.services.interview_service import InterviewService
 from app.models.applicant import ApplicantData, EvaluationResult
+from app.utils.single_flight import flight_key, get_single_flight
 from app.utils.supabase_client import get_supabase
 from datetime import datetime
 
@@ -43,25 +45,30 @@ async def generate_interview_questions(request: GenerateQuestionsRequest):
         applicant_data = ApplicantData(**applicant["applicant_data"])
         evaluation = EvaluationResult(**applicant["evaluation"])
 
-        # 質問生成
-        questions = await interview_service.generate_interview_questions(
-            applicant_data,
-            evaluation,
-            question_count=request.question_count
+        # 質問生成・保存（同時に来た同じ依頼は1回にまとめる）
+        key = flight_key(
+            "interview_questions", request.applicant_id, applicant_data, evaluation, request.question_count
         )
+        result = await get_single_flight().do(
+            key,
+            lambda: _generate_and_save_questions(
+                request.applicant_id, applicant_data, evaluation, request.question_count
+            )
+        )
+        questions = result["questions"]
 
-        # 質問をDBに保存
-        update_data = {
-            "interview_questions": questions,
-            "updated_at": datetime.utcnow().isoformat(),
-            "status": "interview"  # ステータスを「面接」に更新
-        }
-
-        response = supabase.table("applicants").update(update_data).eq("id", request.applicant_id).execute()
+        # AI生成できなかった場合はデフォルトの質問を返すだけで、DB・ステータスは更新しない
+        if result["degraded"]:
+            return {
+                "message": "AI question generation is temporarily unavailable; default questions returned and not saved",
+                "questions": questions,
+                "degraded": True
+            }
 
         return {
             "message": "Interview questions generated successfully",
-            "questions": questions
+            "questions": questions,
+            "degraded": False
         }
 
     except HTTPException:
@@ -69,6 +76,30 @@ async def generate_interview_questions(request: GenerateQuestionsRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _generate_and_save_questions(
+    applicant_id: str,
+    applicant_data: ApplicantData,
+    evaluation: EvaluationResult,
+    question_count: int
+) -> Dict[str, Any]:
+    result = await interview_service.generate_interview_questions(
+        applicant_data,
+        evaluation,
+        question_count=question_count
+    )
+    if result["degraded"]:
+        return result
+
+    # 質問をDBに保存
+    update_data = {
+        "interview_questions": result["questions"],
+        "updated_at": datetime.utcnow().isoformat(),
+        "status": "interview"  # ステータスを「面接」に更新
+    }
+    supabase = get_supabase()
+    await asyncio.to_thread(supabase.table("applicants").update(update_data).eq("id", applicant_id).execute)
+    return result
+
 @router.get("/{applicant_id}/questions")
 async def get_interview_questions(applicant_id: str):
     """応募者の面接質問を取得"""
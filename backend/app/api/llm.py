@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from app.utils.llm_client import get_llm_client
+from app.utils.single_flight import get_single_flight
+
+router = APIRouter()
+
+@router.get("/stats")
+async def get_llm_stats():
+    """
+    LLM呼び出しの状態を取得
+
+    流量制御（実行中の件数、優先度別の待ち行列の長さ・待ち時間、残りのリクエスト/トークン枠）と
+    サーキットブレーカーの状態、用途別のトークン使用量・応答時間、
+    同じ依頼の重複実行をまとめた件数（single_flight.shared）
+    """
+    llm = get_llm_client()
+    return {
+        "available": llm.available,
+        "backend": llm.backend.name,
+        "model": llm.model_name,
+        "governor": llm.governor.stats(),
+        "circuit": llm.breaker.stats(),
+        "usage": llm.usage.stats(),
+        "single_flight": get_single_flight().stats()
+    }
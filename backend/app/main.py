@@ -1,7 +1,10 @@
+from typing import Optional
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api import applicants, evaluation, interview, batch, calendar, criteria, stages
+from app.api import applicants, evaluation, interview, batch, calendar, criteria, stages, llm
 from app.utils.config import settings
+from app.utils.process_pool import get_process_pool
+from app.utils.upload import MULTIPART_OVERHEAD_BYTES, RequestSizeLimitMiddleware
 
 app = FastAPI(
     title="採用書類選考API",
@@ -9,6 +12,19 @@ app = FastAPI(
     version="1.0.0"
 )
 
+def _request_body_limit(path: str) -> Optional[int]:
+    """パスごとのリクエストボディの上限（ファイルサイズの上限＋マルチパートの分。Noneで無制限）"""
+    if path.startswith("/api/batch/upload-csv") or path == "/api/batch/jobs":
+        limit = settings.upload_csv_max_bytes
+    elif path == "/api/batch/ingest-resumes":
+        limit = settings.bulk_ingest_max_files * settings.bulk_ingest_max_file_bytes
+    else:
+        limit = settings.upload_max_bytes
+    return limit + MULTIPART_OVERHEAD_BYTES if limit else None
+
+# 上限を超えるアップロードは受信しきる前に413を返す（413の応答にもCORSのヘッダーが付くよう、CORSより先に登録する）
+app.add_middleware(RequestSizeLimitMiddleware, limit_for=_request_body_limit)
+
 # CORS設定
 app.add_middleware(
     CORSMiddleware,
@@ -26,6 +42,17 @@ app.include_router(batch.router, prefix="/api/batch", tags=["batch"])
 app.include_router(calendar.router, prefix="/api/calendar", tags=["calendar"])
 app.include_router(criteria.router, prefix="/api/criteria", tags=["criteria"])
 app.include_router(stages.router, prefix="/api/stages", tags=["stages"])
+app.include_router(llm.router, prefix="/api/llm", tags=["llm"])
+
+@app.on_event("startup")
+async def resume_batch_jobs():
+    # 再起動前に完了していなかったバッチジョブを再開
+    await batch.job_manager.resume_unfinished()
+
+@app.on_event("shutdown")
+async def shutdown_process_pool():
+    # 文書解析用のワーカープロセスを停止
+    get_process_pool().shutdown()
 
 @app.get("/")
 async def root():
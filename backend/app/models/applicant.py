@@ -42,6 +42,7 @@ class EvaluationResult(BaseModel):
     strengths: List[str] = []
     concerns: List[str] = []
     recommended_stage: Optional[SelectionStage] = None  # AI推奨ステージ
+    degraded: bool = False  # AI評価できずデフォルト値を返した場合True（保存・キャッシュしない）
 
 class ApplicantCreate(BaseModel):
     name: str
@@ -65,6 +66,24 @@ class ApplicantData(BaseModel):
     extracted_text: str = ""
     ocr_confidence: float = 0.0
 
+class IngestResult(BaseModel):
+    """履歴書の取り込み結果（構造化データ・推奨ステージ・不足情報・評価）"""
+    applicant_data: ApplicantData
+    evaluation: EvaluationResult
+    recommended_stage: SelectionStage = SelectionStage.DOCUMENT_SCREENING
+    recommendation_reason: str = ""
+    missing_info: List[str] = []
+    llm_calls: int = 1  # 取り込みに要したLLM呼び出し回数
+
+class InterviewQuestion(BaseModel):
+    question: str
+    category: str = ""
+    intent: str = ""  # この質問で何を確認したいか
+
+class InterviewQuestionSet(BaseModel):
+    """面接質問生成の応答"""
+    questions: List[InterviewQuestion] = []
+
 class ManualEvaluationItem(BaseModel):
     name: str
     definition: str
@@ -1,91 +1,314 @@
-from google.cloud import aiplatform
-from google.auth import default
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
-from typing import Dict, Any, List
-from app.models.applicant import ApplicantData, EvaluationResult, SkillEvaluation, MindsetEvaluation
+from typing import Any, List, Optional
+from pydantic import ValidationError
+from app.models.applicant import ApplicantData, EvaluationResult
+from app.services.evaluation_cache import EvaluationCache, get_evaluation_cache
 from app.utils.config import settings
-import json
-import os
+from app.utils.json_response import (
+    INTEGER_SCHEMA,
+    NUMBER_SCHEMA,
+    STRING_SCHEMA,
+    JSONResponseError,
+    array_schema,
+    json_generation_config,
+    object_schema,
+    parse_complete_items,
+    parse_json,
+    validate_model,
+)
+from app.utils.llm_client import LLMClient, get_llm_client
+from app.utils.prompt_budget import compact_json, truncate_to_budget
+from app.utils.rate_limiter import Priority
+from app.utils.tokens import estimate_tokens
+
+# 評価プロンプトのバージョン（プロンプトを変更したら更新する。キャッシュキーに含まれる）
+# 1人ずつの評価とまとめて評価で評価基準・出力形式は共通なので、同じバージョンを使う
+PROMPT_VERSION = "2"
+
+EVALUATION_CRITERIA = """
+【評価基準】
+
+＜スキル評価＞（各項目を0-10点で評価）
+1. 技術力: 専門知識・技術スキルの深さと広さ
+2. 経験: 実務経験の質と量
+3. 資格・学歴: 専門性を示す資格や学位
+
+＜マインドセット評価＞（各項目を0-10点で評価）
+1. 成長志向: 学習意欲、自己成長への意識
+2. 主体性: 自ら考え行動する姿勢、問題解決能力
+3. 協調性: チームワーク、コミュニケーション能力
+4. 価値観適合: 組織文化やビジョンとの整合性
+5. 情熱・モチベーション: 仕事への熱意、志望動機の強さ
+"""
+
+EVALUATION_OUTPUT_FORMAT = """{
+  "skill_evaluations": [
+    {"category": "技術力", "score": 0.0, "evidence": ["根拠1", "根拠2"]},
+    {"category": "経験", "score": 0.0, "evidence": ["根拠1"]},
+    {"category": "資格・学歴", "score": 0.0, "evidence": ["根拠1"]}
+  ],
+  "mindset_evaluations": [
+    {"category": "成長志向", "score": 0.0, "evidence": ["根拠1", "根拠2"]},
+    {"category": "主体性", "score": 0.0, "evidence": ["根拠1"]},
+    {"category": "協調性", "score": 0.0, "evidence": ["根拠1"]},
+    {"category": "価値観適合", "score": 0.0, "evidence": ["根拠1"]},
+    {"category": "情熱・モチベーション", "score": 0.0, "evidence": ["根拠1"]}
+  ],
+  "skill_score": 0.0,
+  "mindset_score": 0.0,
+  "total_score": 0.0,
+  "summary": "総合評価のサマリー（2-3文）",
+  "strengths": ["強み1", "強み2", "強み3"],
+  "concerns": ["懸念点1", "懸念点2"]
+}"""
+
+# EVALUATION_OUTPUT_FORMATに対応する応答スキーマ（JSONモードで出力形式を固定する）
+_CATEGORY_SCORE_SCHEMA = object_schema(
+    {"category": STRING_SCHEMA, "score": NUMBER_SCHEMA, "evidence": array_schema(STRING_SCHEMA)},
+    ["category", "score", "evidence"]
+)
+EVALUATION_SCHEMA = object_schema(
+    {
+        "skill_evaluations": array_schema(_CATEGORY_SCORE_SCHEMA),
+        "mindset_evaluations": array_schema(_CATEGORY_SCORE_SCHEMA),
+        "skill_score": NUMBER_SCHEMA,
+        "mindset_score": NUMBER_SCHEMA,
+        "total_score": NUMBER_SCHEMA,
+        "summary": STRING_SCHEMA,
+        "strengths": array_schema(STRING_SCHEMA),
+        "concerns": array_schema(STRING_SCHEMA),
+    },
+    ["skill_evaluations", "mindset_evaluations", "skill_score", "mindset_score", "total_score",
+     "summary", "strengths", "concerns"]
+)
+PACKED_EVALUATION_SCHEMA = object_schema(
+    {"results": array_schema(object_schema(
+        {"id": INTEGER_SCHEMA, "evaluation": EVALUATION_SCHEMA}, ["id", "evaluation"]
+    ))},
+    ["results"]
+)
+
+# まとめて評価する際の、1人あたりの出力トークン数の見込み
+EVALUATION_OUTPUT_TOKENS = 800
+# Geminiの最大出力トークン数（まとめて評価する人数の上限を決める）
+MAX_OUTPUT_TOKENS = 8192
 
 class AIEvaluationService:
-    def __init__(self):
-        self.model = None
-        if settings.google_cloud_project_id and settings.google_application_credentials:
-            try:
-                os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = settings.google_application_credentials
-                vertexai.init(project=settings.google_cloud_project_id, location="us-central1")
-                self.model = GenerativeModel("gemini-1.5-flash")
-            except Exception as e:
-                print(f"Vertex AIの初期化に失敗しました: {e}")
-                self.model = None
+    def __init__(self, llm: LLMClient = None, cache: EvaluationCache = None):
+        self.llm = llm or get_llm_client()
+        self.model_name = self.llm.model_name
+        self.cache = cache or (get_evaluation_cache() if settings.evaluation_cache_enabled else None)
 
     async def evaluate_applicant(
         self,
         applicant_data: ApplicantData,
         skill_ratio: float = None,
-        mindset_ratio: float = None
+        mindset_ratio: float = None,
+        use_cache: bool = True,
+        priority: Priority = Priority.INTERACTIVE
     ) -> EvaluationResult:
-        """応募者データを評価"""
-
-        if not self.model:
-            print("Vertex AIが初期化されていないため、評価をスキップします。")
-            return EvaluationResult(
-                skill_score=5.0,
-                mindset_score=5.0,
-                total_score=5.0,
-                skill_ratio=skill_ratio or settings.default_skill_ratio,
-                mindset_ratio=mindset_ratio or settings.default_mindset_ratio,
-                summary="AI評価は無効です。Google Cloudの認証情報を設定してください。"
-            )
+        """応募者データを評価（同じ入力の評価結果はキャッシュから返す）"""
 
         if skill_ratio is None:
             skill_ratio = settings.default_skill_ratio
         if mindset_ratio is None:
             mindset_ratio = settings.default_mindset_ratio
 
+        if not self.llm.available:
+            print("Vertex AIが初期化されていないため、評価をスキップします。")
+            return self.degraded_result(
+                skill_ratio, mindset_ratio,
+                "AI評価は無効です。Google Cloudの認証情報を設定してください。"
+            )
+
+        cache_key = None
+        if self.cache and use_cache:
+            cache_key = self._cache_key(applicant_data, skill_ratio, mindset_ratio)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         # プロンプト構築
         prompt = self._build_evaluation_prompt(applicant_data, skill_ratio, mindset_ratio)
 
         try:
-            # Gemini APIで評価
-            response = self.model.generate_content(prompt)
-            result_text = response.text
-
-            # JSONパース
-            evaluation_data = self._parse_evaluation_response(result_text)
-
-            # EvaluationResultオブジェクトに変換
-            evaluation = EvaluationResult(
-                skill_evaluations=[
-                    SkillEvaluation(**skill) for skill in evaluation_data.get("skill_evaluations", [])
-                ],
-                mindset_evaluations=[
-                    MindsetEvaluation(**mindset) for mindset in evaluation_data.get("mindset_evaluations", [])
-                ],
-                skill_score=evaluation_data.get("skill_score", 0.0),
-                mindset_score=evaluation_data.get("mindset_score", 0.0),
-                total_score=evaluation_data.get("total_score", 0.0),
-                skill_ratio=skill_ratio,
-                mindset_ratio=mindset_ratio,
-                summary=evaluation_data.get("summary", ""),
-                strengths=evaluation_data.get("strengths", []),
-                concerns=evaluation_data.get("concerns", [])
+            # Gemini APIで評価（共有クライアントの非同期API、JSONモード）
+            result_text = await self.llm.generate(
+                prompt,
+                generation_config=json_generation_config(EVALUATION_SCHEMA),
+                priority=priority,
+                purpose="evaluation"
             )
 
+            # JSONパースとEvaluationResultへの検証（途中で切れた応答は補修せず失敗として扱う）
+            evaluation = self.parse_evaluation_data(
+                self._parse_json(result_text, allow_repair=False), skill_ratio, mindset_ratio
+            )
+            if evaluation is None:
+                return self.degraded_result(
+                    skill_ratio, mindset_ratio, "AIの応答を解析できませんでした。再評価してください。"
+                )
+
+            # 正常に評価できた結果のみキャッシュする
+            if cache_key:
+                await self.cache.set(cache_key, evaluation)
+
             return evaluation
 
         except Exception as e:
             print(f"評価エラー: {str(e)}")
-            # エラー時はデフォルト評価を返す
-            return EvaluationResult(
-                skill_score=5.0,
-                mindset_score=5.0,
-                total_score=5.0,
+            # エラー時はdegradedなデフォルト評価を返す（キャッシュ・保存しない）
+            return self.degraded_result(
+                skill_ratio, mindset_ratio, f"評価処理中にエラーが発生しました: {str(e)}"
+            )
+
+    async def evaluate_pack(
+        self,
+        applicants: List[ApplicantData],
+        skill_ratio: float = None,
+        mindset_ratio: float = None,
+        priority: Priority = Priority.BATCH
+    ) -> List[Optional[EvaluationResult]]:
+        """
+        複数の応募者を1回のリクエストでまとめて評価
+
+        評価基準・出力形式のプロンプトを1回分にまとめ、応募者IDをキーにしたJSON配列で受け取る。
+        応答が出力トークン数の上限で途中で切れた場合は、応答テキスト上で最後まで出力された応募者の評価だけを使い
+        （補修した値は使わない）、キャッシュはしない。
+        応答に含まれなかった・解析できなかった応募者はNoneを返す（呼び出し側で個別に再評価する）。
+        リクエスト自体が失敗した場合は全員分のdegradedな結果を返す（障害中に個別の呼び出しを増やさない）。
+        """
+        if skill_ratio is None:
+            skill_ratio = settings.default_skill_ratio
+        if mindset_ratio is None:
+            mindset_ratio = settings.default_mindset_ratio
+
+        results: List[Optional[EvaluationResult]] = [None] * len(applicants)
+        if not applicants:
+            return results
+        if not self.llm.available:
+            return [
+                self.degraded_result(
+                    skill_ratio, mindset_ratio, "AI評価は無効です。Google Cloudの認証情報を設定してください。"
+                )
+                for _ in applicants
+            ]
+
+        prompt = self._build_packed_evaluation_prompt(applicants, skill_ratio, mindset_ratio)
+        try:
+            result_text = await self.llm.generate(
+                prompt,
+                generation_config=json_generation_config(
+                    PACKED_EVALUATION_SCHEMA, max_output_tokens=MAX_OUTPUT_TOKENS
+                ),
+                priority=priority,
+                purpose="evaluation_packed",
+                items=len(applicants)
+            )
+        except Exception as e:
+            print(f"まとめて評価エラー: {str(e)}")
+            return [
+                self.degraded_result(skill_ratio, mindset_ratio, f"評価処理中にエラーが発生しました: {str(e)}")
+                for _ in applicants
+            ]
+
+        try:
+            data = parse_json(result_text, allow_repair=False)
+            entries = data.get("results", []) if isinstance(data, dict) else data
+            complete = True
+        except JSONResponseError:
+            # 途中で切れた応答は、閉じている要素だけを使う
+            entries = parse_complete_items(result_text, "results")
+            complete = False
+        if not isinstance(entries, list):
+            return results
+
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                index = int(entry["id"]) - 1
+            except Exception:
+                continue
+            if 0 <= index < len(applicants) and results[index] is None:
+                results[index] = self.parse_evaluation_data(entry.get("evaluation"), skill_ratio, mindset_ratio)
+
+        if complete:
+            for applicant_data, evaluation in zip(applicants, results):
+                if evaluation is not None:
+                    await self.store_in_cache(applicant_data, skill_ratio, mindset_ratio, evaluation)
+
+        return results
+
+    async def get_cached(
+        self,
+        applicant_data: ApplicantData,
+        skill_ratio: float = None,
+        mindset_ratio: float = None
+    ) -> Optional[EvaluationResult]:
+        """キャッシュ済みの評価結果を取得（なければNone）"""
+        if not self.cache:
+            return None
+        return await self.cache.get(self._cache_key(
+            applicant_data,
+            settings.default_skill_ratio if skill_ratio is None else skill_ratio,
+            settings.default_mindset_ratio if mindset_ratio is None else mindset_ratio
+        ))
+
+    async def store_in_cache(
+        self,
+        applicant_data: ApplicantData,
+        skill_ratio: float,
+        mindset_ratio: float,
+        evaluation: EvaluationResult
+    ) -> None:
+        """他の経路（まとめて評価・取り込み）で得た評価結果をキャッシュに保存"""
+        if self.cache and not evaluation.degraded:
+            await self.cache.set(self._cache_key(applicant_data, skill_ratio, mindset_ratio), evaluation)
+
+    def parse_evaluation_data(
+        self,
+        evaluation_data: Any,
+        skill_ratio: float,
+        mindset_ratio: float
+    ) -> Optional[EvaluationResult]:
+        """応答JSON中の評価をEvaluationResultとして検証（スコアが欠けている・範囲外の場合はNone）"""
+        if not isinstance(evaluation_data, dict):
+            return None
+        try:
+            return validate_model(
+                evaluation_data,
+                EvaluationResult,
                 skill_ratio=skill_ratio,
                 mindset_ratio=mindset_ratio,
-                summary=f"評価処理中にエラーが発生しました: {str(e)}"
+                recommended_stage=None,
+                degraded=False
             )
+        except ValidationError as e:
+            print(f"評価結果を解析できませんでした: {e.error_count()}件の検証エラー")
+            return None
+
+    def pack_cost(self, applicant_data: ApplicantData) -> int:
+        """まとめて評価する際の1人あたりのトークン数の見込み（入力＋出力）"""
+        return estimate_tokens(self._format_applicant(applicant_data)) + EVALUATION_OUTPUT_TOKENS
+
+    def max_pack_size(self) -> int:
+        """出力トークン数の上限に収まる人数"""
+        return max(1, min(settings.evaluation_pack_max_size, MAX_OUTPUT_TOKENS // EVALUATION_OUTPUT_TOKENS))
+
+    def _cache_key(self, applicant_data: ApplicantData, skill_ratio: float, mindset_ratio: float) -> str:
+        return self.cache.make_key(applicant_data, skill_ratio, mindset_ratio, self.model_name, PROMPT_VERSION)
+
+    def degraded_result(self, skill_ratio: float, mindset_ratio: float, summary: str) -> EvaluationResult:
+        """AI評価できなかった場合のデフォルト評価（degraded=True）"""
+        return EvaluationResult(
+            skill_score=5.0,
+            mindset_score=5.0,
+            total_score=5.0,
+            skill_ratio=skill_ratio,
+            mindset_ratio=mindset_ratio,
+            summary=summary,
+            degraded=True
+        )
 
     def _build_evaluation_prompt(
         self,
@@ -103,82 +326,80 @@ class AIEvaluationService:
 - マインドセット評価: {mindset_ratio * 100}%
 
 【応募者データ】
-名前: {applicant_data.name}
-メール: {applicant_data.email}
-
-学歴:
-{json.dumps(applicant_data.education, ensure_ascii=False, indent=2)}
-
-職歴:
-{json.dumps(applicant_data.work_experience, ensure_ascii=False, indent=2)}
+{self._format_applicant(applicant_data)}
+{EVALUATION_CRITERIA}
+【出力形式】
+以下のJSON形式で評価結果を出力してください：
 
-技術スキル: {', '.join(applicant_data.technical_skills)}
-ソフトスキル: {', '.join(applicant_data.soft_skills)}
-資格: {', '.join(applicant_data.certifications)}
+{EVALUATION_OUTPUT_FORMAT}
 
-志望動機:
-{applicant_data.motivation}
+※ skill_score、mindset_scoreは各カテゴリーの平均点
+※ total_scoreは (skill_score × {skill_ratio}) + (mindset_score × {mindset_ratio})
+"""
 
-キャリア目標:
-{applicant_data.career_goals}
+    def _build_packed_evaluation_prompt(
+        self,
+        applicants: List[ApplicantData],
+        skill_ratio: float,
+        mindset_ratio: float
+    ) -> str:
+        """複数人分の評価プロンプトを構築（評価基準・出力形式は1回だけ含める）"""
 
-【評価基準】
+        applicants_text = "\n\n".join(
+            f"--- 応募者ID: {index} ---\n{self._format_applicant(applicant_data)}"
+            for index, applicant_data in enumerate(applicants, start=1)
+        )
 
-＜スキル評価＞（各項目を0-10点で評価）
-1. 技術力: 専門知識・技術スキルの深さと広さ
-2. 経験: 実務経験の質と量
-3. 資格・学歴: 専門性を示す資格や学位
+        return f"""
+あなたは採用評価の専門家です。以下の{len(applicants)}名の応募者データをそれぞれ独立に分析し、スキルとマインドセットの両面から評価してください。
+他の応募者との比較はせず、1人ずつ同じ基準で評価してください。
 
-＜マインドセット評価＞（各項目を0-10点で評価）
-1. 成長志向: 学習意欲、自己成長への意識
-2. 主体性: 自ら考え行動する姿勢、問題解決能力
-3. 協調性: チームワーク、コミュニケーション能力
-4. 価値観適合: 組織文化やビジョンとの整合性
-5. 情熱・モチベーション: 仕事への熱意、志望動機の強さ
+【評価比率】
+- スキル評価: {skill_ratio * 100}%
+- マインドセット評価: {mindset_ratio * 100}%
 
+【応募者データ】
+{applicants_text}
+{EVALUATION_CRITERIA}
 【出力形式】
-以下のJSON形式で評価結果を出力してください：
+応募者ごとの評価結果を、応募者IDをキーにして以下のJSON形式で出力してください（{len(applicants)}件すべて）：
 
 {{
-  "skill_evaluations": [
-    {{"category": "技術力", "score": 0.0, "evidence": ["根拠1", "根拠2"]}},
-    {{"category": "経験", "score": 0.0, "evidence": ["根拠1"]}},
-    {{"category": "資格・学歴", "score": 0.0, "evidence": ["根拠1"]}}
-  ],
-  "mindset_evaluations": [
-    {{"category": "成長志向", "score": 0.0, "evidence": ["根拠1", "根拠2"]}},
-    {{"category": "主体性", "score": 0.0, "evidence": ["根拠1"]}},
-    {{"category": "協調性", "score": 0.0, "evidence": ["根拠1"]}},
-    {{"category": "価値観適合", "score": 0.0, "evidence": ["根拠1"]}},
-    {{"category": "情熱・モチベーション", "score": 0.0, "evidence": ["根拠1"]}}
-  ],
-  "skill_score": 0.0,
-  "mindset_score": 0.0,
-  "total_score": 0.0,
-  "summary": "総合評価のサマリー（2-3文）",
-  "strengths": ["強み1", "強み2", "強み3"],
-  "concerns": ["懸念点1", "懸念点2"]
+  "results": [
+    {{"id": 1, "evaluation": {EVALUATION_OUTPUT_FORMAT}}}
+  ]
 }}
 
 ※ skill_score、mindset_scoreは各カテゴリーの平均点
 ※ total_scoreは (skill_score × {skill_ratio}) + (mindset_score × {mindset_ratio})
 """
 
-    def _parse_evaluation_response(self, response_text: str) -> Dict[str, Any]:
-        """Geminiからの応答をパース"""
+    def _format_applicant(self, applicant_data: ApplicantData) -> str:
+        """プロンプトに埋め込む応募者データ（JSONは空白なし、長い自由記述は上限まで）"""
+        field_budget = settings.prompt_field_token_budget
+        return f"""名前: {applicant_data.name}
+メール: {applicant_data.email}
+
+学歴:
+{compact_json(applicant_data.education)}
+
+職歴:
+{compact_json(applicant_data.work_experience)}
+
+技術スキル: {', '.join(applicant_data.technical_skills)}
+ソフトスキル: {', '.join(applicant_data.soft_skills)}
+資格: {', '.join(applicant_data.certifications)}
+
+志望動機:
+{truncate_to_budget(applicant_data.motivation, field_budget)}
+
+キャリア目標:
+{truncate_to_budget(applicant_data.career_goals, field_budget)}"""
+
+    def _parse_json(self, response_text: str, allow_repair: bool = True) -> Any:
+        """Geminiからの応答をパース（解析できない場合はNone）"""
         try:
-            # JSONブロックを抽出
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-            elif "```" in response_text:
-                json_start = response_text.find("```") + 3
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-
-            return json.loads(response_text)
-        except Exception as e:
+            return parse_json(response_text, allow_repair=allow_repair)
+        except JSONResponseError as e:
             print(f"JSONパースエラー: {str(e)}")
-            print(f"Response: {response_text}")
-            return {}
\ No newline at end of file
+            return None
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+from app.utils.config import settings
+from app.utils.supabase_client import get_supabase
+
+class BulkApplicantWriter:
+    """
+    応募者レコードをバッファしてまとめて書き込む
+
+    chunk_size件たまるか、最初の1件からflush_interval秒経過した時点で
+    複数行を1回のupsertで書き込む。チャンク全体が失敗した場合は1件ずつ
+    書き直し、不正な行があっても他の行は保存されるようにする。
+    """
+
+    def __init__(
+        self,
+        chunk_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        table: str = "applicants"
+    ):
+        self.chunk_size = max(1, chunk_size or settings.batch_insert_chunk_size)
+        self.flush_interval = flush_interval if flush_interval is not None else settings.batch_insert_flush_interval
+        self.table = table
+        self._buffer: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks = set()
+
+    async def write(self, record: Dict[str, Any]) -> None:
+        """レコードをバッファに追加し、DBに保存されるまで待つ（失敗時は例外）"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._buffer.append((record, future))
+
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self.flush)
+
+        await future
+
+    def flush(self) -> None:
+        """バッファ中のレコードの書き込みを開始"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._buffer:
+            return
+
+        chunk, self._buffer = self._buffer, []
+        task = asyncio.get_running_loop().create_task(self._write_chunk(chunk))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    def close(self) -> None:
+        """未書き込みのレコードを破棄（処理中断時用）"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for _, future in self._buffer:
+            if not future.done():
+                future.cancel()
+        self._buffer = []
+
+    async def _write_chunk(self, chunk: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        try:
+            supabase = get_supabase()
+        except Exception as e:
+            # クライアントを取得できない場合は書き直しても同じなので全件失敗にする
+            self._fail(chunk, e)
+            return
+
+        records = [record for record, _ in chunk]
+        try:
+            # 同期クライアントなのでスレッドで実行
+            await asyncio.to_thread(supabase.table(self.table).upsert(records).execute)
+        except Exception as e:
+            if len(chunk) == 1:
+                self._fail(chunk, e)
+                return
+        except BaseException as e:
+            # キャンセル等でも待機中の呼び出し元を残さない
+            self._fail(chunk, e)
+            raise
+        else:
+            self._succeed(chunk)
+            return
+
+        # チャンク単位で失敗した場合は1件ずつ書き直す
+        for index, (record, future) in enumerate(chunk):
+            try:
+                await asyncio.to_thread(supabase.table(self.table).upsert(record).execute)
+            except Exception as e:
+                self._fail([(record, future)], e)
+            except BaseException as e:
+                self._fail(chunk[index:], e)
+                raise
+            else:
+                self._succeed([(record, future)])
+
+    @staticmethod
+    def _succeed(chunk: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        """未完了のfutureをすべて成功にする"""
+        for _, future in chunk:
+            if not future.done():
+                future.set_result(None)
+
+    @staticmethod
+    def _fail(chunk: List[Tuple[Dict[str, Any], asyncio.Future]], error: BaseException) -> None:
+        """未完了のfutureをすべて失敗させる"""
+        for _, future in chunk:
+            if future.done():
+                continue
+            if isinstance(error, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(error)
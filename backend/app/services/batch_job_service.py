@@ -0,0 +1,289 @@
+import asyncio
+import json
+import time
+import uuid
+from enum import Enum
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Union
+from app.services.batch_service import BatchService, aenumerate
+from app.utils.sqlite_store import SQLiteStore
+
+class BatchJobStatus(str, Enum):
+    UPLOADING = "uploading"
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+# 入力行をSQLiteに登録する際のチャンクサイズ
+_ROW_INSERT_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batch_jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    total_count INTEGER NOT NULL,
+    skill_ratio REAL,
+    mindset_ratio REAL,
+    concurrency INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    processed_at_start INTEGER NOT NULL DEFAULT 0,
+    finished_at REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS batch_job_rows (
+    job_id TEXT NOT NULL,
+    row_index INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    result TEXT,
+    PRIMARY KEY (job_id, row_index)
+);
+CREATE INDEX IF NOT EXISTS idx_batch_job_rows_status ON batch_job_rows(job_id, status);
+"""
+
+class BatchJobStore:
+    """
+    バッチジョブの状態をSQLiteに永続化（ワーカー再起動後も再開できるよう入力行も保存）
+
+    メソッドは同期でSQLiteを読み書きするので、イベントループからはスレッドで呼び出す。
+    """
+
+    def __init__(self, filename: str = "batch_jobs.sqlite3"):
+        self.db = SQLiteStore(filename, _SCHEMA)
+
+    def create_job(
+        self,
+        skill_ratio: float = None,
+        mindset_ratio: float = None,
+        concurrency: Optional[int] = None
+    ) -> str:
+        """ジョブを作成（行の登録が終わるまではuploading状態で、再開対象にならない）"""
+        job_id = str(uuid.uuid4())
+        self.db.execute(
+            "INSERT INTO batch_jobs (id, status, total_count, skill_ratio, mindset_ratio, concurrency, created_at)"
+            " VALUES (?, ?, 0, ?, ?, ?, ?)",
+            (job_id, BatchJobStatus.UPLOADING.value, skill_ratio, mindset_ratio, concurrency, time.time())
+        )
+        return job_id
+
+    def add_rows(self, job_id: str, indexed_rows: List[tuple]) -> None:
+        self.db.executemany(
+            "INSERT INTO batch_job_rows (job_id, row_index, payload) VALUES (?, ?, ?)",
+            [(job_id, index, json.dumps(row, ensure_ascii=False)) for index, row in indexed_rows]
+        )
+
+    def mark_queued(self, job_id: str, total_count: int) -> None:
+        self.db.execute(
+            "UPDATE batch_jobs SET status = ?, total_count = ? WHERE id = ?",
+            (BatchJobStatus.QUEUED.value, total_count, job_id)
+        )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = self.db.execute("SELECT * FROM batch_jobs WHERE id = ?", (job_id,))
+        return dict(rows[0]) if rows else None
+
+    def get_counts(self, job_id: str) -> Dict[str, int]:
+        rows = self.db.execute(
+            "SELECT status, COUNT(*) AS n FROM batch_job_rows WHERE job_id = ? GROUP BY status",
+            (job_id,)
+        )
+        return {row["status"]: row["n"] for row in rows}
+
+    def mark_started(self, job_id: str) -> None:
+        processed = sum(n for status, n in self.get_counts(job_id).items() if status != "pending")
+        self.db.execute(
+            "UPDATE batch_jobs SET status = ?, started_at = ?, processed_at_start = ? WHERE id = ?",
+            (BatchJobStatus.RUNNING.value, time.time(), processed, job_id)
+        )
+
+    def mark_finished(self, job_id: str, status: BatchJobStatus, error: str = None) -> None:
+        self.db.execute(
+            "UPDATE batch_jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+            (status.value, time.time(), error, job_id)
+        )
+
+    def get_pending_rows(self, job_id: str, after_index: int, limit: int = _ROW_INSERT_CHUNK) -> List[tuple]:
+        """行番号がafter_indexより後の未処理の行を、行番号順にlimit件まで (行番号, 行) で返す"""
+        rows = self.db.execute(
+            "SELECT row_index, payload FROM batch_job_rows"
+            " WHERE job_id = ? AND status = 'pending' AND row_index > ? ORDER BY row_index LIMIT ?",
+            (job_id, after_index, limit)
+        )
+        return [(row["row_index"], json.loads(row["payload"])) for row in rows]
+
+    def save_result(self, job_id: str, row_index: int, result: Dict[str, Any]) -> None:
+        self.db.execute(
+            "UPDATE batch_job_rows SET status = ?, result = ? WHERE job_id = ? AND row_index = ?",
+            (result["status"], json.dumps(result, ensure_ascii=False), job_id, row_index)
+        )
+
+    def get_results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        rows = self.db.execute(
+            "SELECT row_index, result FROM batch_job_rows"
+            " WHERE job_id = ? AND status != 'pending' ORDER BY row_index LIMIT ? OFFSET ?",
+            (job_id, limit, offset)
+        )
+        return [{"row_index": row["row_index"], **json.loads(row["result"])} for row in rows]
+
+    def unfinished_job_ids(self) -> List[str]:
+        rows = self.db.execute(
+            "SELECT id FROM batch_jobs WHERE status IN (?, ?) ORDER BY created_at",
+            (BatchJobStatus.QUEUED.value, BatchJobStatus.RUNNING.value)
+        )
+        return [row["id"] for row in rows]
+
+    def fail_uploading_jobs(self, error: str) -> List[str]:
+        """行の登録中（uploading）のまま残ったジョブを失敗にする（再起動で登録が中断されたジョブ）"""
+        rows = self.db.execute(
+            "SELECT id FROM batch_jobs WHERE status = ?",
+            (BatchJobStatus.UPLOADING.value,)
+        )
+        for row in rows:
+            self.mark_finished(row["id"], BatchJobStatus.FAILED, error=error)
+        return [row["id"] for row in rows]
+
+class BatchJobManager:
+    """バックグラウンドでバッチジョブを実行・管理（SQLiteの読み書きはスレッドで行い、イベントループを塞がない）"""
+
+    def __init__(self, batch_service: BatchService, store: BatchJobStore = None):
+        self.batch_service = batch_service
+        self.store = store or BatchJobStore()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def submit(
+        self,
+        rows: Union[Iterable[Dict[str, str]], AsyncIterable[Dict[str, str]]],
+        skill_ratio: float = None,
+        mindset_ratio: float = None,
+        concurrency: Optional[int] = None
+    ) -> str:
+        """ジョブを登録してバックグラウンド実行を開始し、ジョブIDを返す"""
+        job_id = await asyncio.to_thread(self.store.create_job, skill_ratio, mindset_ratio, concurrency)
+
+        try:
+            # 行はチャンク単位でSQLiteに書き込み、全行をメモリに持たない
+            chunk = []
+            total = 0
+            async for index, row in aenumerate(rows):
+                chunk.append((index, row))
+                total = index + 1
+                if len(chunk) >= _ROW_INSERT_CHUNK:
+                    await asyncio.to_thread(self.store.add_rows, job_id, chunk)
+                    chunk = []
+            if chunk:
+                await asyncio.to_thread(self.store.add_rows, job_id, chunk)
+        except Exception as e:
+            await asyncio.to_thread(self.store.mark_finished, job_id, BatchJobStatus.FAILED, str(e))
+            raise
+
+        await asyncio.to_thread(self.store.mark_queued, job_id, total)
+        self._start(job_id)
+        return job_id
+
+    async def resume_unfinished(self) -> List[str]:
+        """
+        再起動前に完了していなかったジョブを再開
+
+        行の登録中（uploading）だったジョブは入力が揃っていないので再開せず、失敗にする。
+        """
+        await asyncio.to_thread(
+            self.store.fail_uploading_jobs, "CSVの登録中にサーバーが再起動したため中断されました。再度登録してください。"
+        )
+        job_ids = await asyncio.to_thread(self.store.unfinished_job_ids)
+        for job_id in job_ids:
+            self._start(job_id)
+        return job_ids
+
+    async def cancel(self, job_id: str) -> bool:
+        """実行中のジョブをキャンセル（既に終了している場合はFalse）"""
+        job = await asyncio.to_thread(self.store.get_job, job_id)
+        if not job or job["status"] not in (BatchJobStatus.QUEUED.value, BatchJobStatus.RUNNING.value):
+            return False
+
+        await asyncio.to_thread(self.store.mark_finished, job_id, BatchJobStatus.CANCELLED)
+        task = self._tasks.pop(job_id, None)
+        if task:
+            task.cancel()
+        return True
+
+    async def get_progress(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """進捗（処理済み/成功/エラー件数、推定残り時間）を取得"""
+        return await asyncio.to_thread(self._progress, job_id)
+
+    async def get_results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """処理済みの行の結果を行番号順に取得"""
+        return await asyncio.to_thread(self.store.get_results, job_id, offset, limit)
+
+    def _progress(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.store.get_job(job_id)
+        if not job:
+            return None
+
+        counts = self.store.get_counts(job_id)
+        success_count = counts.get("success", 0)
+        error_count = counts.get("error", 0)
+        processed = success_count + error_count
+        remaining = job["total_count"] - processed
+
+        # 今回の実行開始以降の処理速度から残り時間を推定
+        eta_seconds = None
+        if job["status"] == BatchJobStatus.RUNNING.value and job["started_at"]:
+            done_this_run = processed - job["processed_at_start"]
+            if done_this_run > 0:
+                elapsed = time.time() - job["started_at"]
+                eta_seconds = round(elapsed / done_this_run * remaining, 1)
+
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "total_count": job["total_count"],
+            "processed_count": processed,
+            "success_count": success_count,
+            "error_count": error_count,
+            "eta_seconds": eta_seconds,
+            "error": job["error"]
+        }
+
+    def _start(self, job_id: str) -> None:
+        if job_id in self._tasks:
+            return
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+    async def _run(self, job_id: str) -> None:
+        try:
+            job = await asyncio.to_thread(self.store.get_job, job_id)
+            await asyncio.to_thread(self.store.mark_started, job_id)
+            namespace = uuid.UUID(job_id)
+
+            async for row_index, result in self.batch_service.iter_results(
+                self._iter_pending_rows(job_id),
+                skill_ratio=job["skill_ratio"],
+                mindset_ratio=job["mindset_ratio"],
+                concurrency=job["concurrency"],
+                # 再開時に同じ行が二重登録されないよう、応募者IDをジョブIDと行番号から決定
+                id_factory=lambda index: str(uuid.uuid5(namespace, str(index)))
+            ):
+                await asyncio.to_thread(self.store.save_result, job_id, row_index, result)
+
+            await asyncio.to_thread(self.store.mark_finished, job_id, BatchJobStatus.COMPLETED)
+
+        except asyncio.CancelledError:
+            # cancel()で状態は更新済み。シャットダウン時は次回起動で再開させるため状態を残す
+            raise
+        except Exception as e:
+            await asyncio.to_thread(self.store.mark_finished, job_id, BatchJobStatus.FAILED, str(e))
+        finally:
+            self._tasks.pop(job_id, None)
+
+    async def _iter_pending_rows(self, job_id: str) -> AsyncIterator[tuple]:
+        """未処理の行をページ単位でスレッドで読み出し、行番号順に返す"""
+        last_index = -1
+        while True:
+            rows = await asyncio.to_thread(self.store.get_pending_rows, job_id, last_index)
+            if not rows:
+                return
+            for row in rows:
+                yield row
+            last_index = rows[-1][0]
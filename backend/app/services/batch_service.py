@@ -0,0 +1,240 @@
+import asyncio
+import contextlib
+import json
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from app.services.ai_evaluation_service import AIEvaluationService
+from app.services.applicant_writer import BulkApplicantWriter
+from app.services.evaluation_packer import EvaluationPacker
+from app.models.applicant import ApplicantData, ApplicationStatus
+from app.utils.config import settings
+from app.utils.rate_limiter import Priority
+
+class BatchService:
+    """応募者の一括評価サービス（同時実行数を制限して並列処理）"""
+
+    def __init__(self, ai_service: AIEvaluationService = None):
+        self.ai_service = ai_service or AIEvaluationService()
+
+    async def process_rows(
+        self,
+        rows: Union[Iterable[Dict[str, str]], AsyncIterable[Dict[str, str]]],
+        skill_ratio: float = None,
+        mindset_ratio: float = None,
+        concurrency: Optional[int] = None,
+        packed: Optional[bool] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        CSV行をまとめて評価・保存
+
+        Args:
+            rows: CSV行（DictReaderまたはiter_upload_rowsの出力）
+            skill_ratio: スキル評価比率
+            mindset_ratio: マインドセット評価比率
+            concurrency: 同時に評価する行数（まとめて評価する場合は同時リクエスト数。未指定時は設定値）
+            packed: 複数人を1リクエストでまとめて評価するか（未指定時は設定値）
+
+        Returns:
+            行ごとの処理結果（入力順）
+        """
+        indexed = [
+            item async for item in self.iter_results(
+                aenumerate(rows), skill_ratio, mindset_ratio, concurrency, packed=packed
+            )
+        ]
+        indexed.sort(key=lambda item: item[0])
+        return [result for _, result in indexed]
+
+    async def iter_results(
+        self,
+        indexed_rows: Union[Iterable[Tuple[int, Dict[str, str]]], AsyncIterable[Tuple[int, Dict[str, str]]]],
+        skill_ratio: float = None,
+        mindset_ratio: float = None,
+        concurrency: Optional[int] = None,
+        id_factory: Optional[Callable[[int], str]] = None,
+        packed: Optional[bool] = None
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        (行番号, CSV行)を並列に処理し、完了した順に(行番号, 結果)を返す
+
+        AI評価の同時実行数はconcurrency件までに制限し、入力は必要な分だけ先読みする
+        （非同期イテレータを渡すとCSVの読み込みと評価が並行して進む）。
+        評価済みの行はBulkApplicantWriterでまとめてDBに書き込む。
+        id_factoryを指定すると行番号から応募者IDを決定する（再実行時の重複防止）。
+        packed=Trueの場合はEvaluationPackerで複数行を1リクエストにまとめ、
+        concurrencyは同時に送るリクエスト数の上限になる。
+        """
+        concurrency = max(1, concurrency or settings.batch_concurrency)
+        if packed is None:
+            packed = settings.batch_packed_evaluation
+        rows_iter = _as_async_iterator(indexed_rows)
+        pending = set()
+
+        # AI評価の同時実行数はconcurrencyで制限し、DB書き込みはチャンクにまとめる。
+        # 書き込み待ちの行が評価枠を塞がないよう、先読みはチャンクサイズ分多めにとる
+        eval_slots = asyncio.Semaphore(concurrency)
+        writer = BulkApplicantWriter()
+        packer = None
+        max_pending = concurrency + writer.chunk_size
+        if packed:
+            # 評価枠はまとめたリクエスト単位で使うので、まとめる人数分多めに先読みする
+            packer = EvaluationPacker(self.ai_service, skill_ratio, mindset_ratio, slots=eval_slots)
+            max_pending = concurrency * packer.max_size + writer.chunk_size
+
+        async def run(index: int, row: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+            applicant_id = id_factory(index) if id_factory else None
+            result = await self.process_row(
+                row, skill_ratio, mindset_ratio,
+                applicant_id=applicant_id, writer=writer, eval_slots=eval_slots, packer=packer
+            )
+            return index, result
+
+        async def fill() -> None:
+            while len(pending) < max_pending:
+                item = await anext(rows_iter, None)
+                if item is None:
+                    return
+                pending.add(asyncio.create_task(run(*item)))
+
+        try:
+            await fill()
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    pending.discard(task)
+                    yield task.result()
+                await fill()
+        finally:
+            # キャンセル・中断時は実行中のタスクも止める
+            for task in pending:
+                task.cancel()
+            if packer:
+                packer.close()
+            writer.close()
+
+    async def process_row(
+        self,
+        row: Dict[str, str],
+        skill_ratio: float = None,
+        mindset_ratio: float = None,
+        applicant_id: Optional[str] = None,
+        writer: Optional[BulkApplicantWriter] = None,
+        eval_slots: Optional[asyncio.Semaphore] = None,
+        packer: Optional[EvaluationPacker] = None
+    ) -> Dict[str, Any]:
+        """1行を評価してDBに保存（エラーは結果として返す）"""
+        try:
+            # ApplicantDataオブジェクトを作成
+            applicant_data = csv_row_to_applicant_data(row)
+
+            # AI評価実行
+            if packer:
+                # 評価枠はpacker側でリクエスト単位に確保する
+                evaluation = await packer.evaluate(applicant_data)
+            else:
+                async with eval_slots or contextlib.nullcontext():
+                    # 一括処理は画面からの評価より後回しにする
+                    evaluation = await self.ai_service.evaluate_applicant(
+                        applicant_data,
+                        skill_ratio=skill_ratio,
+                        mindset_ratio=mindset_ratio,
+                        priority=Priority.BATCH
+                    )
+
+            # デフォルト値の評価は本物として保存せず、エラーとして返す（後で再処理できるように）
+            if evaluation.degraded:
+                return {
+                    "name": applicant_data.name,
+                    "email": applicant_data.email,
+                    "status": "error",
+                    "degraded": True,
+                    "error": evaluation.summary
+                }
+
+            # DBに保存
+            applicant_id = applicant_id or str(uuid.uuid4())
+            applicant_record = {
+                "id": applicant_id,
+                "created_at": datetime.utcnow().isoformat(),
+                "updated_at": datetime.utcnow().isoformat(),
+                "name": applicant_data.name,
+                "email": applicant_data.email,
+                "phone": applicant_data.phone,
+                "applicant_data": applicant_data.model_dump(),
+                "evaluation": evaluation.model_dump(),
+                "status": ApplicationStatus.SCREENING.value
+            }
+
+            # writer未指定時はその場で1件書き込む（IDが固定されていても重複しないようupsert）
+            await (writer or BulkApplicantWriter(chunk_size=1)).write(applicant_record)
+
+            return {
+                "name": applicant_data.name,
+                "email": applicant_data.email,
+                "status": "success",
+                "applicant_id": applicant_id,
+                "total_score": evaluation.total_score
+            }
+
+        except Exception as e:
+            return {
+                "name": row.get("name", "Unknown"),
+                "email": row.get("email", "Unknown"),
+                "status": "error",
+                "error": str(e)
+            }
+
+async def aenumerate(
+    rows: Union[Iterable[Any], AsyncIterable[Any]],
+    start: int = 0
+) -> AsyncIterator[Tuple[int, Any]]:
+    """同期・非同期どちらのイテラブルにも使えるenumerate"""
+    index = start
+    async for row in _as_async_iterator(rows):
+        yield index, row
+        index += 1
+
+async def _as_async_iterator(items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+def csv_row_to_applicant_data(row: Dict[str, str]) -> ApplicantData:
+    """CSV行をApplicantDataオブジェクトに変換"""
+
+    # カンマ区切りのリストを配列に変換
+    technical_skills = [s.strip() for s in (row.get("technical_skills") or "").split(",") if s.strip()]
+    soft_skills = [s.strip() for s in (row.get("soft_skills") or "").split(",") if s.strip()]
+
+    # 学歴・職歴はJSON形式またはテキスト形式で受け取る想定
+    education = []
+    if row.get("education"):
+        try:
+            education = json.loads(row["education"])
+        except ValueError:
+            education = [{"institution": row["education"]}]
+
+    work_experience = []
+    if row.get("work_experience"):
+        try:
+            work_experience = json.loads(row["work_experience"])
+        except ValueError:
+            work_experience = [{"company": row["work_experience"]}]
+
+    return ApplicantData(
+        name=row.get("name") or "",
+        email=row.get("email") or "",
+        phone=row.get("phone"),
+        education=education,
+        work_experience=work_experience,
+        technical_skills=technical_skills,
+        soft_skills=soft_skills,
+        certifications=[],
+        motivation=row.get("motivation") or "",
+        career_goals=row.get("career_goals") or "",
+        additional_info=row.get("additional_info") or ""
+    )
@@ -0,0 +1,122 @@
+import re
+from pathlib import Path
+from typing import Any, Dict, List
+import pandas as pd
+import fitz  # PyMuPDF
+import markdown
+from bs4 import BeautifulSoup
+
+# 評価基準ファイルの解析（プロセスプールのワーカーで実行するため、HTTPに依存しない純粋な関数にする）
+# 内容から評価基準を読み取れない場合はValueErrorを送出する
+
+CRITERIA_EXTENSIONS = {".csv", ".xlsx", ".md", ".pdf"}
+
+_BULLET_RE = re.compile(r"^(■|●|・|\d+\.|\*|-)")
+
+def parse_criteria_file(file_path: str) -> List[Dict[str, Any]]:
+    """
+    評価基準ファイルを解析して評価基準リストを返す
+
+    Raises:
+        ValueError: 対応していない形式、または評価基準を読み取れない場合
+    """
+    path = Path(file_path)
+    if path.suffix in (".csv", ".xlsx"):
+        return _parse_csv_xlsx(path)
+    if path.suffix == ".md":
+        return _parse_md(path)
+    if path.suffix == ".pdf":
+        return _parse_pdf(path)
+    raise ValueError(f"サポートされていないファイル形式です: {path.suffix}")
+
+def _parse_csv_xlsx(file_path: Path) -> List[Dict[str, Any]]:
+    """CSVまたはXLSXファイルを解析して評価基準リストを返す"""
+    try:
+        df = pd.read_excel(file_path) if file_path.suffix == '.xlsx' else pd.read_csv(file_path)
+    except Exception as e:
+        raise ValueError(f"ファイル解析エラー: {e}") from e
+
+    # 想定される列名で抽出を試みる
+    if '要件/構成要素' in df.columns and '定義' in df.columns:
+        df_filtered = df[['要件/構成要素', '定義']].dropna()
+    # 上記が失敗した場合、最初の2列を単純に使う
+    elif len(df.columns) >= 2:
+        df_filtered = df.iloc[:, [0, 1]].dropna()
+    else:
+        raise ValueError("ファイル解析エラー: 評価基準（名前・定義）の2列が必要です")
+
+    return [
+        {"name": row[0], "definition": row[1], "score": 3, "memo": ""}
+        for row in df_filtered.itertuples(index=False)
+    ]
+
+def _parse_md(file_path: Path) -> List[Dict[str, Any]]:
+    """Markdownファイルを解析して評価基準リストを返す"""
+    try:
+        with file_path.open("r", encoding="utf-8") as f:
+            md_text = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        raise ValueError(f"Markdownファイル解析エラー: {e}") from e
+
+    html = markdown.markdown(md_text)
+    soup = BeautifulSoup(html, "html.parser")
+
+    criteria = []
+    # h2またはh3タグを見出しと仮定
+    for header in soup.find_all(["h2", "h3"]):
+        name = header.get_text(strip=True)
+        # ヘッダーの次にあるpタグを定義と仮定
+        p_tag = header.find_next_sibling("p")
+        if name and p_tag:
+            definition = p_tag.get_text(strip=True)
+            criteria.append({"name": name, "definition": definition, "score": 3, "memo": ""})
+
+    if not criteria:
+        raise ValueError("Markdownファイルから有効な評価基準が見つかりませんでした。h2/h3を見出し、pを定義としてください。")
+
+    return criteria
+
+def _parse_pdf(file_path: Path) -> List[Dict[str, Any]]:
+    """PDFファイルを解析して評価基準リストを返す"""
+    try:
+        doc = fitz.open(file_path)
+    except Exception as e:
+        raise ValueError(f"PDFファイル解析エラー: {e}") from e
+    try:
+        full_text = "".join(page.get_text() for page in doc)
+    finally:
+        doc.close()
+
+    criteria = []
+    current_item = None
+
+    for line in full_text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+
+        # 箇条書きの始まりを検出 (簡易的な正規表現)
+        if _BULLET_RE.match(line):
+            if current_item:
+                criteria.append(current_item)
+
+            current_item = {
+                "name": line,
+                "definition": "",
+                "score": 3,
+                "memo": ""
+            }
+        elif current_item:
+            current_item["definition"] += line + " "
+
+    if current_item:
+        criteria.append(current_item)
+
+    # 整形
+    for item in criteria:
+        item["definition"] = item["definition"].strip()
+
+    if not criteria:
+        raise ValueError("PDFファイルから有効な評価基準が見つかりませんでした。箇条書き形式で記述してください。")
+
+    return criteria
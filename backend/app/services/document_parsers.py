@@ -0,0 +1,122 @@
+import io
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import fitz  # PyMuPDF
+from docx import Document
+
+# 応募書類の解析（プロセスプールのワーカーで実行するため、設定値は引数で受け取る純粋な関数にする）
+
+# ファイルの内容（バイト）またはファイルのパス。パスならワーカーに内容を送らずに済む
+DocumentSource = Union[str, bytes]
+PDFSource = DocumentSource
+
+# 文字化け（ToUnicodeのないフォントなど）とみなす置換文字の割合
+GARBLED_TEXT_RATIO = 0.2
+# Wordでセクションの区切りとみなす段落スタイル
+_HEADING_STYLE_PREFIXES = ("Heading", "Title", "見出し", "表題")
+
+def open_pdf(source: PDFSource) -> "fitz.Document":
+    """ファイルパスまたはバイト列からPDFを開く"""
+    return fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+
+def page_needs_ocr(text: str, min_text_chars: int) -> bool:
+    """テキストレイヤーの文字数（空白を除く）が少ない・文字化けしているページはOCRが必要"""
+    chars = sum(1 for ch in text if not ch.isspace())
+    if chars < min_text_chars:
+        return True
+    # PDF_MIN_TEXT_CHARS=0の場合、空白だけのページはここに来る
+    if chars == 0:
+        return True
+    return is_garbled(text)
+
+def is_garbled(text: str) -> bool:
+    """置換文字の割合が多い（フォントから文字を取り出せていない）テキスト"""
+    chars = sum(1 for ch in text if not ch.isspace())
+    return chars > 0 and text.count("�") / chars > GARBLED_TEXT_RATIO
+
+def pdf_page_count(source: PDFSource) -> int:
+    """PDFのページ数"""
+    doc = open_pdf(source)
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+def read_text_layer(
+    source: PDFSource,
+    min_text_chars: int,
+    page_numbers: Optional[List[int]] = None
+) -> List[Tuple[str, bool]]:
+    """指定したページ（1始まり、Noneで全ページ）ごとの (テキストレイヤー, OCRが必要か)"""
+    doc = open_pdf(source)
+    try:
+        layer = []
+        for number in page_numbers or range(1, doc.page_count + 1):
+            page = doc[number - 1]
+            text = page.get_text()
+            # 文字化けしたページは描画すれば読めるので常にOCRする。
+            # 文字が少ないだけのページは、画像がなければOCRしても文字が出ないので送らない
+            needs_ocr = is_garbled(text) or (page_needs_ocr(text, min_text_chars) and bool(page.get_images()))
+            layer.append((text, needs_ocr))
+        return layer
+    finally:
+        doc.close()
+
+def render_page_images(
+    source: PDFSource,
+    page_numbers: List[int],
+    dpi: int,
+    grayscale: bool,
+    image_format: str,
+    quality: int
+) -> List[bytes]:
+    """
+    指定したページ（1始まり）をOCR用の画像に変換
+
+    dpiの解像度で描画し、grayscaleならグレースケール、image_format（jpeg / webp / png）でエンコードする。
+    """
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    image_format = image_format.lower()
+
+    doc = open_pdf(source)
+    try:
+        images = []
+        for number in page_numbers:
+            pixmap = doc[number - 1].get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
+            if image_format in ("jpeg", "jpg"):
+                images.append(pixmap.tobytes("jpeg", jpg_quality=quality))
+            elif image_format == "webp":
+                images.append(pixmap.pil_tobytes(format="WEBP", quality=quality))
+            else:
+                images.append(pixmap.tobytes("png"))
+            del pixmap
+        return images
+    finally:
+        doc.close()
+
+def parse_word_sections(source: DocumentSource) -> List[Dict[str, Any]]:
+    """Wordファイルを見出し・表ごとのセクションに分けて返す"""
+    doc = Document(source if isinstance(source, str) else io.BytesIO(source))
+    return list(_word_sections(doc))
+
+def _word_sections(doc) -> Iterator[Dict[str, Any]]:
+    """段落は見出しごとのセクションに分けて、表は1つずつ1セクションとして順に返す"""
+    index = 0
+    lines = []
+    for paragraph in doc.paragraphs:
+        style_name = paragraph.style.name if paragraph.style is not None else ""
+        if lines and style_name.startswith(_HEADING_STYLE_PREFIXES):
+            index += 1
+            yield {"section": index, "text": "".join(lines)}
+            lines = []
+        lines.append(paragraph.text + "\n")
+    if lines:
+        index += 1
+        yield {"section": index, "text": "".join(lines)}
+
+    # テーブルも処理
+    for table in doc.tables:
+        index += 1
+        yield {
+            "section": index,
+            "text": "".join("".join(cell.text + "\t" for cell in row.cells) + "\n" for row in table.rows)
+        }
@@ -0,0 +1,78 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+from app.models.applicant import ApplicantData, EvaluationResult
+from app.utils.cache import TieredCache
+from app.utils.config import settings
+
+class EvaluationCache:
+    """
+    AI評価結果のキャッシュ
+
+    正規化した応募者データ・評価比率・モデル名・プロンプトのバージョンのハッシュをキーにする。
+    同じ入力の再評価ではGeminiを呼ばずに結果を返す。
+    """
+
+    def __init__(self, cache: TieredCache = None):
+        self.cache = cache or TieredCache(
+            "evaluation_cache.sqlite3",
+            memory_entries=settings.evaluation_cache_memory_entries,
+            max_entries=settings.evaluation_cache_max_entries,
+            ttl_seconds=settings.evaluation_cache_ttl_seconds
+        )
+
+    @staticmethod
+    def make_key(
+        applicant_data: ApplicantData,
+        skill_ratio: float,
+        mindset_ratio: float,
+        model_name: str,
+        prompt_version: str
+    ) -> str:
+        # OCR信頼度は評価に影響しないので除外
+        normalized = _normalize(applicant_data.model_dump(exclude={"ocr_confidence"}))
+        payload = json.dumps(
+            {
+                "applicant": normalized,
+                "skill_ratio": round(skill_ratio, 4),
+                "mindset_ratio": round(mindset_ratio, 4),
+                "model": model_name,
+                "prompt_version": prompt_version,
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[EvaluationResult]:
+        value = await self.cache.aget(key)
+        return EvaluationResult(**value) if value is not None else None
+
+    async def set(self, key: str, evaluation: EvaluationResult) -> None:
+        await self.cache.aset(key, evaluation.model_dump(mode="json"))
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+def _normalize(value: Any) -> Any:
+    """空白の違いだけの入力が同じキーになるよう正規化"""
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+_instance: Optional[EvaluationCache] = None
+
+def get_evaluation_cache() -> EvaluationCache:
+    """プロセス内で共有する評価キャッシュを取得"""
+    global _instance
+    if _instance is None:
+        _instance = EvaluationCache()
+    return _instance
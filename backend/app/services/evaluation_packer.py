@@ -0,0 +1,130 @@
+import asyncio
+import contextlib
+from typing import List, Optional, Tuple
+from app.models.applicant import ApplicantData, EvaluationResult
+from app.services.ai_evaluation_service import AIEvaluationService
+from app.utils.config import settings
+from app.utils.rate_limiter import Priority
+
+class EvaluationPacker:
+    """
+    評価依頼をバッファして複数人まとめて評価する
+
+    トークン数の見込みがtoken_budgetを超えるか、出力上限に収まる人数に達するか、
+    最初の1件からflush_interval秒経過した時点で1回のリクエストにまとめて送る。
+    応答から漏れた・解析できなかった応募者だけを個別に再評価する
+    （リクエスト自体が失敗した場合は個別に送り直さず、evaluate_packが返すdegradedな結果をそのまま返す）。
+    """
+
+    def __init__(
+        self,
+        ai_service: AIEvaluationService,
+        skill_ratio: float = None,
+        mindset_ratio: float = None,
+        token_budget: Optional[int] = None,
+        max_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        slots: Optional[asyncio.Semaphore] = None,
+        priority: Priority = Priority.BATCH
+    ):
+        self.ai_service = ai_service
+        self.skill_ratio = skill_ratio
+        self.mindset_ratio = mindset_ratio
+        self.token_budget = token_budget or settings.evaluation_pack_token_budget
+        self.max_size = min(max_size or settings.evaluation_pack_max_size, ai_service.max_pack_size())
+        self.flush_interval = flush_interval if flush_interval is not None else settings.evaluation_pack_flush_interval
+        # 同時に送るリクエスト（まとめた単位）の数の上限
+        self.slots = slots
+        self.priority = priority
+        self._buffer: List[Tuple[ApplicantData, asyncio.Future]] = []
+        self._buffer_cost = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._pack_tasks = set()
+
+    async def evaluate(self, applicant_data: ApplicantData) -> EvaluationResult:
+        """応募者を次のまとめ評価に加え、評価結果が出るまで待つ"""
+        cached = await self.ai_service.get_cached(applicant_data, self.skill_ratio, self.mindset_ratio)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        cost = self.ai_service.pack_cost(applicant_data)
+
+        # 追加すると予算を超える場合は先に送る
+        if self._buffer and self._buffer_cost + cost > self.token_budget:
+            self.flush()
+
+        self._buffer.append((applicant_data, future))
+        self._buffer_cost += cost
+
+        if len(self._buffer) >= self.max_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.flush_interval, self.flush)
+
+        return await future
+
+    def flush(self) -> None:
+        """バッファ中の応募者の評価を開始"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._buffer:
+            return
+
+        pack, self._buffer = self._buffer, []
+        self._buffer_cost = 0
+        task = asyncio.get_running_loop().create_task(self._evaluate_pack(pack))
+        self._pack_tasks.add(task)
+        task.add_done_callback(self._pack_tasks.discard)
+
+    def close(self) -> None:
+        """未評価の依頼と実行中の評価を破棄（処理中断時用）"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for _, future in self._buffer:
+            if not future.done():
+                future.cancel()
+        self._buffer = []
+        self._buffer_cost = 0
+        for task in self._pack_tasks:
+            task.cancel()
+
+    async def _evaluate_pack(self, pack: List[Tuple[ApplicantData, asyncio.Future]]) -> None:
+        try:
+            async with self.slots or contextlib.nullcontext():
+                applicants = [applicant_data for applicant_data, _ in pack]
+                if len(pack) == 1:
+                    results = [None]
+                else:
+                    results = await self.ai_service.evaluate_pack(
+                        applicants, self.skill_ratio, self.mindset_ratio, priority=self.priority
+                    )
+
+                # 成功した応答から漏れた応募者だけ個別に評価（1人だけの場合も通常の評価）
+                retry_indexes = [i for i, result in enumerate(results) if result is None]
+                retried = await asyncio.gather(*(
+                    self.ai_service.evaluate_applicant(
+                        applicants[i], self.skill_ratio, self.mindset_ratio, priority=self.priority
+                    )
+                    for i in retry_indexes
+                ))
+                for i, result in zip(retry_indexes, retried):
+                    results[i] = result
+
+            for (_, future), result in zip(pack, results):
+                if not future.done():
+                    future.set_result(result)
+
+        except asyncio.CancelledError:
+            for _, future in pack:
+                if not future.done():
+                    future.cancel()
+            raise
+        except Exception as e:
+            for _, future in pack:
+                if not future.done():
+                    future.set_exception(e)
@@ -0,0 +1,127 @@
+import codecs
+import csv
+import io
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional
+from openpyxl import Workbook
+from app.utils.supabase_client import get_supabase
+
+# (出力列名, 取得列)
+EXPORT_COLUMNS = [
+    ("ID", "id"),
+    ("名前", "name"),
+    ("メール", "email"),
+    ("ステータス", "status"),
+    ("総合スコア", "total_score"),
+    ("スキルスコア", "skill_score"),
+    ("マインドセットスコア", "mindset_score"),
+    ("評価サマリー", "summary"),
+    ("作成日時", "created_at"),
+]
+
+# 出力に必要な列だけを取得（applicant_data/extracted_textは取得しない）
+EXPORT_SELECT = ",".join([
+    "id",
+    "name",
+    "email",
+    "status",
+    "created_at",
+    "total_score:evaluation->total_score",
+    "skill_score:evaluation->skill_score",
+    "mindset_score:evaluation->mindset_score",
+    "summary:evaluation->>summary",
+])
+
+EXPORT_PAGE_SIZE = 1000
+
+class ExportService:
+    """評価結果のエクスポート（ページ単位で取得しながら出力）"""
+
+    def iter_rows(
+        self,
+        status: Optional[str] = None,
+        min_score: Optional[float] = None,
+        page_size: int = EXPORT_PAGE_SIZE
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        評価済みの応募者をID順のキーセットページングで取得
+
+        statusとmin_scoreはDB側で絞り込む。
+        min_scoreはjsonbの数値として比較する（->>だと文字列比較になるため）。
+        """
+        supabase = get_supabase()
+        last_id = None
+
+        while True:
+            query = supabase.table("applicants").select(EXPORT_SELECT).not_.is_("evaluation", "null")
+            if status:
+                query = query.eq("status", status)
+            if min_score is not None:
+                query = query.gte("evaluation->total_score", min_score)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+
+            response = query.order("id").limit(page_size).execute()
+            rows = response.data
+            if not rows:
+                return
+
+            yield from rows
+
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]["id"]
+
+    def iter_csv(self, rows: Iterator[Dict[str, Any]], chunk_rows: int = 500) -> Iterator[bytes]:
+        """CSVを分割して出力（Excelで文字化けしないようUTF-8 BOM付き）"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        writer.writerow([header for header, _ in EXPORT_COLUMNS])
+        yield codecs.BOM_UTF8 + self._take(buffer)
+
+        count = 0
+        for row in rows:
+            writer.writerow(self._to_values(row))
+            count += 1
+            if count % chunk_rows == 0:
+                yield self._take(buffer)
+
+        rest = self._take(buffer)
+        if rest:
+            yield rest
+
+    def iter_xlsx(self, rows: Iterator[Dict[str, Any]], chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """write-onlyモードでXLSXを作成し、一時ファイルから分割して出力"""
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("評価結果")
+        sheet.append([header for header, _ in EXPORT_COLUMNS])
+        for row in rows:
+            sheet.append(self._to_values(row))
+
+        # 大きい場合はディスクに退避される
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as output:
+            workbook.save(output)
+            output.seek(0)
+            while True:
+                chunk = output.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _to_values(self, row: Dict[str, Any]) -> List[Any]:
+        values = []
+        for _, key in EXPORT_COLUMNS:
+            value = row.get(key)
+            if key.endswith("_score") and value is None:
+                value = 0
+            elif value is None:
+                value = ""
+            values.append(value)
+        return values
+
+    def _take(self, buffer: io.StringIO) -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return data
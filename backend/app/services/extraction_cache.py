@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from app.utils.cache import TieredCache
+from app.utils.config import settings
+
+# ファイルを読む単位（パス指定のハッシュ計算用）
+_READ_CHUNK_SIZE = 1024 * 1024
+
+def content_hash(source: Union[str, bytes]) -> str:
+    """ファイルの内容（バイト、またはファイルパス）のSHA-256"""
+    digest = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    else:
+        digest.update(source)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """
+    ファイルから抽出したテキスト（OCR結果）のキャッシュ
+
+    ファイル内容のSHA-256と抽出処理のバージョン（抽出結果に影響する設定を含む）をキーにする。
+    同じファイルの再アップロード・再抽出では、画像変換・OCR（Vision APIの課金）を行わずに結果を返す。
+    SQLiteに保持する合計サイズはEXTRACTION_CACHE_MAX_BYTESまで（超えたら最終アクセスが古い順に削除）。
+    """
+
+    def __init__(self, cache: TieredCache = None):
+        self.cache = cache or TieredCache(
+            "extraction_cache.sqlite3",
+            memory_entries=settings.extraction_cache_memory_entries,
+            max_entries=settings.extraction_cache_max_entries,
+            ttl_seconds=settings.extraction_cache_ttl_seconds,
+            max_bytes=settings.extraction_cache_max_bytes
+        )
+
+    @staticmethod
+    def make_key(digest: str, extractor: str, version: str) -> str:
+        return f"{extractor}:{version}:{digest}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """キャッシュを参照（SQLiteを同期で読むので、スレッドから呼び出す）"""
+        return self.cache.get(key)
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        """キャッシュに保存（SQLiteに同期で書き込むので、スレッドから呼び出す）"""
+        self.cache.set(key, result)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+_instance: Optional[ExtractionCache] = None
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """プロセス内で共有する抽出キャッシュを取得（無効な場合はNone）"""
+    global _instance
+    if not settings.extraction_cache_enabled:
+        return None
+    if _instance is None:
+        _instance = ExtractionCache()
+    return _instance
+
+async def extract_with_cache(
+    source: Union[str, bytes],
+    extractor: str,
+    version: str,
+    extract: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """
+    抽出キャッシュにあればその結果を、なければextractの結果を返す（結果にcachedを付ける）
+
+    失敗した結果と、一部のページを抽出できなかった結果（pagesにerrorを含む）はキャッシュしない
+    （認証情報の設定後・障害の回復後に再抽出する）。
+    """
+    cache, key, cached = await _lookup(source, extractor, version)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    result = await extract()
+    await _store(cache, key, result)
+    return {**result, "cached": False}
+
+async def stream_with_cache(
+    source: Union[str, bytes],
+    extractor: str,
+    version: str,
+    iterate: Callable[[], AsyncIterator[Dict[str, Any]]],
+    summarize: Callable[[List[Dict[str, Any]]], Dict[str, Any]],
+    chunks_key: str = "pages"
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    ページ・セクションごとの抽出結果を順に返す（抽出キャッシュにあればキャッシュの内容を返す）
+
+    最後まで読み進めた場合だけ、summarizeでまとめた結果をextract_with_cacheと同じキーで保存する。
+    保存用に保持するのはキャッシュが有効な場合だけで、テキストの合計がEXTRACTION_CACHE_MAX_ENTRY_BYTESを
+    超えた時点で保持をやめる（その結果はキャッシュしない）。
+    """
+    cache, key, cached = await _lookup(source, extractor, version)
+    if cached is not None:
+        for chunk in cached.get(chunks_key, []):
+            yield chunk
+        return
+
+    chunks: Optional[List[Dict[str, Any]]] = [] if cache is not None else None
+    size = 0
+    async for chunk in iterate():
+        if chunks is not None:
+            size += len(chunk.get("text", "").encode("utf-8"))
+            if size > settings.extraction_cache_max_entry_bytes:
+                chunks = None
+            else:
+                chunks.append(chunk)
+        yield chunk
+    if chunks is not None:
+        await _store(cache, key, summarize(chunks))
+
+async def _lookup(
+    source: Union[str, bytes],
+    extractor: str,
+    version: str
+) -> Tuple[Optional[ExtractionCache], Optional[str], Optional[Dict[str, Any]]]:
+    cache = get_extraction_cache()
+    if cache is None:
+        return None, None, None
+
+    def lookup() -> Tuple[str, Optional[Dict[str, Any]]]:
+        key = cache.make_key(content_hash(source), extractor, version)
+        return key, cache.get(key)
+
+    # ハッシュの計算（ファイル全体の読み込み）とSQLiteの参照はスレッドで行う
+    key, cached = await asyncio.to_thread(lookup)
+    return cache, key, cached
+
+async def _store(cache: Optional[ExtractionCache], key: Optional[str], result: Dict[str, Any]) -> None:
+    if cache is None or key is None:
+        return
+    if result.get("success") and not any(page.get("error") for page in result.get("pages", [])):
+        # JSONへの変換とSQLiteへの書き込みはスレッドで行う
+        await asyncio.to_thread(cache.set, key, result)
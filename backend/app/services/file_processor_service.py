@@ -1,11 +1,85 @@
-import os
 import io
-from typing import Dict, Any, Optional
-from docx import Document
-import PyPDF2
-import csv
-from app.models.applicant import ApplicantData, SelectionStage
+from typing import Dict, Any, AsyncIterator, List, Optional
+from app.models.applicant import SelectionStage
+from app.services.document_parsers import DocumentSource, parse_word_sections
+from app.services.extraction_cache import extract_with_cache, stream_with_cache
+from app.services.ocr_service import get_ocr_service
+from app.utils.csv_stream import iter_csv_rows
+from app.utils.json_response import (
+    NUMBER_SCHEMA,
+    STRING_SCHEMA,
+    JSONResponseError,
+    array_schema,
+    json_generation_config,
+    object_schema,
+    parse_json,
+)
+from app.utils.llm_client import LLMClient, get_llm_client
 from app.utils.config import settings
+from app.utils.process_pool import get_process_pool
+from app.utils.prompt_budget import PAGE_BREAK, prepare_document_text
+from app.utils.tokens import estimate_tokens
+from app.utils.upload import as_file_path
+
+# 応募者データの構造化結果の応答スキーマ（構造化・仕分け・取り込みで共通）
+APPLICANT_DATA_SCHEMA = object_schema(
+    {
+        "name": STRING_SCHEMA,
+        "email": STRING_SCHEMA,
+        "phone": STRING_SCHEMA,
+        "education": array_schema(object_schema({
+            "institution": STRING_SCHEMA, "degree": STRING_SCHEMA, "field": STRING_SCHEMA, "year": STRING_SCHEMA
+        })),
+        "work_experience": array_schema(object_schema({
+            "company": STRING_SCHEMA, "position": STRING_SCHEMA, "duration": STRING_SCHEMA, "description": STRING_SCHEMA
+        })),
+        "technical_skills": array_schema(STRING_SCHEMA),
+        "soft_skills": array_schema(STRING_SCHEMA),
+        "certifications": array_schema(STRING_SCHEMA),
+        "motivation": STRING_SCHEMA,
+        "career_goals": STRING_SCHEMA,
+        "additional_info": STRING_SCHEMA,
+    },
+    ["name", "email"]
+)
+
+CATEGORIZATION_SCHEMA = object_schema(
+    {
+        "applicant_data": APPLICANT_DATA_SCHEMA,
+        "recommended_stage": {
+            "type": "string",
+            "enum": [stage.value for stage in (
+                SelectionStage.DOCUMENT_SCREENING, SelectionStage.FIRST_INTERVIEW,
+                SelectionStage.SECOND_INTERVIEW, SelectionStage.REJECTED
+            )]
+        },
+        "recommendation_reason": STRING_SCHEMA,
+        "missing_info": array_schema(STRING_SCHEMA),
+        "quality_score": NUMBER_SCHEMA,
+        "auto_actions": array_schema(object_schema({"action": STRING_SCHEMA, "description": STRING_SCHEMA})),
+    },
+    ["applicant_data", "recommended_stage", "recommendation_reason", "missing_info"]
+)
+
+# Word抽出処理のバージョン（抽出結果が変わる変更をしたら更新する。抽出キャッシュのキーに含まれる）
+WORD_EXTRACTOR_VERSION = "2"
+
+WORD_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Wordから抽出したテキストの信頼度
+WORD_CONFIDENCE = 0.95
+
+# 取り込みで読み込むテキストの上限（PROMPT_DOCUMENT_TOKEN_BUDGETに対する倍率。ヘッダー・フッターの除去で減る分を見込む）
+DOCUMENT_READ_BUDGET_FACTOR = 2
+
+def _summarize_word(sections: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "text": "".join(section["text"] for section in sections),
+        "page_count": len(sections),
+        "confidence": WORD_CONFIDENCE,
+        "sections": sections
+    }
 
 class FileProcessorService:
     """ファイル処理サービス（PDF, Word, CSV対応）"""
@@ -13,12 +87,12 @@ class FileProcessorService:
     def __init__(self):
         pass
     
-    async def process_file(self, file_content: bytes, filename: str, file_type: str) -> Dict[str, Any]:
+    async def process_file(self, file_content: DocumentSource, filename: str, file_type: str) -> Dict[str, Any]:
         """
         ファイルを処理してテキストを抽出
         
         Args:
-            file_content: ファイルの内容（バイト）
+            file_content: ファイルの内容（バイト）、またはファイルのパス（大きいファイルはパスで渡すとメモリにコピーしない）
             filename: ファイル名
             file_type: ファイルタイプ（application/pdf, application/vnd.openxmlformats-officedocument.wordprocessingml.document, text/csv）
         
@@ -28,7 +102,7 @@ class FileProcessorService:
         try:
             if file_type == "application/pdf" or filename.endswith('.pdf'):
                 return await self._process_pdf(file_content)
-            elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document" or filename.endswith('.docx'):
+            elif file_type == WORD_CONTENT_TYPE or filename.endswith('.docx'):
                 return await self._process_word(file_content)
             elif file_type == "text/csv" or filename.endswith('.csv'):
                 return await self._process_csv(file_content)
@@ -43,62 +117,137 @@ class FileProcessorService:
                 "error": str(e)
             }
     
-    async def _process_pdf(self, file_content: bytes) -> Dict[str, Any]:
-        """PDFファイルを処理"""
+    def iter_document(self, file_content: DocumentSource, filename: str, file_type: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        PDF・Wordファイルのテキストをページ（PDF）・セクション（Word）ごとに順に返す
+        
+        最初のページから構造化・検索用の処理を始められ、十分なテキストが集まった時点で
+        読むのをやめられる。最後まで読んだ結果は抽出キャッシュに保存される。
+        
+        Yields:
+            PDF: {"page", "text", "confidence", "source"} / Word: {"section", "text"}
+        
+        Raises:
+            ValueError: PDF・Word以外のファイルの場合
+        """
+        if file_type == "application/pdf" or filename.endswith('.pdf'):
+            return get_ocr_service().iter_pdf_pages(file_content)
+        if file_type == WORD_CONTENT_TYPE or filename.endswith('.docx'):
+            return stream_with_cache(
+                file_content, "docx", WORD_EXTRACTOR_VERSION,
+                lambda: self._iter_word_sections(file_content), _summarize_word, chunks_key="sections"
+            )
+        raise ValueError(f"サポートされていないファイル形式です: {file_type}")
+    
+    async def extract_document_text(
+        self,
+        file_content: DocumentSource,
+        filename: str,
+        file_type: str,
+        max_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        PDF・Wordからプロンプト用のテキストを抽出（取り込み用）
+        
+        iter_documentでページ・セクション順に読み、テキストのトークン数の見込みがmax_tokensに達した時点で
+        残りを読まない（以降のページのOCRを行わない）。プロンプトには先頭と末尾を残して圧縮されるので、
+        長い書類は読み込んだ範囲の先頭と末尾が残る。
+        
+        Args:
+            max_tokens: 読み込むテキストの上限（未指定時はPROMPT_DOCUMENT_TOKEN_BUDGETのDOCUMENT_READ_BUDGET_FACTOR倍。0以下で全体）
+        
+        Returns:
+            success, text, confidence（ページの平均）, page_count（読み込んだページ・セクション数）,
+            truncated（途中で読むのをやめたか）, error
+        """
+        if max_tokens is None:
+            max_tokens = settings.prompt_document_token_budget * DOCUMENT_READ_BUDGET_FACTOR
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-            
-            extracted_text = ""
-            for page in pdf_reader.pages:
-                extracted_text += page.extract_text() + "\n\n"
-            
+            chunks = self.iter_document(file_content, filename, file_type)
+        except ValueError as e:
+            return {"success": False, "error": str(e)}
+        
+        is_pdf = file_type == "application/pdf" or filename.endswith('.pdf')
+        texts = []
+        confidences = []
+        errors = []
+        tokens = 0
+        truncated = False
+        try:
+            async for chunk in chunks:
+                confidences.append(chunk.get("confidence", WORD_CONFIDENCE))
+                if chunk.get("error"):
+                    errors.append(chunk["error"])
+                if chunk["text"]:
+                    texts.append(chunk["text"])
+                    tokens += estimate_tokens(chunk["text"])
+                if max_tokens > 0 and tokens >= max_tokens:
+                    truncated = True
+                    break
+        except Exception as e:
             return {
-                "success": True,
-                "text": extracted_text,
-                "page_count": len(pdf_reader.pages),
-                "confidence": 0.9
+                "success": False,
+                "error": f"{'PDF' if is_pdf else 'Word'}処理エラー: {str(e)}"
             }
-        except Exception as e:
+        finally:
+            # 途中でやめた場合は先読み中の抽出をキャンセルする
+            await chunks.aclose()
+        
+        if not texts:
             return {
                 "success": False,
-                "error": f"PDF処理エラー: {str(e)}"
+                "error": errors[0] if errors else "ファイルからテキストを抽出できませんでした"
             }
+        return {
+            "success": True,
+            # PDFはページの区切りを残す（プロンプト用の圧縮でヘッダー・フッターの判定に使う）
+            "text": (PAGE_BREAK if is_pdf else "").join(texts),
+            "confidence": sum(confidences) / len(confidences),
+            "page_count": len(confidences),
+            "truncated": truncated
+        }
     
-    async def _process_word(self, file_content: bytes) -> Dict[str, Any]:
-        """Wordファイルを処理"""
-        try:
-            doc = Document(io.BytesIO(file_content))
-            
-            extracted_text = ""
-            for paragraph in doc.paragraphs:
-                extracted_text += paragraph.text + "\n"
-            
-            # テーブルも処理
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        extracted_text += cell.text + "\t"
-                    extracted_text += "\n"
-            
+    async def _process_pdf(self, file_content: DocumentSource) -> Dict[str, Any]:
+        """PDFファイルを処理（テキストレイヤーのないページだけOCR）"""
+        if isinstance(file_content, str):
+            result = await get_ocr_service().extract_text_from_pdf(file_content)
+        else:
+            result = await get_ocr_service().extract_text_from_pdf_bytes(file_content)
+        if not result["success"]:
             return {
-                "success": True,
-                "text": extracted_text,
-                "page_count": len(doc.paragraphs),
-                "confidence": 0.95
+                "success": False,
+                "error": f"PDF処理エラー: {result['error']}"
             }
+        return result
+    
+    async def _process_word(self, file_content: DocumentSource) -> Dict[str, Any]:
+        """Wordファイルを処理（同じ内容のファイルの結果は抽出キャッシュから返す）"""
+        return await extract_with_cache(
+            file_content, "docx", WORD_EXTRACTOR_VERSION, lambda: self._extract_word(file_content)
+        )
+
+    async def _extract_word(self, file_content: DocumentSource) -> Dict[str, Any]:
+        try:
+            return _summarize_word([section async for section in self._iter_word_sections(file_content)])
         except Exception as e:
             return {
                 "success": False,
                 "error": f"Word処理エラー: {str(e)}"
             }
     
-    async def _process_csv(self, file_content: bytes) -> Dict[str, Any]:
+    async def _iter_word_sections(self, file_content: DocumentSource) -> AsyncIterator[Dict[str, Any]]:
+        # docxの解析（CPU処理なので別プロセスで実行）。docxは全体を読まないと解析できないため、1回の解析で全セクションを取り出す
+        async with as_file_path(file_content, ".docx") as path:
+            sections = await get_process_pool().run(parse_word_sections, path)
+        for section in sections:
+            yield section
+    
+    async def _process_csv(self, file_content: DocumentSource) -> Dict[str, Any]:
         """CSVファイルを処理"""
         try:
-            csv_text = file_content.decode('utf-8')
-            csv_reader = csv.DictReader(io.StringIO(csv_text))
-            
-            rows = list(csv_reader)
+            # デコード済みの全文やStringIOを作らず、チャンク単位で解析（Shift_JISも自動判定）
+            with (open(file_content, "rb") if isinstance(file_content, str) else io.BytesIO(file_content)) as stream:
+                rows = list(iter_csv_rows(stream))
             
             # CSVの場合は行ごとに処理
             return {
@@ -116,8 +265,8 @@ class FileProcessorService:
 class AICategorizationService:
     """AI自動仕分けサービス"""
     
-    def __init__(self):
-        pass
+    def __init__(self, llm: LLMClient = None):
+        self.llm = llm or get_llm_client()
     
     async def categorize_and_format(self, extracted_text: str) -> Dict[str, Any]:
         """
@@ -129,17 +278,7 @@ class AICategorizationService:
         Returns:
             仕分け結果と整形されたデータ
         """
-        from vertexai.generative_models import GenerativeModel
-        import vertexai
-        import json
-        import os
-        
         try:
-            os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = settings.google_application_credentials
-            vertexai.init(project=settings.google_cloud_project_id, location="us-central1")
-            
-            model = GenerativeModel("gemini-1.5-flash")
-            
             prompt = f"""
 以下は応募書類から抽出されたテキストです。このテキストを分析し、以下の作業を行ってください：
 
@@ -148,7 +287,7 @@ class AICategorizationService:
 3. 不足している情報のリスト化
 
 【抽出テキスト】
-{extracted_text}
+{prepare_document_text(extracted_text)}
 
 【出力形式】
 以下のJSON形式で出力してください：
@@ -183,31 +322,29 @@ class AICategorizationService:
 - rejected: 明らかに基準に達していない
 """
 
-            response = model.generate_content(prompt)
-            result_text = response.text
+            result_text = await self.llm.generate(
+                prompt,
+                generation_config=json_generation_config(CATEGORIZATION_SCHEMA),
+                purpose="categorization"
+            )
             
             # JSONパース
-            if "```json" in result_text:
-                json_start = result_text.find("```json") + 7
-                json_end = result_text.find("```", json_start)
-                result_text = result_text[json_start:json_end].strip()
-            elif "```" in result_text:
-                json_start = result_text.find("```") + 3
-                json_end = result_text.find("```", json_start)
-                result_text = result_text[json_start:json_end].strip()
-            
-            result = json.loads(result_text)
+            result = parse_json(result_text)
+            if not isinstance(result, dict):
+                raise JSONResponseError("応答がJSONオブジェクトではありません")
             
             return {
                 "success": True,
+                "degraded": False,
                 "data": result
             }
             
         except Exception as e:
             print(f"AI仕分けエラー: {str(e)}")
-            # エラー時はデフォルト値を返す
+            # エラー時はデフォルト値を返す（degraded: 保存せず手動確認・再実行の対象）
             return {
                 "success": False,
+                "degraded": True,
                 "error": str(e),
                 "data": {
                     "applicant_data": {},
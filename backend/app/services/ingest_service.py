@@ -0,0 +1,297 @@
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional
+from app.models.applicant import ApplicantData, ApplicationStatus, IngestResult, SelectionStage
+from pydantic import ValidationError
+from app.services.ai_evaluation_service import (
+    AIEvaluationService,
+    EVALUATION_CRITERIA,
+    EVALUATION_OUTPUT_FORMAT,
+    EVALUATION_SCHEMA,
+    MAX_OUTPUT_TOKENS,
+)
+from app.services.applicant_writer import BulkApplicantWriter
+from app.services.document_parsers import DocumentSource
+from app.services.file_processor_service import (
+    APPLICANT_DATA_SCHEMA,
+    CATEGORIZATION_SCHEMA,
+    FileProcessorService,
+)
+from app.utils.config import settings
+from app.utils.json_response import (
+    STRING_SCHEMA,
+    JSONResponseError,
+    array_schema,
+    json_generation_config,
+    object_schema,
+    parse_json,
+    validate_model,
+)
+from app.utils.llm_client import LLMClient, get_llm_client
+from app.utils.prompt_budget import prepare_document_text
+from app.utils.rate_limiter import Priority
+from app.utils.single_flight import flight_key, get_single_flight
+
+APPLICANT_DATA_FORMAT = """{
+  "name": "氏名",
+  "email": "メールアドレス",
+  "phone": "電話番号",
+  "education": [{"institution": "学校名", "degree": "学位", "field": "専攻", "year": "卒業年"}],
+  "work_experience": [{"company": "会社名", "position": "役職", "duration": "期間", "description": "業務内容"}],
+  "technical_skills": ["スキル1", "スキル2"],
+  "soft_skills": ["スキル1", "スキル2"],
+  "certifications": ["資格1", "資格2"],
+  "motivation": "志望動機（抽出できた場合）",
+  "career_goals": "キャリア目標（抽出できた場合）",
+  "additional_info": "その他の情報"
+}"""
+
+INGEST_SCHEMA = object_schema(
+    {
+        "applicant_data": APPLICANT_DATA_SCHEMA,
+        "recommended_stage": CATEGORIZATION_SCHEMA["properties"]["recommended_stage"],
+        "recommendation_reason": STRING_SCHEMA,
+        "missing_info": array_schema(STRING_SCHEMA),
+        "evaluation": EVALUATION_SCHEMA,
+    },
+    ["applicant_data", "recommended_stage", "recommendation_reason", "missing_info", "evaluation"]
+)
+
+class IngestService:
+    """
+    履歴書の取り込み（構造化・選考ステージ推奨・不足情報の抽出・評価）を1回のLLM呼び出しで行うサービス
+
+    応答はIngestResultのスキーマで検証し、評価部分だけが不完全な場合は構造化済みデータを使って
+    評価のみ再実行する。構造化できなかった場合はdegradedな結果を返す（保存しない）。
+    """
+
+    def __init__(
+        self,
+        llm: LLMClient = None,
+        ai_service: AIEvaluationService = None,
+        file_processor: FileProcessorService = None
+    ):
+        self.llm = llm or get_llm_client()
+        self.ai_service = ai_service or AIEvaluationService(llm=self.llm)
+        self.file_processor = file_processor or FileProcessorService()
+
+    async def ingest_file(
+        self,
+        file_content: DocumentSource,
+        filename: str,
+        content_type: str,
+        skill_ratio: float = None,
+        mindset_ratio: float = None,
+        priority: Priority = Priority.INTERACTIVE
+    ) -> IngestResult:
+        """
+        履歴書ファイル（PDF / Word。内容またはファイルのパス）からテキストを抽出して取り込む
+
+        プロンプトに入る分のテキストが集まった時点で残りのページは読まない（OCRしない）。
+
+        Raises:
+            ValueError: テキストを抽出できないファイルの場合
+        """
+        extracted = await self.file_processor.extract_document_text(file_content, filename, content_type)
+        if not extracted.get("success") or not extracted.get("text", "").strip():
+            raise ValueError(extracted.get("error") or "ファイルからテキストを抽出できませんでした")
+
+        return await self.ingest_text(
+            extracted["text"],
+            skill_ratio=skill_ratio,
+            mindset_ratio=mindset_ratio,
+            ocr_confidence=extracted.get("confidence", 0.0),
+            priority=priority
+        )
+
+    async def ingest_text(
+        self,
+        extracted_text: str,
+        skill_ratio: float = None,
+        mindset_ratio: float = None,
+        ocr_confidence: float = 0.0,
+        priority: Priority = Priority.INTERACTIVE
+    ) -> IngestResult:
+        """抽出済みテキストを取り込む（同じテキスト・比率の取り込みが実行中ならその結果を待つ）"""
+        if skill_ratio is None:
+            skill_ratio = settings.default_skill_ratio
+        if mindset_ratio is None:
+            mindset_ratio = settings.default_mindset_ratio
+
+        key = flight_key("ingest", None, extracted_text, skill_ratio, mindset_ratio)
+        return await get_single_flight().do(
+            key,
+            lambda: self._ingest(extracted_text, skill_ratio, mindset_ratio, ocr_confidence, priority)
+        )
+
+    async def save(
+        self,
+        result: IngestResult,
+        applicant_id: Optional[str] = None,
+        writer: Optional[BulkApplicantWriter] = None
+    ) -> str:
+        """
+        取り込み結果を応募者として保存し、応募者IDを返す（degradedな結果は保存しない）
+
+        writerを指定すると他の保存とまとめて書き込む（一括取り込み用）
+        """
+        if result.evaluation.degraded:
+            raise ValueError("AI評価できなかった取り込み結果は保存できません")
+
+        applicant_id = applicant_id or str(uuid.uuid4())
+        now = datetime.utcnow().isoformat()
+        await (writer or BulkApplicantWriter(chunk_size=1)).write({
+            "id": applicant_id,
+            "created_at": now,
+            "updated_at": now,
+            "name": result.applicant_data.name,
+            "email": result.applicant_data.email,
+            "phone": result.applicant_data.phone,
+            "applicant_data": result.applicant_data.model_dump(),
+            "evaluation": result.evaluation.model_dump(mode="json"),
+            "status": ApplicationStatus.SCREENING.value
+        })
+        return applicant_id
+
+    def to_response(self, result: IngestResult, applicant_id: Optional[str] = None) -> Dict[str, Any]:
+        """APIレスポンス用のdict"""
+        return {
+            "applicant_id": applicant_id,
+            **result.model_dump(mode="json", exclude={"applicant_data": {"extracted_text"}})
+        }
+
+    async def _ingest(
+        self,
+        extracted_text: str,
+        skill_ratio: float,
+        mindset_ratio: float,
+        ocr_confidence: float,
+        priority: Priority
+    ) -> IngestResult:
+        if not self.llm.available:
+            return self._degraded_result(
+                extracted_text, ocr_confidence, skill_ratio, mindset_ratio,
+                "AI評価は無効です。Google Cloudの認証情報を設定してください。"
+            )
+
+        prompt = self._build_ingest_prompt(extracted_text, skill_ratio, mindset_ratio)
+        try:
+            result_text = await self.llm.generate(
+                prompt,
+                generation_config=json_generation_config(INGEST_SCHEMA, max_output_tokens=MAX_OUTPUT_TOKENS),
+                priority=priority,
+                purpose="ingest"
+            )
+        except Exception as e:
+            print(f"取り込みエラー: {str(e)}")
+            return self._degraded_result(
+                extracted_text, ocr_confidence, skill_ratio, mindset_ratio,
+                f"取り込み処理中にエラーが発生しました: {str(e)}"
+            )
+
+        try:
+            # スコアを保存するため、途中で切れた応答は補修せず失敗として扱う
+            data = parse_json(result_text, allow_repair=False)
+            if not isinstance(data, dict):
+                raise JSONResponseError("応答がJSONオブジェクトではありません")
+            # 見つからなかった項目はnullで返ることがあるので既定値に任せる
+            applicant_data = validate_model(
+                data.get("applicant_data"),
+                ApplicantData,
+                defaults={"name": "", "email": ""},
+                extracted_text=extracted_text,
+                ocr_confidence=ocr_confidence
+            )
+        except (JSONResponseError, ValidationError) as e:
+            print(f"取り込み結果の構造化データを解析できませんでした: {str(e)}")
+            return self._degraded_result(
+                extracted_text, ocr_confidence, skill_ratio, mindset_ratio,
+                "AIの応答を解析できませんでした。再度取り込んでください。"
+            )
+
+        try:
+            stage = SelectionStage(data.get("recommended_stage") or SelectionStage.DOCUMENT_SCREENING.value)
+        except ValueError:
+            stage = SelectionStage.DOCUMENT_SCREENING
+
+        llm_calls = 1
+        evaluation = self.ai_service.parse_evaluation_data(data.get("evaluation"), skill_ratio, mindset_ratio)
+        if evaluation is None:
+            # 評価部分だけ不完全な場合は、構造化済みデータで評価のみやり直す
+            evaluation = await self.ai_service.evaluate_applicant(
+                applicant_data, skill_ratio, mindset_ratio, priority=priority
+            )
+            llm_calls += 1
+        else:
+            # 以降の再評価（同じデータ・比率）がキャッシュに当たるようにする
+            await self.ai_service.store_in_cache(applicant_data, skill_ratio, mindset_ratio, evaluation)
+
+        evaluation = evaluation.model_copy(update={"recommended_stage": stage})
+
+        return IngestResult(
+            applicant_data=applicant_data,
+            evaluation=evaluation,
+            recommended_stage=stage,
+            recommendation_reason=data.get("recommendation_reason") or "",
+            missing_info=[str(item) for item in data.get("missing_info") or []],
+            llm_calls=llm_calls
+        )
+
+    def _degraded_result(
+        self,
+        extracted_text: str,
+        ocr_confidence: float,
+        skill_ratio: float,
+        mindset_ratio: float,
+        summary: str
+    ) -> IngestResult:
+        return IngestResult(
+            applicant_data=ApplicantData(
+                name="",
+                email="",
+                extracted_text=extracted_text,
+                ocr_confidence=ocr_confidence
+            ),
+            evaluation=self.ai_service.degraded_result(skill_ratio, mindset_ratio, summary),
+            recommendation_reason="自動分析に失敗しました。手動で確認してください。",
+            llm_calls=0
+        )
+
+    def _build_ingest_prompt(self, extracted_text: str, skill_ratio: float, mindset_ratio: float) -> str:
+        """構造化・ステージ推奨・評価をまとめて行うプロンプトを構築"""
+
+        return f"""
+あなたは採用評価の専門家です。以下は応募書類から抽出されたテキストです。このテキストを分析し、以下の作業を行ってください：
+
+1. 応募者データの構造化
+2. 適切な選考ステージの推奨
+3. 不足している情報のリスト化
+4. スキルとマインドセットの両面からの評価
+
+【評価比率】
+- スキル評価: {skill_ratio * 100}%
+- マインドセット評価: {mindset_ratio * 100}%
+
+【抽出テキスト】
+{prepare_document_text(extracted_text)}
+{EVALUATION_CRITERIA}
+【選考ステージの選び方】
+- document_screening: 書類のみで評価が必要
+- first_interview: 書類は良好、一次面接へ進める
+- second_interview: 優秀な候補者、二次面接から開始
+- rejected: 明らかに基準に達していない
+
+【出力形式】
+以下のJSON形式で出力してください（情報が見つからない場合は空配列や空文字列を使用）：
+
+{{
+  "applicant_data": {APPLICANT_DATA_FORMAT},
+  "recommended_stage": "document_screening / first_interview / second_interview / rejected",
+  "recommendation_reason": "推奨理由（1-2文）",
+  "missing_info": ["不足している情報1", "不足している情報2"],
+  "evaluation": {EVALUATION_OUTPUT_FORMAT}
+}}
+
+※ skill_score、mindset_scoreは各カテゴリーの平均点
+※ total_scoreは (skill_score × {skill_ratio}) + (mindset_score × {mindset_ratio})
+"""
@@ -1,30 +1,36 @@
-from google.cloud import aiplatform
-import vertexai
-from vertexai.generative_models import GenerativeModel
 from typing import List, Dict, Any
-from app.models.applicant import EvaluationResult, ApplicantData
+from pydantic import ValidationError
+from app.models.applicant import EvaluationResult, ApplicantData, InterviewQuestionSet
 from app.utils.config import settings
-import json
-import os
+from app.utils.json_response import (
+    STRING_SCHEMA,
+    JSONResponseError,
+    array_schema,
+    json_generation_config,
+    object_schema,
+    parse_model,
+)
+from app.utils.llm_client import LLMClient, get_llm_client
+from app.utils.prompt_budget import truncate_to_budget
+
+QUESTIONS_SCHEMA = object_schema(
+    {"questions": array_schema(object_schema(
+        {"question": STRING_SCHEMA, "category": STRING_SCHEMA, "intent": STRING_SCHEMA},
+        ["question", "category", "intent"]
+    ))},
+    ["questions"]
+)
 
 class InterviewService:
-    def __init__(self):
-        self.model = None
-        if settings.google_cloud_project_id and settings.google_application_credentials:
-            try:
-                os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = settings.google_application_credentials
-                vertexai.init(project=settings.google_cloud_project_id, location="us-central1")
-                self.model = GenerativeModel("gemini-1.5-flash")
-            except Exception as e:
-                print(f"Vertex AIの初期化に失敗しました: {e}")
-                self.model = None
+    def __init__(self, llm: LLMClient = None):
+        self.llm = llm or get_llm_client()
 
     async def generate_interview_questions(
         self,
         applicant_data: ApplicantData,
         evaluation: EvaluationResult,
         question_count: int = 10
-    ) -> List[str]:
+    ) -> Dict[str, Any]:
         """
         マインドセット重視の一次面接質問を生成
 
@@ -34,22 +40,31 @@ class InterviewService:
             question_count: 生成する質問数
 
         Returns:
-            面接質問のリスト
+            {"questions": 面接質問のリスト, "degraded": AI生成できずデフォルトの質問を返した場合True}
         """
-        if not self.model:
+        if not self.llm.available:
             print("Vertex AIが初期化されていないため、デフォルトの質問を返します。")
-            return self._get_default_questions()
+            return self._degraded_questions(question_count)
 
         prompt = self._build_interview_prompt(applicant_data, evaluation, question_count)
 
         try:
-            response = self.model.generate_content(prompt)
-            questions = self._parse_questions_response(response.text)
-            return questions[:question_count]  # 指定数に制限
+            response_text = await self.llm.generate(
+                prompt,
+                generation_config=json_generation_config(QUESTIONS_SCHEMA),
+                purpose="interview_questions"
+            )
+            questions = self._parse_questions_response(response_text)
+            if not questions:
+                return self._degraded_questions(question_count)
+            return {"questions": questions[:question_count], "degraded": False}  # 指定数に制限
 
         except Exception as e:
             print(f"質問生成エラー: {str(e)}")
-            return self._get_default_questions()
+            return self._degraded_questions(question_count)
+
+    def _degraded_questions(self, question_count: int) -> Dict[str, Any]:
+        return {"questions": self._get_default_questions()[:question_count], "degraded": True}
 
     def _build_interview_prompt(
         self,
@@ -75,8 +90,8 @@ class InterviewService:
 
 【応募者情報】
 名前: {applicant_data.name}
-志望動機: {applicant_data.motivation}
-キャリア目標: {applicant_data.career_goals}
+志望動機: {truncate_to_budget(applicant_data.motivation, settings.prompt_field_token_budget)}
+キャリア目標: {truncate_to_budget(applicant_data.career_goals, settings.prompt_field_token_budget)}
 
 【評価結果サマリー】
 {evaluation.summary}
@@ -127,25 +142,13 @@ class InterviewService:
     def _parse_questions_response(self, response_text: str) -> List[str]:
         """Geminiからの応答をパースして質問リストに変換"""
         try:
-            # JSONブロックを抽出
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-            elif "```" in response_text:
-                json_start = response_text.find("```") + 3
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-
-            data = json.loads(response_text)
-
-            # 質問のみを抽出（カテゴリやintentは除外）
-            questions = [q["question"] for q in data.get("questions", [])]
-            return questions
-
-        except Exception as e:
+            data = parse_model(response_text, InterviewQuestionSet)
+        except (JSONResponseError, ValidationError) as e:
             print(f"質問パースエラー: {str(e)}")
-            return self._get_default_questions()
+            return []
+
+        # 質問のみを抽出（カテゴリやintentは除外）
+        return [q.question for q in data.questions if q.question.strip()]
 
     def _get_default_questions(self) -> List[str]:
         """デフォルトの面接質問"""
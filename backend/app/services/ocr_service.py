@@ -1,15 +1,59 @@
 from google.cloud import vision
-from typing import Dict, Any
+from collections import deque
+from typing import Dict, Any, AsyncIterator, List
+import asyncio
 import io
-from PIL import Image
-import PyPDF2
-from pdf2image import convert_from_path
+from app.services.document_parsers import PDFSource, pdf_page_count, read_text_layer, render_page_images
+from app.services.extraction_cache import extract_with_cache, stream_with_cache
 from app.utils.config import settings
+from app.utils.process_pool import get_process_pool
+from app.utils.prompt_budget import PAGE_BREAK
+from app.utils.upload import as_file_path
 import os
 
+# PDF抽出処理のバージョン（抽出結果が変わる変更をしたら更新する。抽出キャッシュのキーに含まれる）
+PDF_EXTRACTOR_VERSION = "3"
+
+# Vision APIの1リクエストに含められる画像数の上限
+MAX_IMAGES_PER_REQUEST = 16
+# 信頼度が返されない場合の値
+DEFAULT_CONFIDENCE = 0.9
+# PDFのテキストレイヤーから取り出したページの信頼度
+TEXT_LAYER_CONFIDENCE = 0.95
+
+OCR_UNAVAILABLE_MESSAGE = "OCRサービスが初期化されていません。Google Cloudの認証情報を設定してください。"
+
+def pdf_extractor_version() -> str:
+    """抽出キャッシュ用のバージョン（抽出結果に影響する設定を含む）"""
+    return ":".join(str(value) for value in (
+        PDF_EXTRACTOR_VERSION,
+        settings.pdf_min_text_chars,
+        settings.ocr_render_dpi,
+        settings.ocr_render_grayscale,
+        settings.ocr_image_format,
+        settings.ocr_image_quality,
+    ))
+
 class OCRService:
+    """
+    PDF・画像からのテキスト抽出（Google Vision APIによるOCR）
+
+    PDFはまずPyMuPDFでページごとにテキストレイヤーを読み、文字がほとんどない（スキャンされた）
+    ページだけを画像にしてOCRする。電子的に作成されたPDFはOCRを呼ばずに処理が終わる。
+
+    ページ画像はbatch_annotate_imagesでOCR_BATCH_SIZEページずつまとめて送り、
+    最大OCR_MAX_CONCURRENT_BATCHES件のリクエストを並行して実行する（同期クライアントはスレッドで呼び出し、
+    イベントループを塞がない）。結果はページ順に結合し、ページごとの信頼度も返す。
+    ページ画像はリクエストの直前にPyMuPDFで描画するため、同時に保持するのは実行中のリクエスト分の
+    画像だけになる。描画も別プロセスで行い、不正なPDFでワーカーが異常終了してもAPIのプロセスは落ちない。
+
+    iter_pdf_pagesはページ順に1ページずつ結果を返すので、呼び出し側は最初のページから処理を始められ、
+    十分なテキストが集まった時点で読むのをやめられる（先読み中のOCRはキャンセルされる）。
+    """
+
     def __init__(self):
         self.client = None
+        self._batch_slots = asyncio.Semaphore(max(1, settings.ocr_max_concurrent_batches))
         if settings.google_application_credentials:
             try:
                 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = settings.google_application_credentials
@@ -20,54 +64,141 @@ class OCRService:
 
     async def extract_text_from_pdf(self, pdf_path: str) -> Dict[str, Any]:
         """PDFからテキストを抽出"""
-        if not self.client:
-            return {
-                "text": "",
-                "confidence": 0.0,
-                "page_count": 0,
-                "success": False,
-                "error": "OCRサービスが初期化されていません。Google Cloudの認証情報を設定してください。"
-            }
+        return await self._extract_pdf(pdf_path)
+
+    async def extract_text_from_pdf_bytes(self, file_content: bytes) -> Dict[str, Any]:
+        """PDFの内容（バイト）からテキストを抽出"""
+        return await self._extract_pdf(file_content)
+
+    async def _extract_pdf(self, source: PDFSource) -> Dict[str, Any]:
+        """
+        テキストレイヤー優先でPDFからテキストを抽出（同じ内容のPDFの結果は抽出キャッシュから返す）
+
+        Returns:
+            text, confidence（ページの平均）, page_count, ocr_page_count（OCRしたページ数）,
+            pages（ページごとのtext・confidence・source（text_layer / ocr）・error）, cached, success
+        """
         try:
-            # PDFを画像に変換
-            images = convert_from_path(pdf_path)
+            return await extract_with_cache(
+                source, "pdf", pdf_extractor_version(), lambda: self._extract_pdf_uncached(source)
+            )
+        except OSError as e:
+            return self._pdf_failure(str(e))
 
-            all_text = []
-            total_confidence = 0.0
+    def iter_pdf_pages(self, source: PDFSource) -> AsyncIterator[Dict[str, Any]]:
+        """
+        PDFのページごとの抽出結果をページ順に返す（同じ内容のPDFは抽出キャッシュの内容を返す）
 
-            for i, image in enumerate(images):
-                # 画像をバイト配列に変換
-                img_byte_arr = io.BytesIO()
-                image.save(img_byte_arr, format='PNG')
-                img_byte_arr = img_byte_arr.getvalue()
+        Yields:
+            {"page", "text", "confidence", "source"（text_layer / ocr）, "error"（あれば）}
+        """
+        return stream_with_cache(
+            source, "pdf", pdf_extractor_version(), lambda: self._iter_pdf_pages(source), self._summarize_pdf
+        )
 
-                # Vision APIで画像解析
-                vision_image = vision.Image(content=img_byte_arr)
-                response = self.client.text_detection(image=vision_image)
-                texts = response.text_annotations
+    async def _extract_pdf_uncached(self, source: PDFSource) -> Dict[str, Any]:
+        try:
+            return self._summarize_pdf([page async for page in self._iter_pdf_pages(source)])
+        except Exception as e:
+            return self._pdf_failure(str(e))
 
-                if texts:
-                    all_text.append(texts[0].description)
-                    # 信頼度の計算（簡易版）
-                    total_confidence += response.text_annotations[0].score if hasattr(response.text_annotations[0], 'score') else 0.9
+    async def _iter_pdf_pages(self, source: PDFSource) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Vision APIの1リクエスト分のページずつ抽出し、ページ順に返す
 
-            avg_confidence = total_confidence / len(images) if images else 0.0
+        OCR_MAX_CONCURRENT_BATCHES件先まで並行して抽出する（それ以上は先読みしない）。
+        テキストレイヤーはページの範囲ごとに別プロセスで読み、ワーカーにはファイルのパスだけを渡す
+        （バイト列は一時ファイルに書き出してから渡す）。
+        """
+        async with as_file_path(source, ".pdf") as path:
+            page_count = await get_process_pool().run(pdf_page_count, path)
+            windows = iter(_batches(list(range(1, page_count + 1))))
+            tasks = deque()
 
-            return {
-                "text": "\n\n".join(all_text),
-                "confidence": avg_confidence,
-                "page_count": len(images),
-                "success": True
-            }
+            def schedule() -> None:
+                while len(tasks) < max(1, settings.ocr_max_concurrent_batches):
+                    window = next(windows, None)
+                    if window is None:
+                        return
+                    task = asyncio.ensure_future(self._extract_pdf_window(path, window))
+                    # 途中でやめた場合に「例外が取得されなかった」警告を出さない
+                    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+                    tasks.append(task)
 
-        except Exception as e:
-            return {
-                "text": "",
-                "confidence": 0.0,
-                "page_count": 0,
-                "success": False,
-                "error": str(e)
-            }
+            schedule()
+            try:
+                while tasks:
+                    pages = await tasks[0]
+                    tasks.popleft()
+                    schedule()
+                    for page in pages:
+                        yield page
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    async def _extract_pdf_window(self, path: str, page_numbers: List[int]) -> List[Dict[str, Any]]:
+        """指定したページのテキストレイヤーを読み、テキストレイヤーのないページだけOCRする"""
+        # テキストレイヤーの読み取り（CPU処理なので別プロセスで実行）
+        layer = await get_process_pool().run(read_text_layer, path, settings.pdf_min_text_chars, page_numbers)
+        pages = [
+            {"page": number, "text": text.strip(), "confidence": TEXT_LAYER_CONFIDENCE, "source": "text_layer"}
+            for number, (text, _) in zip(page_numbers, layer)
+        ]
+        ocr_indexes = [index for index, (_, needs_ocr) in enumerate(layer) if needs_ocr]
+        if ocr_indexes and not self.client:
+            for index in ocr_indexes:
+                pages[index].update({"confidence": 0.0, "error": OCR_UNAVAILABLE_MESSAGE})
+        elif ocr_indexes:
+            results = await self._ocr_pdf_window(path, [page_numbers[index] for index in ocr_indexes])
+            for index in ocr_indexes:
+                number = page_numbers[index]
+                if results[number]["text"] or not pages[index]["text"]:
+                    pages[index] = {**results[number], "page": number, "source": "ocr"}
+        return pages
+
+    async def _ocr_pdf_window(self, source: PDFSource, page_numbers: List[int]) -> Dict[int, Dict[str, Any]]:
+        """指定したページを画像にしてOCRし、ページ番号ごとの結果を返す"""
+        # 描画もリクエスト枠の中で行い、待機中のページの画像をメモリに持たない（CPU処理なので別プロセスで実行）
+        async with self._batch_slots:
+            contents = await get_process_pool().run(
+                render_page_images,
+                source,
+                page_numbers,
+                settings.ocr_render_dpi,
+                settings.ocr_render_grayscale,
+                settings.ocr_image_format,
+                settings.ocr_image_quality
+            )
+            results = await self._annotate_batch(contents)
+        return dict(zip(page_numbers, results))
+
+    def _summarize_pdf(self, pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """ページごとの結果を1つの抽出結果にまとめる"""
+        # ページの区切りを残す（プロンプト用の圧縮でヘッダー・フッターの判定に使う）
+        text = PAGE_BREAK.join(page["text"] for page in pages if page["text"])
+        if not text and any(page.get("error") == OCR_UNAVAILABLE_MESSAGE for page in pages):
+            return self._pdf_failure(OCR_UNAVAILABLE_MESSAGE)
+
+        return {
+            "text": text,
+            "confidence": sum(page["confidence"] for page in pages) / len(pages) if pages else 0.0,
+            "page_count": len(pages),
+            "ocr_page_count": sum(1 for page in pages if page["source"] == "ocr"),
+            "pages": pages,
+            "success": True
+        }
+
+    def _pdf_failure(self, error: str) -> Dict[str, Any]:
+        return {
+            "text": "",
+            "confidence": 0.0,
+            "page_count": 0,
+            "ocr_page_count": 0,
+            "pages": [],
+            "success": False,
+            "error": error
+        }
 
     async def extract_text_from_image(self, image_path: str) -> Dict[str, Any]:
         """画像からテキストを抽出"""
@@ -76,25 +207,19 @@ class OCRService:
                 "text": "",
                 "confidence": 0.0,
                 "success": False,
-                "error": "OCRサービスが初期化されていません。Google Cloudの認証情報を設定してください。"
+                "error": OCR_UNAVAILABLE_MESSAGE
             }
         try:
             with io.open(image_path, 'rb') as image_file:
                 content = image_file.read()
 
-            image = vision.Image(content=content)
-            response = self.client.text_detection(image=image)
-            texts = response.text_annotations
-
-            if response.error.message:
-                raise Exception(response.error.message)
-
-            extracted_text = texts[0].description if texts else ""
-            confidence = texts[0].score if texts and hasattr(texts[0], 'score') else 0.9
+            page = (await self.annotate_images([content]))[0]
+            if page.get("error"):
+                raise Exception(page["error"])
 
             return {
-                "text": extracted_text,
-                "confidence": confidence,
+                "text": page["text"],
+                "confidence": page["confidence"],
                 "success": True
             }
 
@@ -104,4 +229,78 @@ class OCRService:
                 "confidence": 0.0,
                 "success": False,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+
+    async def annotate_images(self, contents: List[bytes]) -> List[Dict[str, Any]]:
+        """
+        画像（ページ）のリストをOCRし、入力と同じ順序でページごとの結果を返す
+
+        Returns:
+            [{"page": ページ番号（1始まり）, "text": テキスト, "confidence": 信頼度, "error": エラー（あれば）}]
+
+        Raises:
+            Exception: リクエスト自体が失敗した場合（ページ単位のエラーは結果のerrorに入る）
+        """
+        async def annotate(batch: List[bytes]) -> List[Dict[str, Any]]:
+            async with self._batch_slots:
+                return await self._annotate_batch(batch)
+
+        results = await asyncio.gather(*(annotate(batch) for batch in _batches(contents)))
+        return _number_pages(results)
+
+    async def _annotate_batch(self, contents: List[bytes]) -> List[Dict[str, Any]]:
+        requests = [
+            vision.AnnotateImageRequest(
+                image=vision.Image(content=content),
+                features=[vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)]
+            )
+            for content in contents
+        ]
+        response = await asyncio.to_thread(
+            self.client.batch_annotate_images,
+            requests=requests,
+            timeout=settings.ocr_timeout_seconds
+        )
+        return [self._page_result(page_response) for page_response in response.responses]
+
+    def _page_result(self, response) -> Dict[str, Any]:
+        """1ページ分の応答からテキストと信頼度を取り出す"""
+        if response.error.message:
+            return {"text": "", "confidence": 0.0, "error": response.error.message}
+
+        text = response.full_text_annotation.text
+        if not text and response.text_annotations:
+            text = response.text_annotations[0].description
+
+        confidences = [page.confidence for page in response.full_text_annotation.pages if page.confidence]
+        if not text:
+            confidence = 0.0
+        elif confidences:
+            confidence = sum(confidences) / len(confidences)
+        else:
+            confidence = DEFAULT_CONFIDENCE
+        return {"text": text, "confidence": confidence}
+
+def _batches(items: List[Any]) -> List[List[Any]]:
+    """Vision APIの1リクエスト分ずつに分割"""
+    batch_size = max(1, min(settings.ocr_batch_size, MAX_IMAGES_PER_REQUEST))
+    return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+def _number_pages(results: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """バッチごとの結果をページ順に並べ、ページ番号（1始まり）を振る"""
+    return [
+        {"page": page_number, **page}
+        for page_number, page in enumerate((page for batch in results for page in batch), start=1)
+    ]
+
+class _OCRServiceHolder:
+    _instance: OCRService = None
+
+    @classmethod
+    def get_instance(cls) -> OCRService:
+        if cls._instance is None:
+            cls._instance = OCRService()
+        return cls._instance
+
+def get_ocr_service() -> OCRService:
+    return _OCRServiceHolder.get_instance()
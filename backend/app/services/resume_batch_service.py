@@ -0,0 +1,274 @@
+import asyncio
+import zipfile
+from pathlib import PurePosixPath
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+from fastapi import UploadFile
+from app.services.applicant_writer import BulkApplicantWriter
+from app.services.file_processor_service import WORD_CONTENT_TYPE
+from app.services.ingest_service import IngestService
+from app.utils.config import settings
+from app.utils.rate_limiter import Priority
+from app.utils.upload import SpooledUpload, UploadTooLargeError, receive_stream, receive_upload
+
+# 一括取り込みの対象にする履歴書の拡張子
+RESUME_EXTENSIONS = (".pdf", ".docx")
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+
+# UTF-8フラグのないZIPのファイル名（Windowsの「圧縮フォルダー」はShift_JISで格納する）
+_ZIP_UTF8_FLAG = 0x800
+_ZIP_FALLBACK_ENCODING = "cp932"
+
+# (ファイル名, 内容, 読み込めなかった理由)。内容は取り込み後にclose()する
+ResumeFile = Tuple[str, Optional[SpooledUpload], Optional[str]]
+
+_DONE = object()
+
+async def iter_resume_uploads(files: List[UploadFile]) -> AsyncIterator[ResumeFile]:
+    """
+    アップロードされたファイル（履歴書・履歴書をまとめたZIP）から履歴書を1件ずつ読み出す
+
+    ZIPは展開せずに1エントリずつ読み、読み出した履歴書はすぐに次の処理へ渡す
+    （全ファイルを同時にメモリに持たない。大きいファイルは一時ファイルに書き出す）。フォルダー・隠しファイル（__MACOSXなど）は読み飛ばし、
+    対応していない形式・サイズ超過・ファイル数の上限を超えた分は理由付きで返す。
+    """
+    count = 0
+    max_bytes = settings.bulk_ingest_max_file_bytes
+
+    def limit_error(filename: str) -> Optional[str]:
+        nonlocal count
+        if not filename.lower().endswith(RESUME_EXTENSIONS):
+            return "サポートされていないファイル形式です（PDF / Wordのみ）"
+        count += 1
+        if count > settings.bulk_ingest_max_files:
+            return f"一度に取り込めるファイル数（{settings.bulk_ingest_max_files}件）を超えています"
+        return None
+
+    for upload in files:
+        filename = upload.filename or ""
+        if upload.content_type in ZIP_CONTENT_TYPES or filename.lower().endswith(".zip"):
+            # ZIPの読み込み・解凍はスレッドで行い、1エントリずつ取り出す
+            entries = _iter_zip_entries(upload.file, filename, max_bytes, limit_error)
+            while True:
+                entry = await asyncio.to_thread(next, entries, None)
+                if entry is None:
+                    break
+                yield entry
+            continue
+
+        error = limit_error(filename)
+        if error is not None:
+            yield filename, None, error
+            continue
+        try:
+            content = await receive_upload(upload, max_bytes=max_bytes)
+        except UploadTooLargeError as e:
+            yield filename, None, str(e)
+        else:
+            yield filename, content, None
+
+def _iter_zip_entries(
+    fileobj: BinaryIO,
+    archive_name: str,
+    max_bytes: int,
+    limit_error: Callable[[str], Optional[str]]
+) -> Iterator[ResumeFile]:
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as e:
+        yield archive_name, None, f"ZIPファイルを開けませんでした: {e}"
+        return
+
+    with archive:
+        for info in archive.infolist():
+            filename = _zip_entry_name(info)
+            parts = PurePosixPath(filename).parts
+            if info.is_dir() or not parts or any(part.startswith((".", "__MACOSX")) for part in parts):
+                continue
+
+            error = limit_error(filename)
+            if error is None and info.file_size > max_bytes:
+                error = str(UploadTooLargeError(max_bytes))
+            if error is not None:
+                yield filename, None, error
+                continue
+
+            try:
+                with archive.open(info) as member:
+                    # ヘッダーのサイズが偽装されていても上限以上は読まない
+                    content = receive_stream(member, filename, max_bytes=max_bytes)
+            except UploadTooLargeError as e:
+                yield filename, None, str(e)
+                continue
+            except (zipfile.BadZipFile, NotImplementedError, RuntimeError, OSError) as e:
+                yield filename, None, f"ZIPから取り出せませんでした: {e}"
+                continue
+            yield filename, content, None
+
+def _zip_entry_name(info: zipfile.ZipInfo) -> str:
+    if info.flag_bits & _ZIP_UTF8_FLAG:
+        return info.filename
+    try:
+        return info.filename.encode("cp437").decode(_ZIP_FALLBACK_ENCODING)
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+def _resume_content_type(filename: str) -> str:
+    # ZIP内のファイル名は拡張子が大文字のこともある
+    return "application/pdf" if filename.lower().endswith(".pdf") else WORD_CONTENT_TYPE
+
+class ResumeBatchService:
+    """
+    履歴書ファイルの一括取り込み
+
+    ファイルごとに 抽出 → 構造化・評価 → 保存 の段階を順に進めるパイプラインで処理する。
+    段階の間は長さBULK_INGEST_QUEUE_SIZEのキューでつなぎ、各段階の同時実行数を別々に制限するので、
+    OCR・解析（CPU）とLLM呼び出し・DB書き込み（I/O）が並行して進み、先の段階が詰まると入力の読み込みも止まる。
+    失敗したファイルはその段階で結果を返し、他のファイルの処理は続ける。
+    """
+
+    def __init__(self, ingest_service: IngestService = None):
+        self.ingest_service = ingest_service or IngestService()
+
+    async def iter_results(
+        self,
+        files: AsyncIterable[ResumeFile],
+        skill_ratio: float = None,
+        mindset_ratio: float = None,
+        concurrency: Optional[int] = None,
+        extract_concurrency: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        履歴書を取り込み、ファイルごとの結果を完了した順に返す
+
+        Args:
+            files: (ファイル名, 内容, 読み込めなかった理由)（iter_resume_uploadsの出力）
+            concurrency: 同時に構造化・評価するファイル数（未指定時はBATCH_CONCURRENCY）
+            extract_concurrency: 同時にテキスト抽出するファイル数（未指定時はBULK_INGEST_EXTRACT_CONCURRENCY）
+
+        Yields:
+            {"file_index", "filename", "status"（success / error / skipped）, "stage"（失敗した段階）,
+             "applicant_id", "name", "email", "total_score", "recommended_stage", "error"}
+        """
+        queue_size = max(1, settings.bulk_ingest_queue_size)
+        extract_queue: asyncio.Queue = asyncio.Queue(queue_size)
+        analyze_queue: asyncio.Queue = asyncio.Queue(queue_size)
+        save_queue: asyncio.Queue = asyncio.Queue(queue_size)
+        results: asyncio.Queue = asyncio.Queue(queue_size)
+        # DB書き込みはチャンクにまとめるため、保存段階はチャンクサイズ分を同時に待たせる
+        writer = BulkApplicantWriter()
+        feed_errors: List[Exception] = []
+        # 抽出が終わっていないファイル（中断時に一時ファイルを削除する）
+        uploads = set()
+
+        async def feed() -> None:
+            index = 0
+            try:
+                async for filename, content, error in files:
+                    item = {"file_index": index, "filename": filename}
+                    index += 1
+                    if error is not None:
+                        await results.put({**item, "status": "skipped", "error": error})
+                    else:
+                        uploads.add(content)
+                        await extract_queue.put({**item, "content": content})
+            except Exception as e:
+                # 読み込み済みのファイルは最後まで処理してから例外を送出する
+                feed_errors.append(e)
+            await extract_queue.put(_DONE)
+
+        async def extract(item: Dict[str, Any]) -> Dict[str, Any]:
+            content = item.pop("content")
+            try:
+                # プロンプトに入る分のテキストが集まった時点で残りのページは読まない
+                extracted = await self.ingest_service.file_processor.extract_document_text(
+                    content.source, item["filename"], _resume_content_type(item["filename"])
+                )
+            finally:
+                content.close()
+                uploads.discard(content)
+            if not extracted.get("success") or not extracted.get("text", "").strip():
+                raise ValueError(extracted.get("error") or "ファイルからテキストを抽出できませんでした")
+            return {**item, "text": extracted["text"], "confidence": extracted.get("confidence", 0.0)}
+
+        async def analyze(item: Dict[str, Any]) -> Dict[str, Any]:
+            result = await self.ingest_service.ingest_text(
+                item.pop("text"),
+                skill_ratio=skill_ratio,
+                mindset_ratio=mindset_ratio,
+                ocr_confidence=item.pop("confidence"),
+                # 一括処理は画面からの取り込みより後回しにする
+                priority=Priority.BATCH
+            )
+            if result.evaluation.degraded:
+                raise ValueError(result.evaluation.summary)
+            return {**item, "result": result}
+
+        async def save(item: Dict[str, Any]) -> Dict[str, Any]:
+            result = item.pop("result")
+            applicant_id = await self.ingest_service.save(result, writer=writer)
+            return {
+                **item,
+                "status": "success",
+                "applicant_id": applicant_id,
+                "name": result.applicant_data.name,
+                "email": result.applicant_data.email,
+                "total_score": result.evaluation.total_score,
+                "recommended_stage": result.recommended_stage.value
+            }
+
+        async def stage(
+            name: str,
+            inbox: asyncio.Queue,
+            outbox: asyncio.Queue,
+            workers: int,
+            handle: Callable[[Dict[str, Any]], Any]
+        ) -> None:
+            async def work() -> None:
+                while True:
+                    item = await inbox.get()
+                    if item is _DONE:
+                        # 同じ段階の他のワーカーにも終了を伝える
+                        await inbox.put(_DONE)
+                        return
+                    try:
+                        next_item = await handle(item)
+                    except Exception as e:
+                        await results.put({
+                            "file_index": item["file_index"],
+                            "filename": item["filename"],
+                            "status": "error",
+                            "stage": name,
+                            "error": str(e)
+                        })
+                        continue
+                    await outbox.put(next_item)
+
+            await asyncio.gather(*(work() for _ in range(max(1, workers))))
+            await outbox.put(_DONE)
+
+        tasks = [
+            asyncio.create_task(feed()),
+            asyncio.create_task(stage(
+                "extract", extract_queue, analyze_queue,
+                extract_concurrency or settings.bulk_ingest_extract_concurrency, extract
+            )),
+            asyncio.create_task(stage(
+                "analyze", analyze_queue, save_queue, concurrency or settings.batch_concurrency, analyze
+            )),
+            asyncio.create_task(stage("save", save_queue, results, writer.chunk_size, save)),
+        ]
+        try:
+            while True:
+                item = await results.get()
+                if item is _DONE:
+                    break
+                yield item
+            if feed_errors:
+                raise feed_errors[0]
+        finally:
+            # キャンセル・中断時は実行中の段階も止める
+            for task in tasks:
+                task.cancel()
+            writer.close()
+            for content in uploads:
+                content.close()
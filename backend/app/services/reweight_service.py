@@ -0,0 +1,178 @@
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import numpy as np
+from app.utils.supabase_client import get_supabase
+
+REWEIGHT_PAGE_SIZE = 1000
+# applicant_idsで絞り込む場合に1回のクエリ（URL）に含めるIDの数
+REWEIGHT_ID_CHUNK_SIZE = 200
+# 書き戻し（1行ずつのupdate）の同時実行数
+REWEIGHT_UPDATE_CONCURRENCY = 10
+
+def compute_total_scores(
+    skill_scores: np.ndarray,
+    mindset_scores: np.ndarray,
+    skill_ratio: float,
+    mindset_ratio: float
+) -> np.ndarray:
+    """総合スコア = スキルスコア × スキル比率 + マインドセットスコア × マインドセット比率（0-10に丸める）"""
+    totals = skill_scores * skill_ratio + mindset_scores * mindset_ratio
+    return np.clip(np.round(totals, 2), 0.0, 10.0)
+
+def reweight_evaluation(evaluation: Dict[str, Any], skill_ratio: float, mindset_ratio: float) -> Dict[str, Any]:
+    """保存済みの評価結果を新しい比率で再計算（AIは呼ばない）"""
+    total = compute_total_scores(
+        np.array([float(evaluation.get("skill_score") or 0.0)]),
+        np.array([float(evaluation.get("mindset_score") or 0.0)]),
+        skill_ratio,
+        mindset_ratio
+    )[0]
+    return {
+        **evaluation,
+        "total_score": float(total),
+        "skill_ratio": skill_ratio,
+        "mindset_ratio": mindset_ratio
+    }
+
+class ReweightService:
+    """評価比率の変更をローカル計算で反映するサービス"""
+
+    async def reweight_applicant(self, applicant_id: str, skill_ratio: float, mindset_ratio: float) -> Optional[Dict[str, Any]]:
+        """
+        1人分の評価を新しい比率で再計算して保存
+
+        Returns:
+            更新後の評価結果（応募者が存在しない場合はNone）
+
+        Raises:
+            ValueError: 評価がまだ実行されていない場合
+        """
+        supabase = get_supabase()
+
+        response = await asyncio.to_thread(
+            supabase.table("applicants").select("id,evaluation").eq("id", applicant_id).limit(1).execute
+        )
+        if not response.data:
+            return None
+
+        evaluation = response.data[0].get("evaluation")
+        if not evaluation:
+            raise ValueError("Applicant not evaluated yet")
+
+        evaluation = reweight_evaluation(evaluation, skill_ratio, mindset_ratio)
+        await asyncio.to_thread(
+            supabase.table("applicants").update({
+                "evaluation": evaluation,
+                "updated_at": datetime.utcnow().isoformat()
+            }).eq("id", applicant_id).execute
+        )
+        return evaluation
+
+    async def reweight_many(
+        self,
+        skill_ratio: float,
+        mindset_ratio: float,
+        status: Optional[str] = None,
+        applicant_ids: Optional[List[str]] = None,
+        dry_run: bool = False,
+        page_size: int = REWEIGHT_PAGE_SIZE
+    ) -> Dict[str, Any]:
+        """
+        評価済みの応募者（全員またはstatus/IDで絞り込み）を新しい比率で一括再計算
+
+        ID順のキーセットページングで取得し（applicant_idsはREWEIGHT_ID_CHUNK_SIZE件ずつ）、
+        ページごとにNumPyでまとめて計算して、評価（evaluation列）だけをIDごとのupdateで書き戻す。
+        書き戻しは取得時のupdated_atと一致する行だけを対象にするので、その間に削除された応募者は復活せず、
+        別の処理で更新された評価も上書きしない（conflict_countに数える）。
+        dry_run=Trueの場合は集計のみ返して保存しない。
+        """
+        supabase = get_supabase()
+        updated_count = 0
+        skipped_count = 0
+        conflict_count = 0
+        total_sum = 0.0
+        total_min = None
+        total_max = None
+        update_slots = asyncio.Semaphore(REWEIGHT_UPDATE_CONCURRENCY)
+
+        async def update(row: Dict[str, Any], total: float) -> bool:
+            evaluation = {
+                **row["evaluation"],
+                "total_score": total,
+                "skill_ratio": skill_ratio,
+                "mindset_ratio": mindset_ratio
+            }
+            async with update_slots:
+                response = await asyncio.to_thread(
+                    supabase.table("applicants").update({"evaluation": evaluation})
+                    .eq("id", row["id"]).eq("updated_at", row["updated_at"]).execute
+                )
+            return bool(response.data)
+
+        if applicant_ids:
+            id_chunks = [
+                applicant_ids[i:i + REWEIGHT_ID_CHUNK_SIZE] for i in range(0, len(applicant_ids), REWEIGHT_ID_CHUNK_SIZE)
+            ]
+        else:
+            id_chunks = [None]
+
+        for id_chunk in id_chunks:
+            last_id = None
+            while True:
+                query = supabase.table("applicants").select("id,evaluation,updated_at").not_.is_("evaluation", "null")
+                if status:
+                    query = query.eq("status", status)
+                if id_chunk:
+                    query = query.in_("id", id_chunk)
+                if last_id is not None:
+                    query = query.gt("id", last_id)
+
+                response = await asyncio.to_thread(query.order("id").limit(page_size).execute)
+                rows = response.data
+                if not rows:
+                    break
+                last_id = rows[-1]["id"]
+
+                # スコアが揃っていない評価は対象外
+                targets = [
+                    row for row in rows
+                    if isinstance(row["evaluation"].get("skill_score"), (int, float))
+                    and isinstance(row["evaluation"].get("mindset_score"), (int, float))
+                ]
+                skipped_count += len(rows) - len(targets)
+
+                if targets:
+                    totals = compute_total_scores(
+                        np.fromiter((row["evaluation"]["skill_score"] for row in targets), dtype=float, count=len(targets)),
+                        np.fromiter((row["evaluation"]["mindset_score"] for row in targets), dtype=float, count=len(targets)),
+                        skill_ratio,
+                        mindset_ratio
+                    )
+                    if not dry_run:
+                        written = await asyncio.gather(*(
+                            update(row, float(total)) for row, total in zip(targets, totals)
+                        ))
+                        conflict_count += written.count(False)
+                        totals = totals[np.array(written, dtype=bool)]
+
+                    if len(totals):
+                        updated_count += len(totals)
+                        total_sum += float(totals.sum())
+                        total_min = float(totals.min()) if total_min is None else min(total_min, float(totals.min()))
+                        total_max = float(totals.max()) if total_max is None else max(total_max, float(totals.max()))
+
+                if len(rows) < page_size:
+                    break
+
+        return {
+            "updated_count": updated_count,
+            "skipped_count": skipped_count,
+            "conflict_count": conflict_count,
+            "dry_run": dry_run,
+            "skill_ratio": skill_ratio,
+            "mindset_ratio": mindset_ratio,
+            "mean_total_score": round(total_sum / updated_count, 2) if updated_count else None,
+            "min_total_score": total_min,
+            "max_total_score": total_max
+        }
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.utils.sqlite_store import SQLiteStore
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed_at ON cache_entries(accessed_at);
+"""
+
+# SQLiteの古いエントリを削除する間隔（書き込み件数）
+DEFAULT_EVICT_EVERY = 100
+
+class TieredCache:
+    """
+    プロセス内LRU + SQLiteの2段キャッシュ（値はJSONに変換できるdict）
+
+    - ttl_seconds: 作成からの有効期限（Noneで無期限）
+    - memory_entries: プロセス内LRUの最大件数
+    - max_entries: SQLiteに保持する最大件数（超えたら最終アクセスが古い順に削除）
+    - max_bytes: SQLiteに保持する値（JSON）の合計サイズの上限（Noneで無制限。超えたら最終アクセスが古い順に削除）
+    - evict_every: 期限切れ・上限超過分の削除をこの件数の書き込みごとにまとめて行う
+      （それまでの間は上限をevict_every件分まで超えることがある）
+
+    イベントループからはaget / asetを使う（プロセス内LRUはそのまま参照し、SQLiteの読み書き・JSONの変換はスレッドで行う）。
+    get / set / stats / clearはSQLiteを同期で読み書きするので、スレッドから呼び出す。
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        memory_entries: int = 1000,
+        max_entries: int = 10000,
+        ttl_seconds: Optional[float] = None,
+        persistent: bool = True,
+        max_bytes: Optional[int] = None,
+        evict_every: int = DEFAULT_EVICT_EVERY
+    ):
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.evict_every = max(1, evict_every)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._store = SQLiteStore(filename, _SCHEMA) if persistent else None
+        if self._store is not None:
+            self._migrate()
+        self._stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """値を取得（SQLiteを同期で読む。スレッドから呼び出す）"""
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is None and self._store is not None:
+            value = self._remember_loaded(key, self._load(key, now))
+        return self._count_lookup(value)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """値を取得（イベントループから呼び出す。プロセス内LRUになければSQLiteをスレッドで読む）"""
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is None and self._store is not None:
+            value = self._remember_loaded(key, await asyncio.to_thread(self._load, key, now))
+        return self._count_lookup(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """値を保存（SQLiteに同期で書き込む。スレッドから呼び出す）"""
+        now = time.time()
+        evict = self._set_memory(key, value, now)
+        if self._store is not None:
+            self._save(key, value, now, evict)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        """値を保存（イベントループから呼び出す。SQLiteへの書き込みはスレッドで行う）"""
+        now = time.time()
+        evict = self._set_memory(key, value, now)
+        if self._store is not None:
+            await asyncio.to_thread(self._save, key, value, now, evict)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self._store is not None:
+            self._store.execute("DELETE FROM cache_entries")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        if self._store is not None:
+            row = self._store.execute("SELECT COUNT(*) AS n, COALESCE(SUM(size), 0) AS bytes FROM cache_entries")[0]
+            stats["persistent_entries"] = row["n"]
+            stats["persistent_bytes"] = row["bytes"]
+        hits = stats["memory_hits"] + stats["persistent_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _get_memory(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            value, created_at = entry
+            if self._expired(created_at, now):
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return value
+
+    def _remember_loaded(self, key: str, entry: Optional[Tuple[Dict[str, Any], float]]) -> Optional[Dict[str, Any]]:
+        if entry is None:
+            return None
+        value, created_at = entry
+        with self._lock:
+            self._remember(key, value, created_at)
+            self._stats["persistent_hits"] += 1
+        return value
+
+    def _count_lookup(self, value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if value is None:
+            with self._lock:
+                self._stats["misses"] += 1
+        return value
+
+    def _set_memory(self, key: str, value: Dict[str, Any], now: float) -> bool:
+        """プロセス内LRUに保存し、今回の書き込みでSQLiteの古いエントリを削除するかを返す"""
+        with self._lock:
+            self._remember(key, value, now)
+            self._stats["sets"] += 1
+            self._writes += 1
+            return self._writes % self.evict_every == 0
+
+    def _load(self, key: str, now: float) -> Optional[Tuple[Dict[str, Any], float]]:
+        """SQLiteから (値, 作成時刻) を読む（スレッドで実行）"""
+        rows = self._store.execute("SELECT value, created_at FROM cache_entries WHERE key = ?", (key,))
+        if not rows:
+            return None
+        created_at = rows[0]["created_at"]
+        if self._expired(created_at, now):
+            self._store.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            return None
+        value = json.loads(rows[0]["value"])
+        self._store.execute("UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return value, created_at
+
+    def _save(self, key: str, value: Dict[str, Any], now: float, evict: bool) -> None:
+        """SQLiteに書き込む（スレッドで実行）"""
+        payload = json.dumps(value, ensure_ascii=False)
+        self._store.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, created_at, accessed_at, size)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (key, payload, now, now, len(payload.encode("utf-8")))
+        )
+        if evict:
+            self._evict(now)
+
+    def _migrate(self) -> None:
+        """sizeカラムのない既存のキャッシュファイルにカラムを追加"""
+        columns = {row["name"] for row in self._store.execute("PRAGMA table_info(cache_entries)")}
+        if "size" not in columns:
+            self._store.execute("ALTER TABLE cache_entries ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+            self._store.execute("UPDATE cache_entries SET size = LENGTH(CAST(value AS BLOB))")
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, value: Dict[str, Any], created_at: float) -> None:
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now: float) -> None:
+        deleted = 0
+        if self.ttl_seconds is not None:
+            deleted += self._store.execute_rowcount(
+                "DELETE FROM cache_entries WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+        deleted += self._store.execute_rowcount(
+            "DELETE FROM cache_entries WHERE key IN ("
+            " SELECT key FROM cache_entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.max_entries,)
+        )
+        if self.max_bytes is not None:
+            deleted += self._store.execute_rowcount(
+                "DELETE FROM cache_entries WHERE key IN ("
+                " SELECT key FROM ("
+                "  SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS total FROM cache_entries"
+                " ) WHERE total > ?"
+                ")",
+                (self.max_bytes,)
+            )
+        if deleted:
+            with self._lock:
+                self._stats["evictions"] += deleted
@@ -11,10 +11,97 @@ class Settings(BaseSettings):
     google_cloud_project_id: Optional[str] = Field(None, env="GOOGLE_CLOUD_PROJECT_ID")
     google_application_credentials: Optional[str] = Field(None, env="GOOGLE_APPLICATION_CREDENTIALS")
 
+    # LLMバックエンド: vertex（Vertex AI）/ fake（ローカルの疑似LLM）/ record（Vertex AIの応答を記録）/ replay（記録を再生）
+    llm_backend: str = Field("vertex", env="LLM_BACKEND")
+    llm_recordings_dir: str = Field("llm_recordings", env="LLM_RECORDINGS_DIR")
+    llm_fake_latency_seconds: float = Field(0.5, env="LLM_FAKE_LATENCY_SECONDS")
+    llm_fake_latency_sigma: float = Field(0.5, env="LLM_FAKE_LATENCY_SIGMA")
+    llm_fake_error_rate: float = Field(0.0, env="LLM_FAKE_ERROR_RATE")
+    llm_fake_seed: Optional[int] = Field(None, env="LLM_FAKE_SEED")
+
+    # LLM（Gemini）呼び出しの流量制御
+    llm_requests_per_minute: int = Field(60, env="LLM_REQUESTS_PER_MINUTE")
+    llm_tokens_per_minute: int = Field(250000, env="LLM_TOKENS_PER_MINUTE")
+    llm_max_in_flight: int = Field(8, env="LLM_MAX_IN_FLIGHT")
+
+    # LLM呼び出しのタイムアウト・リトライ・サーキットブレーカー
+    llm_timeout_seconds: float = Field(60.0, env="LLM_TIMEOUT_SECONDS")
+    llm_max_attempts: int = Field(3, env="LLM_MAX_ATTEMPTS")
+    llm_retry_base_delay: float = Field(1.0, env="LLM_RETRY_BASE_DELAY")
+    llm_retry_max_delay: float = Field(20.0, env="LLM_RETRY_MAX_DELAY")
+    llm_circuit_failure_threshold: int = Field(5, env="LLM_CIRCUIT_FAILURE_THRESHOLD")
+    llm_circuit_reset_seconds: float = Field(30.0, env="LLM_CIRCUIT_RESET_SECONDS")
+
+    # プロンプトに埋め込むテキストのトークン数の上限（超える分は中間を省略）
+    prompt_document_token_budget: int = Field(6000, env="PROMPT_DOCUMENT_TOKEN_BUDGET")
+    prompt_field_token_budget: int = Field(1000, env="PROMPT_FIELD_TOKEN_BUDGET")
+
+    # LLMの応答形式（schema: JSON + 応答スキーマ / mime: JSONのみ / off: プロンプトの指示のみ）
+    llm_json_mode: str = Field("schema", env="LLM_JSON_MODE")
+
+    # OCR（Vision API）: 1リクエストにまとめるページ数（上限16）と同時に送るリクエスト数
+    ocr_batch_size: int = Field(8, env="OCR_BATCH_SIZE")
+    ocr_max_concurrent_batches: int = Field(4, env="OCR_MAX_CONCURRENT_BATCHES")
+    ocr_timeout_seconds: float = Field(60.0, env="OCR_TIMEOUT_SECONDS")
+    # OCR用のページ画像（解像度・グレースケール・形式 jpeg / webp / png・JPEG/WebPの品質）
+    ocr_render_dpi: int = Field(200, env="OCR_RENDER_DPI")
+    ocr_render_grayscale: bool = Field(True, env="OCR_RENDER_GRAYSCALE")
+    ocr_image_format: str = Field("jpeg", env="OCR_IMAGE_FORMAT")
+    ocr_image_quality: int = Field(80, env="OCR_IMAGE_QUALITY")
+    # PDFのテキストレイヤーの文字数（空白を除く）がこれ未満のページだけOCRする
+    pdf_min_text_chars: int = Field(30, env="PDF_MIN_TEXT_CHARS")
+
+    # 文書解析（PDF・Word・評価基準ファイル）を別プロセスで実行する（ワーカー数0はCPU数に合わせて最大4）
+    parse_pool_enabled: bool = Field(True, env="PARSE_POOL_ENABLED")
+    parse_pool_workers: int = Field(0, env="PARSE_POOL_WORKERS")
+    parse_task_timeout_seconds: float = Field(60.0, env="PARSE_TASK_TIMEOUT_SECONDS")
+    parse_pool_max_tasks_per_worker: int = Field(200, env="PARSE_POOL_MAX_TASKS_PER_WORKER")
+
+    # アップロード: 1ファイルのサイズ上限（CSVは別）と、メモリに持つ上限（超えたら一時ファイルに書き出す）
+    upload_max_bytes: int = Field(50 * 1024 * 1024, env="UPLOAD_MAX_BYTES")
+    upload_csv_max_bytes: int = Field(200 * 1024 * 1024, env="UPLOAD_CSV_MAX_BYTES")
+    upload_spool_threshold_bytes: int = Field(1024 * 1024, env="UPLOAD_SPOOL_THRESHOLD_BYTES")
+    upload_temp_dir: Optional[str] = Field(None, env="UPLOAD_TEMP_DIR")
+
     # 評価設定
     default_skill_ratio: float = Field(0.2, env="DEFAULT_SKILL_RATIO")
     default_mindset_ratio: float = Field(0.8, env="DEFAULT_MINDSET_RATIO")
 
+    # バッチ処理設定
+    batch_concurrency: int = Field(5, env="BATCH_CONCURRENCY")
+    batch_insert_chunk_size: int = Field(50, env="BATCH_INSERT_CHUNK_SIZE")
+    batch_insert_flush_interval: float = Field(1.0, env="BATCH_INSERT_FLUSH_INTERVAL")
+
+    # 履歴書の一括取り込み（ZIP・複数ファイル）
+    bulk_ingest_max_files: int = Field(500, env="BULK_INGEST_MAX_FILES")
+    bulk_ingest_max_file_bytes: int = Field(20 * 1024 * 1024, env="BULK_INGEST_MAX_FILE_BYTES")
+    bulk_ingest_extract_concurrency: int = Field(4, env="BULK_INGEST_EXTRACT_CONCURRENCY")
+    bulk_ingest_queue_size: int = Field(8, env="BULK_INGEST_QUEUE_SIZE")
+
+    # 複数の応募者を1リクエストでまとめて評価する（一括処理のみ）
+    batch_packed_evaluation: bool = Field(False, env="BATCH_PACKED_EVALUATION")
+    evaluation_pack_max_size: int = Field(8, env="EVALUATION_PACK_MAX_SIZE")
+    evaluation_pack_token_budget: int = Field(24000, env="EVALUATION_PACK_TOKEN_BUDGET")
+    evaluation_pack_flush_interval: float = Field(0.5, env="EVALUATION_PACK_FLUSH_INTERVAL")
+
+    # AI評価キャッシュ
+    evaluation_cache_enabled: bool = Field(True, env="EVALUATION_CACHE_ENABLED")
+    evaluation_cache_memory_entries: int = Field(1000, env="EVALUATION_CACHE_MEMORY_ENTRIES")
+    evaluation_cache_max_entries: int = Field(20000, env="EVALUATION_CACHE_MAX_ENTRIES")
+    evaluation_cache_ttl_seconds: float = Field(30 * 24 * 3600, env="EVALUATION_CACHE_TTL_SECONDS")
+
+    # ファイルから抽出したテキスト（OCR結果）のキャッシュ
+    extraction_cache_enabled: bool = Field(True, env="EXTRACTION_CACHE_ENABLED")
+    extraction_cache_memory_entries: int = Field(50, env="EXTRACTION_CACHE_MEMORY_ENTRIES")
+    extraction_cache_max_entries: int = Field(10000, env="EXTRACTION_CACHE_MAX_ENTRIES")
+    extraction_cache_max_bytes: int = Field(256 * 1024 * 1024, env="EXTRACTION_CACHE_MAX_BYTES")
+    # 1件のテキストがこれを超える結果はキャッシュしない（ページごとの抽出中に保持するテキストの上限）
+    extraction_cache_max_entry_bytes: int = Field(8 * 1024 * 1024, env="EXTRACTION_CACHE_MAX_ENTRY_BYTES")
+    extraction_cache_ttl_seconds: float = Field(90 * 24 * 3600, env="EXTRACTION_CACHE_TTL_SECONDS")
+
+    # ローカル永続データ（SQLite）の保存先
+    local_data_dir: str = Field("local_data", env="LOCAL_DATA_DIR")
+
     # API設定
     api_host: str = Field("0.0.0.0", env="API_HOST")
     api_port: int = Field(8000, env="API_PORT")
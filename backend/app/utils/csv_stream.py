@@ -0,0 +1,194 @@
+import codecs
+import csv
+from collections import deque
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional
+from fastapi import UploadFile
+from app.utils.config import settings
+from app.utils.upload import UploadTooLargeError
+
+# 自動判定でUTF-8として読めなかった場合に使うエンコーディング（Excel/人事システムのShift_JIS出力）
+FALLBACK_ENCODING = "cp932"
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+class _RecordFeeder:
+    """csv.readerに1レコードずつ渡すためのイテレータ"""
+
+    def __init__(self):
+        self.queue = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.queue:
+            raise StopIteration
+        return self.queue.popleft()
+
+class IncrementalCSVParser:
+    """
+    バイト列を少しずつ受け取り、完成したレコードから順にdictとして返すCSVパーサー
+
+    csv.DictReaderと同じ形式（1行目をヘッダーとして使用）で行を返す。
+    encoding未指定時はBOM付きUTF-8 / UTF-8 / CP932を自動判定する。
+    引用符内の改行を含むレコードにも対応する。
+    """
+
+    def __init__(self, encoding: Optional[str] = None):
+        self.encoding = encoding
+        self._auto_detect = encoding is None
+        self._decoder = codecs.getincrementaldecoder(encoding)() if encoding else None
+        self._head = b""
+        self._ascii_only = True
+        self._partial_line = ""
+        self._record_lines: List[str] = []
+        self._quote_count = 0
+        self._feeder = _RecordFeeder()
+        self._reader = csv.reader(self._feeder)
+        self.fieldnames: Optional[List[str]] = None
+        self.line_num = 0
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        """バイト列を追加し、完成した行を返す"""
+        if self._decoder is None:
+            # エンコーディング判定用に先頭を少しためる
+            self._head += data
+            if len(self._head) < 4096:
+                return []
+            data, self._head = self._head, b""
+            self._select_encoding(data)
+
+        return self._feed_text(self._decode(data, final=False))
+
+    def close(self) -> List[Dict[str, Any]]:
+        """入力の終わりを通知し、残りの行を返す"""
+        if self._decoder is None:
+            data, self._head = self._head, b""
+            self._select_encoding(data)
+            rows = self._feed_text(self._decode(data, final=False))
+        else:
+            rows = []
+
+        rows.extend(self._feed_text(self._decode(b"", final=True)))
+        if self._partial_line:
+            rows.extend(self._feed_line(self._partial_line))
+            self._partial_line = ""
+        if self._record_lines:
+            # 引用符が閉じていない最終レコードもそのまま解析する
+            rows.extend(self._parse_record("".join(self._record_lines)))
+            self._record_lines = []
+        return rows
+
+    def _select_encoding(self, sample: bytes) -> None:
+        if sample.startswith(codecs.BOM_UTF8):
+            self.encoding = "utf-8-sig"
+        else:
+            try:
+                codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+                self.encoding = "utf-8"
+            except UnicodeDecodeError:
+                self.encoding = FALLBACK_ENCODING
+        self._decoder = codecs.getincrementaldecoder(self.encoding)()
+
+    def _decode(self, data: bytes, final: bool) -> str:
+        try:
+            text = self._decoder.decode(data, final=final)
+        except UnicodeDecodeError:
+            # 先頭がASCIIのみでUTF-8と判定した後にShift_JISの文字が出てきた場合は切り替える
+            if not (self._auto_detect and self._ascii_only and self.encoding == "utf-8"):
+                raise
+            buffered, _ = self._decoder.getstate()
+            self.encoding = FALLBACK_ENCODING
+            self._decoder = codecs.getincrementaldecoder(self.encoding)()
+            text = self._decoder.decode(buffered + data, final=final)
+
+        if self._ascii_only and not text.isascii():
+            self._ascii_only = False
+        return text
+
+    def _feed_text(self, text: str) -> List[Dict[str, Any]]:
+        if not text:
+            return []
+        lines = (self._partial_line + text).split("\n")
+        self._partial_line = lines.pop()
+
+        rows = []
+        for line in lines:
+            rows.extend(self._feed_line(line + "\n"))
+        return rows
+
+    def _feed_line(self, line: str) -> List[Dict[str, Any]]:
+        # 引用符の数が奇数の間はレコードが続いている（引用符内の改行）
+        self._record_lines.append(line)
+        self._quote_count += line.count('"')
+        if self._quote_count % 2:
+            return []
+
+        record = "".join(self._record_lines)
+        self._record_lines = []
+        self._quote_count = 0
+        return self._parse_record(record)
+
+    def _parse_record(self, record: str) -> List[Dict[str, Any]]:
+        if not record.strip():
+            return []
+
+        self._feeder.queue.append(record)
+        row = next(self._reader)
+        self.line_num = self._reader.line_num
+
+        if self.fieldnames is None:
+            self.fieldnames = row
+            return []
+
+        # csv.DictReaderと同じ規則で辞書に変換
+        values = dict(zip(self.fieldnames, row))
+        if len(row) > len(self.fieldnames):
+            values[None] = row[len(self.fieldnames):]
+        elif len(row) < len(self.fieldnames):
+            for key in self.fieldnames[len(row):]:
+                values[key] = None
+        return [values]
+
+def iter_csv_rows(
+    stream: BinaryIO,
+    encoding: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """バイナリストリームからCSV行を逐次読み込む"""
+    parser = IncrementalCSVParser(encoding)
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+async def iter_upload_rows(
+    file: UploadFile,
+    encoding: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_bytes: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    アップロードされたCSVを読み込みながら行を返す（ファイル全体をメモリに載せない）
+
+    Raises:
+        UploadTooLargeError: max_bytes（未指定時はUPLOAD_CSV_MAX_BYTES）を超えた場合
+    """
+    if max_bytes is None:
+        max_bytes = settings.upload_csv_max_bytes
+    if max_bytes and file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+    parser = IncrementalCSVParser(encoding)
+    size = 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if max_bytes and size > max_bytes:
+            raise UploadTooLargeError(max_bytes)
+        for row in parser.feed(chunk):
+            yield row
+    for row in parser.close():
+        yield row
@@ -0,0 +1,280 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+from pydantic import BaseModel
+from app.utils.config import settings
+
+M = TypeVar("M", bound=BaseModel)
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+class JSONResponseError(ValueError):
+    """LLMの応答からJSONを取り出せなかった"""
+
+def json_generation_config(schema: Optional[Dict[str, Any]] = None, **extra: Any) -> Dict[str, Any]:
+    """
+    JSONで応答させる生成設定
+
+    LLM_JSON_MODE=schema: response_mime_type + response_schema（出力形式をスキーマで固定）
+    LLM_JSON_MODE=mime: response_mime_typeのみ
+    LLM_JSON_MODE=off: 指定なし（プロンプトの指示のみ）
+    """
+    config = dict(extra)
+    if settings.llm_json_mode in ("schema", "mime"):
+        config["response_mime_type"] = "application/json"
+    if settings.llm_json_mode == "schema" and schema is not None:
+        config["response_schema"] = schema
+    return config
+
+def object_schema(properties: Dict[str, Any], required: Optional[List[str]] = None) -> Dict[str, Any]:
+    """response_schema用のobject型スキーマ"""
+    schema = {"type": "object", "properties": properties}
+    if required:
+        schema["required"] = required
+    return schema
+
+def array_schema(items: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "array", "items": items}
+
+STRING_SCHEMA = {"type": "string"}
+NUMBER_SCHEMA = {"type": "number"}
+INTEGER_SCHEMA = {"type": "integer"}
+
+def parse_json(text: str, allow_repair: bool = True) -> Any:
+    """
+    LLMの応答テキストからJSONを取り出す
+
+    1. 応答全体がJSON（JSONモード）ならそのままパース
+    2. 前後の文章・```json フェンスがあれば最初の { / [ から1つ分の値をパース
+    3. それでも失敗した場合は、末尾の切れ（閉じ括弧・閉じ引用符の欠落）と
+       余分なカンマを補修してパースする（allow_repair=Falseの場合は行わない）
+
+    補修した値は途中で切れた数値・文字列をそのまま含むことがあるため、
+    保存するスコアなどの解析にはallow_repair=Falseを使う。
+
+    Raises:
+        JSONResponseError: JSONとして解釈できない場合（allow_repair=Falseでは途中で切れている場合も）
+    """
+    if not text:
+        raise JSONResponseError("応答が空です")
+
+    stripped = text.strip()
+    try:
+        return json.loads(stripped, strict=False)
+    except ValueError:
+        pass
+
+    start = _find_json_start(stripped)
+    if start < 0:
+        raise JSONResponseError("応答にJSONが含まれていません")
+
+    try:
+        value, _ = json.JSONDecoder(strict=False).raw_decode(stripped, start)
+        return value
+    except ValueError:
+        pass
+
+    if not allow_repair:
+        raise JSONResponseError("応答のJSONが途中で切れているか、形式が正しくありません")
+
+    scanner = JSONStreamParser()
+    scanner.feed(stripped[start:])
+    value = scanner.value()
+    if value is None:
+        raise JSONResponseError("JSONを補修できませんでした")
+    return value
+
+def parse_model(
+    text: str,
+    model: Type[M],
+    defaults: Optional[Dict[str, Any]] = None,
+    allow_repair: bool = True,
+    **overrides: Any
+) -> M:
+    """
+    応答テキストをパースしてpydanticモデルで検証
+
+    Raises:
+        JSONResponseError: JSONオブジェクトとして解釈できない場合
+        pydantic.ValidationError: スキーマに合わない場合
+    """
+    return validate_model(parse_json(text, allow_repair=allow_repair), model, defaults, **overrides)
+
+def parse_complete_items(text: str, key: Optional[str] = None) -> List[Any]:
+    """
+    途中で切れた応答から、配列のうち最後まで出力された要素だけを取り出す
+
+    keyを指定するとそのキーの配列（{"results": [...]} など）、指定しないか見つからない場合は最初の配列を読む。
+    各要素は応答テキストに書かれたとおりにパースし、閉じていない要素以降は捨てる（補修はしない）。
+    """
+    start = -1
+    if key is not None:
+        match = re.search(r'"%s"\s*:\s*\[' % re.escape(key), text)
+        if match:
+            start = match.end()
+    if start < 0:
+        start = text.find("[") + 1
+        if start <= 0:
+            return []
+
+    decoder = json.JSONDecoder(strict=False)
+    items = []
+    position = start
+    while True:
+        while position < len(text) and (text[position].isspace() or text[position] == ","):
+            position += 1
+        if position >= len(text) or text[position] == "]":
+            return items
+        try:
+            item, position = decoder.raw_decode(text, position)
+        except ValueError:
+            return items
+        if position >= len(text):
+            # 数値などは末尾で切れていても読めてしまうので、区切りが続いていない値は使わない
+            return items
+        items.append(item)
+
+def validate_model(
+    data: Any,
+    model: Type[M],
+    defaults: Optional[Dict[str, Any]] = None,
+    **overrides: Any
+) -> M:
+    """
+    応答JSONのオブジェクトをpydanticモデルで検証
+
+    nullの項目は除いてdefaults・モデルの既定値を使う。
+    overridesは応答に含めない項目（評価比率・抽出テキストなど）の値。
+
+    Raises:
+        JSONResponseError: dataがオブジェクトでない場合
+        pydantic.ValidationError: スキーマに合わない場合
+    """
+    if not isinstance(data, dict):
+        raise JSONResponseError("応答がJSONオブジェクトではありません")
+    fields = {key: value for key, value in data.items() if value is not None}
+    return model.model_validate({**(defaults or {}), **fields, **overrides})
+
+class JSONStreamParser:
+    """
+    少しずつ届くJSONテキストを1回の走査で解析し、途中の時点でも補修した値を返すパーサー
+
+    文字列・括弧の入れ子の状態を保持するので、feedごとに全体を走査し直さない。
+    オブジェクト・配列の閉じ括弧直前の余分なカンマは取り除く。
+    """
+
+    def __init__(self):
+        self._out: List[str] = []
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._started = False
+        self._complete = False
+        # カンマの位置とその時点の入れ子（途中で切れた要素を捨てて閉じるため）
+        self._commas: List[Tuple[int, Tuple[str, ...]]] = []
+
+    def feed(self, chunk: str) -> None:
+        for ch in chunk:
+            if self._complete:
+                return
+            if not self._started:
+                if ch not in _CLOSERS:
+                    continue
+                self._started = True
+
+            if self._in_string:
+                self._out.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = len(self._out)
+                self._out.append(ch)
+            elif ch in _CLOSERS:
+                self._stack.append(ch)
+                self._out.append(ch)
+            elif ch in "}]":
+                self._drop_trailing_comma()
+                if self._stack:
+                    self._stack.pop()
+                self._out.append(ch)
+                if not self._stack:
+                    self._complete = True
+            elif ch == ",":
+                self._commas.append((len(self._out), tuple(self._stack)))
+                self._out.append(ch)
+            else:
+                self._out.append(ch)
+
+    @property
+    def complete(self) -> bool:
+        """最上位の値が閉じたか"""
+        return self._complete
+
+    def value(self) -> Any:
+        """
+        現時点までの入力から得られる値（補修できない場合はNone）
+
+        途中で切れた要素はできるだけ捨て（直前のカンマまで戻して括弧を閉じる）、
+        書きかけの文字列を値として使うのは他に方法がない場合に限る。
+        """
+        if not self._started:
+            return None
+
+        text = "".join(self._out)
+        if self._complete:
+            return _try_loads(text)
+
+        candidates = []
+        if not self._in_string:
+            candidates.append(_strip_dangling(text) + _closers(self._stack))
+        for position, stack in reversed(self._commas[-8:]):
+            candidates.append(_strip_dangling(text[:position]) + _closers(stack))
+        if self._in_string:
+            # 書きかけの文字列（末尾のエスケープ途中は除く）を閉じる
+            closed = (text[:-1] if self._escape else text) + '"'
+            candidates.append(closed + _closers(self._stack))
+            # 書きかけのキーは捨てる
+            candidates.append(_strip_dangling(text[:self._string_start]) + _closers(self._stack))
+        else:
+            candidates.append(_strip_dangling(text) + "null" + _closers(self._stack))
+            candidates.append(_strip_dangling(text) + ":null" + _closers(self._stack))
+
+        for candidate in candidates:
+            value = _try_loads(candidate)
+            if value is not None:
+                return value
+        return None
+
+    def _drop_trailing_comma(self) -> None:
+        i = len(self._out) - 1
+        while i >= 0 and self._out[i].isspace():
+            i -= 1
+        if i >= 0 and self._out[i] == ",":
+            del self._out[i:]
+            if self._commas and self._commas[-1][0] == i:
+                self._commas.pop()
+
+def _find_json_start(text: str) -> int:
+    positions = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    return min(positions) if positions else -1
+
+def _closers(stack: Any) -> str:
+    return "".join(_CLOSERS[opener] for opener in reversed(stack))
+
+def _strip_dangling(text: str) -> str:
+    """末尾の空白・カンマを除く"""
+    return text.rstrip().rstrip(",").rstrip()
+
+def _try_loads(text: str) -> Any:
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        return None
@@ -0,0 +1,355 @@
+import abc
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+from app.utils.config import settings
+from app.utils.sqlite_store import get_data_dir
+from app.utils.tokens import estimate_tokens
+
+class LLMResponse:
+    """LLMの応答（テキストと消費トークン数）"""
+
+    def __init__(
+        self,
+        text: str,
+        total_tokens: Optional[int] = None,
+        input_tokens: Optional[int] = None,
+        output_tokens: Optional[int] = None
+    ):
+        self.text = text
+        self.total_tokens = total_tokens
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+
+class LLMBackend(abc.ABC):
+    """LLM呼び出しの実装（LLMClientから利用する）"""
+
+    name = "base"
+    available = False
+
+    @abc.abstractmethod
+    async def generate(
+        self,
+        prompt: str,
+        model_name: str,
+        generation_config: Optional[Dict[str, Any]] = None
+    ) -> LLMResponse:
+        """プロンプトから応答を生成（失敗時は例外）"""
+
+class VertexBackend(LLMBackend):
+    """
+    Vertex AI (Gemini)
+
+    vertexai.initはプロセス内で1回だけ実行し、GenerativeModelはモデル名ごとに使い回す
+    （内部のgRPCチャネルも再利用される）。生成はSDKの非同期APIで行い、イベントループを塞がない。
+    """
+
+    name = "vertex"
+
+    def __init__(self, location: str):
+        self.location = location
+        self.available = False
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+        if settings.google_cloud_project_id and settings.google_application_credentials:
+            try:
+                import vertexai
+
+                os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = settings.google_application_credentials
+                vertexai.init(project=settings.google_cloud_project_id, location=self.location)
+                self.available = True
+            except Exception as e:
+                print(f"Vertex AIの初期化に失敗しました: {e}")
+
+    def get_model(self, model_name: str):
+        """モデル名ごとにGenerativeModelを生成して使い回す"""
+        from vertexai.generative_models import GenerativeModel
+
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = GenerativeModel(model_name)
+                self._models[model_name] = model
+            return model
+
+    def _config(self, generation_config: Optional[Dict[str, Any]]):
+        """
+        dictの生成設定をSDKのGenerationConfigに変換
+
+        response_schemaはJSON Schema形式（小文字の型名）で渡し、SDK側でVertex AIの形式に変換させる。
+        """
+        if not generation_config:
+            return None
+        from vertexai.generative_models import GenerationConfig
+
+        return GenerationConfig(**generation_config)
+
+    async def generate(
+        self,
+        prompt: str,
+        model_name: str,
+        generation_config: Optional[Dict[str, Any]] = None
+    ) -> LLMResponse:
+        if not self.available:
+            raise RuntimeError("Vertex AIが初期化されていません。Google Cloudの認証情報を設定してください。")
+
+        model = self.get_model(model_name)
+        response = await model.generate_content_async(prompt, generation_config=self._config(generation_config))
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            response.text,
+            total_tokens=getattr(usage, "total_token_count", None) or None,
+            input_tokens=getattr(usage, "prompt_token_count", None) or None,
+            output_tokens=getattr(usage, "candidates_token_count", None) or None
+        )
+
+class FakeBackend(LLMBackend):
+    """
+    認証情報なしで負荷試験・ベンチマークを行うためのローカルLLM
+
+    プロンプトの種類（評価・まとめて評価・取り込み・面接質問・仕分け・構造化）を判別し、
+    それぞれの出力形式に沿ったJSONを返す（JSONモードでなければGeminiと同様に```jsonで囲む）。内容はプロンプト（まとめて評価の場合は応募者ごとのデータ）
+    のハッシュから決まるため、同じ入力には常に同じ応答を返す。
+    応答時間は対数正規分布（中央値latency、ばらつきlatency_sigma）、
+    error_rateの割合で一時的な障害（429/503）を発生させる。
+    """
+
+    name = "fake"
+    available = True
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        # 応答時間・障害の発生だけに使う（応答内容はプロンプトから決まる）
+        self._random = random.Random(seed)
+
+    async def generate(
+        self,
+        prompt: str,
+        model_name: str,
+        generation_config: Optional[Dict[str, Any]] = None
+    ) -> LLMResponse:
+        if self.latency > 0:
+            delay = self.latency * self._random.lognormvariate(0, self.latency_sigma) if self.latency_sigma else self.latency
+            await asyncio.sleep(delay)
+
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise self._transient_error()
+
+        data = self._respond(prompt)
+        if (generation_config or {}).get("response_mime_type") == "application/json":
+            text = json.dumps(data, ensure_ascii=False)
+        else:
+            text = "```json\n" + json.dumps(data, ensure_ascii=False, indent=2) + "\n```"
+        input_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(text)
+        return LLMResponse(text, input_tokens + output_tokens, input_tokens, output_tokens)
+
+    def _transient_error(self) -> Exception:
+        from google.api_core import exceptions as gexc
+
+        if self._random.random() < 0.5:
+            return gexc.TooManyRequests("Resource exhausted (fake backend)")
+        return gexc.ServiceUnavailable("Service unavailable (fake backend)")
+
+    def _respond(self, prompt: str) -> Dict[str, Any]:
+        if "--- 応募者ID:" in prompt:
+            return {
+                "results": [
+                    {"id": int(applicant_id), "evaluation": self._evaluation(prompt, block)}
+                    for applicant_id, block in re.findall(
+                        r"--- 応募者ID: (\d+) ---\n(.*?)(?=\n--- 応募者ID: |\n【評価基準】)", prompt, re.S
+                    )
+                ]
+            }
+        if "【評価基準】" in prompt and "【抽出テキスト】" in prompt:
+            # 取り込み（構造化・ステージ推奨・評価をまとめて行う）
+            match = re.search(r"【抽出テキスト】\n(.*?)\n【評価基準】", prompt, re.S)
+            text = match.group(1) if match else prompt
+            return {
+                "applicant_data": self._applicant_data(f"【抽出テキスト】\n{text}\n【出力形式】"),
+                "recommended_stage": "document_screening",
+                "recommendation_reason": "ローカルLLMによる仮の推奨です。",
+                "missing_info": [],
+                "evaluation": self._evaluation(prompt, text)
+            }
+        if "【評価基準】" in prompt:
+            match = re.search(r"【応募者データ】\n(.*?)\n【評価基準】", prompt, re.S)
+            return self._evaluation(prompt, match.group(1) if match else prompt)
+        if '"questions"' in prompt:
+            return self._questions(prompt)
+        if '"recommended_stage"' in prompt:
+            return {
+                "applicant_data": self._applicant_data(prompt),
+                "recommended_stage": "document_screening",
+                "recommendation_reason": "ローカルLLMによる仮の推奨です。",
+                "missing_info": [],
+                "quality_score": round(_rng(prompt).uniform(5.0, 9.5), 1),
+                "auto_actions": []
+            }
+        if "【抽出テキスト】" in prompt:
+            return self._applicant_data(prompt)
+        return {}
+
+    def _evaluation(self, prompt: str, applicant_text: str) -> Dict[str, Any]:
+        rng = _rng(applicant_text)
+        skill_evaluations = [
+            {"category": category, "score": round(rng.uniform(3.0, 9.5), 1), "evidence": [f"{category}に関する記述"]}
+            for category in ("技術力", "経験", "資格・学歴")
+        ]
+        mindset_evaluations = [
+            {"category": category, "score": round(rng.uniform(3.0, 9.5), 1), "evidence": [f"{category}に関する記述"]}
+            for category in ("成長志向", "主体性", "協調性", "価値観適合", "情熱・モチベーション")
+        ]
+        skill_score = round(sum(e["score"] for e in skill_evaluations) / len(skill_evaluations), 2)
+        mindset_score = round(sum(e["score"] for e in mindset_evaluations) / len(mindset_evaluations), 2)
+
+        ratios = re.search(r"\(skill_score × ([\d.]+)\) \+ \(mindset_score × ([\d.]+)\)", prompt)
+        skill_ratio, mindset_ratio = (float(ratios.group(1)), float(ratios.group(2))) if ratios else (0.2, 0.8)
+
+        return {
+            "skill_evaluations": skill_evaluations,
+            "mindset_evaluations": mindset_evaluations,
+            "skill_score": skill_score,
+            "mindset_score": mindset_score,
+            "total_score": round(skill_score * skill_ratio + mindset_score * mindset_ratio, 2),
+            "summary": "ローカルLLMによる仮の評価です。",
+            "strengths": ["主体性", "学習意欲"],
+            "concerns": ["実務経験の確認が必要"]
+        }
+
+    def _questions(self, prompt: str) -> Dict[str, Any]:
+        match = re.search(r"一次面接質問を(\d+)個", prompt)
+        count = int(match.group(1)) if match else 10
+        categories = ["成長志向", "主体性", "協調性", "価値観", "その他"]
+        return {
+            "questions": [
+                {
+                    "question": f"質問{i + 1}: これまでの経験について具体的に教えてください。",
+                    "category": categories[i % len(categories)],
+                    "intent": "ローカルLLMによる仮の質問です。"
+                }
+                for i in range(count)
+            ]
+        }
+
+    def _applicant_data(self, prompt: str) -> Dict[str, Any]:
+        match = re.search(r"【抽出テキスト】\n(.*?)\n【出力形式】", prompt, re.S)
+        text = match.group(1) if match else prompt
+        email = re.search(r"[\w.+-]+@[\w-]+\.[\w.-]+", text)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:8]
+        return {
+            "name": f"応募者{digest}",
+            "email": email.group(0) if email else f"{digest}@example.com",
+            "phone": None,
+            "education": [],
+            "work_experience": [],
+            "technical_skills": [],
+            "soft_skills": [],
+            "certifications": [],
+            "motivation": "",
+            "career_goals": "",
+            "additional_info": ""
+        }
+
+class RecordReplayBackend(LLMBackend):
+    """
+    応答をディスクに記録・再生するバックエンド
+
+    record: 内側のバックエンド（通常はVertex AI）を呼び出し、応答をJSONファイルに保存する
+    replay: 保存済みの応答を返す（記録がないプロンプトはLookupError）
+
+    ファイル名はモデル名・プロンプト・生成設定のSHA-256。
+    """
+
+    def __init__(self, mode: str, directory: Path, inner: Optional[LLMBackend] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown record/replay mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("record mode requires an inner backend")
+
+        self.name = mode
+        self.mode = mode
+        self.directory = directory
+        self.inner = inner
+        self.available = inner.available if mode == "record" else True
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    async def generate(
+        self,
+        prompt: str,
+        model_name: str,
+        generation_config: Optional[Dict[str, Any]] = None
+    ) -> LLMResponse:
+        path = self._path(prompt, model_name, generation_config)
+
+        if self.mode == "replay":
+            if not path.exists():
+                raise LookupError(f"記録された応答がありません: {path.name}")
+            data = json.loads(await asyncio.to_thread(path.read_text, encoding="utf-8"))
+            return LLMResponse(
+                data["text"], data.get("total_tokens"), data.get("input_tokens"), data.get("output_tokens")
+            )
+
+        response = await self.inner.generate(prompt, model_name, generation_config)
+        await asyncio.to_thread(self._save, path, {
+            "model": model_name,
+            "prompt": prompt,
+            "generation_config": generation_config,
+            "text": response.text,
+            "total_tokens": response.total_tokens,
+            "input_tokens": response.input_tokens,
+            "output_tokens": response.output_tokens
+        })
+        return response
+
+    def _path(self, prompt: str, model_name: str, generation_config: Optional[Dict[str, Any]]) -> Path:
+        payload = json.dumps(
+            {"model": model_name, "prompt": prompt, "generation_config": generation_config},
+            ensure_ascii=False, sort_keys=True
+        )
+        key = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _save(self, path: Path, data: Dict[str, Any]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+def create_backend(name: str, location: str) -> LLMBackend:
+    """設定名からバックエンドを生成（vertex / fake / record / replay）"""
+    if name == "vertex":
+        return VertexBackend(location)
+    if name == "fake":
+        return FakeBackend(
+            latency=settings.llm_fake_latency_seconds,
+            latency_sigma=settings.llm_fake_latency_sigma,
+            error_rate=settings.llm_fake_error_rate,
+            seed=settings.llm_fake_seed
+        )
+    if name in ("record", "replay"):
+        directory = Path(settings.llm_recordings_dir)
+        if not directory.is_absolute():
+            directory = get_data_dir() / directory
+        inner = VertexBackend(location) if name == "record" else None
+        return RecordReplayBackend(name, directory, inner)
+    raise ValueError(f"Unknown LLM backend: {name}")
+
+def _rng(text: str) -> random.Random:
+    """テキストから決まる乱数生成器（同じ入力には同じ応答を返すため）"""
+    return random.Random(hashlib.sha256(text.encode("utf-8")).digest())
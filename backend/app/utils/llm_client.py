@@ -0,0 +1,122 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+from app.utils.config import settings
+from app.utils.llm_backends import LLMBackend, create_backend
+from app.utils.rate_limiter import AdmissionController, Priority
+from app.utils.resilience import CircuitBreaker, call_with_retry
+from app.utils.tokens import TokenUsageRecorder, estimate_tokens
+
+DEFAULT_MODEL_NAME = "gemini-1.5-flash"
+DEFAULT_LOCATION = "us-central1"
+
+# トークン数/分の枠を予約する際に見込む出力トークン数（実績は応答後に反映）
+EXPECTED_OUTPUT_TOKENS = 1024
+
+class LLMClient:
+    """
+    LLM (Gemini) の共有クライアント
+
+    実際の呼び出しはバックエンド（LLM_BACKEND: vertex / fake / record / replay）に委譲する。
+    すべての呼び出しはAdmissionControllerを通り、クォータ内に収まるよう流量制御される。
+    一時的な障害はタイムアウト・ジッター付き指数バックオフでリトライし、障害が続く間は
+    サーキットブレーカーで即座に失敗させる。
+    呼び出しごとの入力・出力トークン数と応答時間は用途（purpose）別にusageへ記録する。
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        location: str = DEFAULT_LOCATION,
+        backend: Optional[LLMBackend] = None
+    ):
+        self.model_name = model_name
+        self.location = location
+        self.backend = backend or create_backend(settings.llm_backend, location)
+        self.governor = AdmissionController(
+            requests_per_minute=settings.llm_requests_per_minute,
+            tokens_per_minute=settings.llm_tokens_per_minute,
+            max_in_flight=settings.llm_max_in_flight
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.llm_circuit_failure_threshold,
+            reset_timeout=settings.llm_circuit_reset_seconds
+        )
+        self.usage = TokenUsageRecorder()
+
+    @property
+    def available(self) -> bool:
+        return self.backend.available
+
+    async def generate(
+        self,
+        prompt: str,
+        model_name: Optional[str] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        purpose: str = "other",
+        items: int = 1
+    ) -> str:
+        """
+        プロンプトを送信して応答テキストを返す
+
+        Args:
+            priority: INTERACTIVEはBATCHより先に実行枠を割り当てられる
+            purpose: トークン使用量を集計する用途名（evaluation, structuring など）
+            items: 1回の呼び出しで処理する件数（まとめて評価の人数）
+
+        Raises:
+            RuntimeError: Vertex AIが初期化されていない場合
+            LLMUnavailableError: 一時的な障害でリトライ上限に達した場合・サーキットオープン中の場合
+        """
+        if not self.available:
+            raise RuntimeError("Vertex AIが初期化されていません。Google Cloudの認証情報を設定してください。")
+
+        model_name = model_name or self.model_name
+        input_tokens = estimate_tokens(prompt)
+        estimated_tokens = input_tokens + EXPECTED_OUTPUT_TOKENS
+
+        async def attempt() -> str:
+            # リトライごとにクォータを消費するため、1回の試行ごとに実行枠を確保する
+            async with self.governor.acquire(estimated_tokens, priority) as permit:
+                started_at = time.monotonic()
+                # タイムアウトはバックエンドの呼び出しだけに適用する（実行枠の待ち時間は含めず、
+                # 流量制御で待たされただけの呼び出しをサーキットブレーカーの失敗として数えない）
+                response = await asyncio.wait_for(
+                    self.backend.generate(prompt, model_name, generation_config),
+                    settings.llm_timeout_seconds or None
+                )
+                if response.total_tokens:
+                    permit.actual_tokens = response.total_tokens
+                self.usage.record(
+                    purpose,
+                    input_tokens=response.input_tokens or input_tokens,
+                    output_tokens=response.output_tokens or estimate_tokens(response.text),
+                    latency=time.monotonic() - started_at,
+                    items=items
+                )
+                return response.text
+
+        try:
+            return await call_with_retry(
+                attempt,
+                max_attempts=settings.llm_max_attempts,
+                base_delay=settings.llm_retry_base_delay,
+                max_delay=settings.llm_retry_max_delay,
+                breaker=self.breaker
+            )
+        except Exception:
+            self.usage.record_error(purpose)
+            raise
+
+class _LLMClientHolder:
+    _instance: LLMClient = None
+
+    @classmethod
+    def get_client(cls) -> LLMClient:
+        if cls._instance is None:
+            cls._instance = LLMClient()
+        return cls._instance
+
+def get_llm_client() -> LLMClient:
+    return _LLMClientHolder.get_client()
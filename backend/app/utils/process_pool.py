@@ -0,0 +1,250 @@
+import asyncio
+import multiprocessing
+import os
+import pickle
+import threading
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from app.utils.config import settings
+
+T = TypeVar("T")
+
+class ParseTimeoutError(TimeoutError):
+    """解析処理がタイムアウトした（ワーカープロセスは停止済み）"""
+
+class WorkerCrashedError(RuntimeError):
+    """解析処理中にワーカープロセスが異常終了した"""
+
+def _worker_main(conn) -> None:
+    """ワーカープロセス: (関数, 引数) を受け取って実行し、結果か例外を返す"""
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        if message is None:
+            return
+
+        func, args = message
+        try:
+            reply = ("ok", func(*args))
+        except Exception as e:
+            reply = ("error", e)
+        try:
+            conn.send(reply)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            # 結果・例外を送れない場合は内容を文字列にして返す
+            conn.send(("error", RuntimeError(f"{type(e).__name__}: {e}")))
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def call(self, func: Callable[..., Any], args: tuple, timeout: Optional[float]) -> Any:
+        """
+        関数をワーカーで実行して結果を返す（スレッドから呼び出す）
+
+        Raises:
+            ParseTimeoutError / WorkerCrashedError: ワーカーは使えなくなっている（呼び出し側で停止する）
+        """
+        self.tasks += 1
+        try:
+            self.conn.send((func, args))
+            finished = self.conn.poll(timeout)
+            if finished:
+                status, payload = self.conn.recv()
+        except (EOFError, OSError) as e:
+            self.process.join(timeout=1)
+            raise WorkerCrashedError(f"解析処理中にワーカープロセスが終了しました（終了コード: {self.process.exitcode}）") from e
+        if not finished:
+            raise ParseTimeoutError(f"解析処理が{timeout}秒以内に終わりませんでした")
+
+        if status == "error":
+            raise payload
+        return payload
+
+    def stop(self, kill: bool = False) -> None:
+        try:
+            if kill or not self.process.is_alive():
+                self.process.kill()
+            else:
+                self.conn.send(None)
+            self.process.join(timeout=5)
+        except Exception:
+            pass
+        finally:
+            self.conn.close()
+
+class ProcessPool:
+    """
+    CPUを使う文書解析（PDF・Word・Excelなど）を別プロセスで実行するプール
+
+    - max_workers: ワーカープロセス数の上限（必要になった時点で起動する）
+    - task_timeout: 1タスクのタイムアウト。超えたワーカーは停止して起動し直す
+    - max_tasks_per_worker: この件数を処理したワーカーは入れ替える（メモリの断片化・リーク対策）
+
+    ワーカーごとにパイプでタスクを1件ずつ渡すため、不正なファイルでワーカーが異常終了・停止しても
+    影響はそのタスクだけで、他のワーカーで実行中のタスクは続行する。
+    関数と引数はpickleできる必要がある（モジュールの最上位で定義した純粋な関数を使う）。
+    """
+
+    def __init__(self, max_workers: int, task_timeout: Optional[float] = None, max_tasks_per_worker: int = 0):
+        self.max_workers = max(1, max_workers)
+        self.task_timeout = task_timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+        # fork()はスレッドを使うgRPCクライアントなどと相性が悪いため、spawnで起動する
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: List[_Worker] = []
+        self._started = 0
+        self._lock = threading.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._stats = {"tasks": 0, "errors": 0, "timeouts": 0, "crashes": 0, "workers_started": 0}
+
+    async def run(self, func: Callable[..., T], *args: Any, timeout: Optional[float] = None) -> T:
+        """
+        関数をワーカープロセスで実行して結果を返す
+
+        呼び出し元がキャンセルされてもワーカーは停止しない。実行中のタスクが終わった時点で
+        結果を捨ててワーカーをプールに戻す（それまで実行枠も使ったままにする）。
+
+        Raises:
+            関数が送出した例外（ValueErrorなど）、ParseTimeoutError、WorkerCrashedError
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        timeout = self.task_timeout if timeout is None else timeout
+
+        await self._slots.acquire()
+        try:
+            worker = await self._acquire_worker()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        call = asyncio.ensure_future(asyncio.to_thread(worker.call, func, args, timeout))
+        try:
+            # waitはキャンセルされても待っているタスクをキャンセルしない
+            await asyncio.wait([call])
+        except asyncio.CancelledError:
+            call.add_done_callback(lambda f: self._discard(worker, f))
+            raise
+        return self._finish(worker, call)
+
+    async def _acquire_worker(self) -> _Worker:
+        acquire = asyncio.ensure_future(asyncio.to_thread(self._acquire))
+        try:
+            return await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            # 起動中のワーカーは起動し終わった時点でプールに戻す
+            acquire.add_done_callback(
+                lambda f: f.cancelled() or f.exception() is not None or self._release(f.result(), True)
+            )
+            raise
+
+    def _finish(self, worker: _Worker, call: "asyncio.Future[T]") -> T:
+        """終わったタスクの結果を返し、ワーカーと実行枠を戻す"""
+        healthy = False
+        try:
+            result = call.result()
+            healthy = True
+            return result
+        except ParseTimeoutError:
+            self._count("timeouts")
+            raise
+        except WorkerCrashedError:
+            self._count("crashes")
+            raise
+        except Exception:
+            # 関数が送出した例外（ワーカーは引き続き使える）
+            healthy = True
+            self._count("errors")
+            raise
+        finally:
+            self._count("tasks")
+            self._release(worker, healthy)
+            self._slots.release()
+
+    def _discard(self, worker: _Worker, call: "asyncio.Future[Any]") -> None:
+        """呼び出し元がキャンセルされたタスクの後始末（結果・例外は捨てる）"""
+        try:
+            self._finish(worker, call)
+        except BaseException:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "max_workers": self.max_workers,
+                "workers": self._started,
+                "idle_workers": len(self._idle),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers, self._idle = self._idle, []
+            self._started -= len(workers)
+        for worker in workers:
+            worker.stop()
+
+    def _acquire(self) -> _Worker:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            self._started += 1
+            self._stats["workers_started"] += 1
+        try:
+            return _Worker(self._context)
+        except Exception:
+            with self._lock:
+                self._started -= 1
+            raise
+
+    def _release(self, worker: _Worker, healthy: bool) -> None:
+        retire = not healthy or (self.max_tasks_per_worker and worker.tasks >= self.max_tasks_per_worker)
+        if retire:
+            with self._lock:
+                self._started -= 1
+            worker.stop(kill=not healthy)
+            return
+        with self._lock:
+            self._idle.append(worker)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+class InlineRunner:
+    """プロセスプールを使わない場合の代替（スレッドで実行する。タイムアウト・障害の分離はない）"""
+
+    async def run(self, func: Callable[..., T], *args: Any, timeout: Optional[float] = None) -> T:
+        return await asyncio.to_thread(func, *args)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": False}
+
+    def shutdown(self) -> None:
+        pass
+
+class _ProcessPoolHolder:
+    _instance = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            if settings.parse_pool_enabled:
+                cls._instance = ProcessPool(
+                    max_workers=settings.parse_pool_workers or min(4, os.cpu_count() or 1),
+                    task_timeout=settings.parse_task_timeout_seconds,
+                    max_tasks_per_worker=settings.parse_pool_max_tasks_per_worker
+                )
+            else:
+                cls._instance = InlineRunner()
+        return cls._instance
+
+def get_process_pool():
+    """プロセス内で共有する文書解析用のプール"""
+    return _ProcessPoolHolder.get_instance()
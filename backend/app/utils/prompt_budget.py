@@ -0,0 +1,117 @@
+import json
+import re
+from collections import Counter
+from typing import Any, List, Optional, Set
+from app.utils.config import settings
+from app.utils.tokens import estimate_tokens
+
+TRUNCATION_MARKER = "\n…（中略）…\n"
+
+# ページの区切り（PDFのページごとのテキストはこれで区切って連結する）
+PAGE_BREAK = "\f"
+
+# ページの先頭・末尾から何行をヘッダー・フッターの候補にするか
+_EDGE_LINES = 2
+
+# どこにあってもページ番号とみなす行（「- 3 -」「Page 3」「Page 3 of 12」「3ページ」）
+_PAGE_NUMBER_RE = re.compile(
+    r"^(?:[-‐－―]\s*\d{1,4}\s*[-‐－―]|(?:page|p\.)\s*\d{1,4}(?:\s*(?:/|／|of)\s*\d{1,4})?|\d{1,4}\s*(?:ページ|頁))$",
+    re.IGNORECASE
+)
+
+# 「2/5」形式の行（日付と区別するため、ページの先頭・末尾にあり分母が総ページ数と一致する場合だけページ番号とみなす）
+_PAGE_OF_RE = re.compile(r"^(\d{1,4})\s*(?:/|／|of)\s*(\d{1,4})$", re.IGNORECASE)
+
+# 先頭・末尾のどちらを多く残すか（履歴書は冒頭に氏名・職歴、末尾に自己PRが来ることが多い）
+_HEAD_RATIO = 0.7
+
+def compact_json(value: Any) -> str:
+    """インデント・空白なしのJSON（プロンプトに埋め込む用）"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+def remove_repeated_lines(text: str, min_repeats: int = 3) -> str:
+    """
+    ページのヘッダー・フッター行とページ番号を除去
+
+    テキストはPAGE_BREAKでページに区切り、各ページの先頭・末尾の行だけを対象にする。
+    min_repeatsページ以上（ページ数がそれより少なければ2ページ以上）の先頭・末尾に繰り返し出てくる行は
+    最初の1回だけ残す。本文中の同じ行（履歴書の月の欄など）は繰り返されていても残す。
+    ページ番号は「- 3 -」「Page 3」のような明示的な形式だけを除く。「2/5」は日付と区別するため、
+    ページの先頭・末尾にあり分母が総ページ数と一致する場合だけ除く。
+    """
+    pages = [page.splitlines() for page in text.split(PAGE_BREAK)]
+    edges = [_edge_indexes(lines) for lines in pages]
+
+    counts = Counter()
+    for lines, indexes in zip(pages, edges):
+        # 数字だけの行（年月の欄など）はヘッダー・フッターとみなさない
+        counts.update({lines[i].strip() for i in indexes if not lines[i].strip().isdigit()})
+    threshold = max(2, min(min_repeats, len(pages)))
+    repeated = {key for key, count in counts.items() if count >= threshold}
+
+    seen = set()
+    kept_pages = []
+    for lines, indexes in zip(pages, edges):
+        kept = []
+        for i, line in enumerate(lines):
+            key = line.strip()
+            if key and _PAGE_NUMBER_RE.match(key):
+                continue
+            if i in indexes:
+                if _is_page_of(key, len(pages)):
+                    continue
+                if key in repeated:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+            kept.append(line)
+        kept_pages.append("\n".join(kept))
+    return "\n\n".join(kept_pages)
+
+def normalize_whitespace(text: str) -> str:
+    """行末の空白を除き、連続する空行を1行にまとめる"""
+    text = re.sub(r"[ \t　]+\n", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+def truncate_to_budget(text: str, max_tokens: int) -> str:
+    """トークン数の見込みがmax_tokensを超える場合、先頭と末尾を残して中間を省略"""
+    if not text or max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text
+
+    budget = max_tokens - estimate_tokens(TRUNCATION_MARKER)
+    head = _take_tokens(text, int(budget * _HEAD_RATIO))
+    tail = _take_tokens(text[::-1], budget - estimate_tokens(head))[::-1]
+    return head + TRUNCATION_MARKER + tail
+
+def prepare_document_text(text: str, max_tokens: Optional[int] = None) -> str:
+    """
+    OCR・ファイル抽出テキストをプロンプト用に圧縮
+
+    繰り返しのヘッダー・フッター行と余分な空白を除き、予算を超える分は中間を省略する。
+    """
+    if not text:
+        return text
+    max_tokens = settings.prompt_document_token_budget if max_tokens is None else max_tokens
+    return truncate_to_budget(normalize_whitespace(remove_repeated_lines(text)), max_tokens)
+
+def _is_page_of(line: str, page_count: int) -> bool:
+    match = _PAGE_OF_RE.match(line)
+    return bool(match) and int(match.group(1)) <= int(match.group(2)) == page_count
+
+def _edge_indexes(lines: List[str]) -> Set[int]:
+    """ページの先頭・末尾_EDGE_LINES行（空行を除く）の行番号"""
+    indexes = [i for i, line in enumerate(lines) if line.strip()]
+    return set(indexes[:_EDGE_LINES] + indexes[-_EDGE_LINES:])
+
+def _take_tokens(text: str, max_tokens: int) -> str:
+    """先頭からmax_tokens以内に収まる部分を取り出す"""
+    if max_tokens <= 0:
+        return ""
+    # estimate_tokensと同じ数え方（ASCIIは4文字で1トークン、それ以外は1文字1トークン）
+    used = 0.0
+    for i, ch in enumerate(text):
+        used += 0.25 if ch.isascii() else 1.0
+        if used > max_tokens:
+            return text[:i]
+    return text
@@ -0,0 +1,156 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, Dict, List, Optional
+
+class Priority(IntEnum):
+    """LLM呼び出しの優先度（値が小さいほど先に実行）"""
+    INTERACTIVE = 0  # 画面操作からの評価・質問生成
+    BATCH = 1        # CSV一括処理などのバックグラウンド処理
+
+class TokenBucket:
+    """1分あたりの上限を連続的に補充するトークンバケット"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """amount分のトークンが使えるようになるまでの秒数（0なら即時）"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        """見積もりと実績の差を反映（正なら追加消費、負なら返却）"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+class Permit:
+    """実行許可。実際の消費トークン数が分かったらactual_tokensに設定する"""
+
+    def __init__(self, estimated_tokens: int):
+        self.estimated_tokens = estimated_tokens
+        self.actual_tokens: Optional[int] = None
+
+class AdmissionController:
+    """
+    LLM呼び出しの流量制御
+
+    リクエスト数/分・トークン数/分のトークンバケットと同時実行数の上限を守り、
+    待ち行列は優先度順（同じ優先度なら到着順）に処理する。
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_in_flight: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_in_flight = max(1, max_in_flight)
+        self.in_flight = 0
+        self._queue: List[tuple] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._admitted = {p.name.lower(): 0 for p in Priority}
+        self._waits = {p.name.lower(): deque(maxlen=1000) for p in Priority}
+
+    @asynccontextmanager
+    async def acquire(self, estimated_tokens: int, priority: Priority = Priority.INTERACTIVE):
+        """実行枠を確保（空くまで待つ）。ブロックを抜けると枠を解放する"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        enqueued_at = time.monotonic()
+        heapq.heappush(self._queue, (int(priority), next(self._seq), future, estimated_tokens))
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 許可された直後にキャンセルされた場合は枠を返す
+                self._release(estimated_tokens, None)
+            raise
+
+        name = Priority(priority).name.lower()
+        self._admitted[name] += 1
+        self._waits[name].append(time.monotonic() - enqueued_at)
+
+        permit = Permit(estimated_tokens)
+        try:
+            yield permit
+        finally:
+            self._release(estimated_tokens, permit.actual_tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        """待ち行列の長さ、実行中の件数、待ち時間などを取得"""
+        queued = {p.name.lower(): 0 for p in Priority}
+        for priority, _, future, _ in self._queue:
+            if not future.done():
+                queued[Priority(priority).name.lower()] += 1
+
+        waits = {}
+        for name, samples in self._waits.items():
+            ordered = sorted(samples)
+            waits[name] = {
+                "count": len(ordered),
+                "avg_seconds": round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+                "p95_seconds": round(ordered[int(len(ordered) * 0.95) - 1], 3) if ordered else 0.0,
+                "max_seconds": round(ordered[-1], 3) if ordered else 0.0,
+            }
+
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": sum(queued.values()),
+            "queued": queued,
+            "admitted": dict(self._admitted),
+            "wait_time": waits,
+            "available_requests": round(self.requests.tokens, 1),
+            "available_tokens": round(self.tokens.tokens),
+        }
+
+    def _release(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        self.in_flight -= 1
+        if actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """先頭の待ちから順に、上限に収まる限り実行を許可する"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._queue and self.in_flight < self.max_in_flight:
+            _, _, future, estimated_tokens = self._queue[0]
+            if future.done():
+                # キャンセル済みの待ち
+                heapq.heappop(self._queue)
+                continue
+
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+            if wait > 0:
+                # 優先度の高い待ちを追い越させないため、先頭が実行できるまで待つ
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+
+            heapq.heappop(self._queue)
+            self.requests.consume(1)
+            self.tokens.consume(estimated_tokens)
+            self.in_flight += 1
+            future.set_result(None)
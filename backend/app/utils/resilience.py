@@ -0,0 +1,156 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+class LLMUnavailableError(RuntimeError):
+    """LLMが一時的に利用できない（リトライ上限到達・サーキットオープン）"""
+
+class CircuitOpenError(LLMUnavailableError):
+    """サーキットブレーカーが開いているため呼び出しを行わなかった"""
+
+def is_retryable(exc: BaseException) -> bool:
+    """一時的な障害（429・5xx・タイムアウト・接続断）かどうか"""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+
+    try:
+        from google.api_core import exceptions as gexc
+    except ImportError:
+        return False
+
+    return isinstance(exc, (
+        gexc.TooManyRequests,  # ResourceExhaustedを含む
+        gexc.ServiceUnavailable,
+        gexc.InternalServerError,
+        gexc.GatewayTimeout,
+        gexc.DeadlineExceeded,
+        gexc.Aborted,
+    ))
+
+class CircuitBreaker:
+    """
+    連続失敗でオープンし、一定時間は呼び出しを即座に失敗させるサーキットブレーカー
+
+    reset_timeout経過後はハーフオープンとなり、1件だけ試行を通す。
+    成功すればクローズ、失敗すれば再びオープンする。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """呼び出してよいか（ハーフオープン中は試行1件のみ許可）"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self._rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self._state = self.CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """ハーフオープン中の試行が成否不明のまま終わった場合（キャンセル等）に枠を戻す"""
+        self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        return {
+            "state": state,
+            "consecutive_failures": self._failures,
+            "rejected": self._rejected,
+            "retry_in_seconds": round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1)
+            if state == self.OPEN else 0.0,
+        }
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """指数バックオフ（フルジッター）: 0〜min(max_delay, base_delay * 2^attempt) の一様乱数"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+async def call_with_retry(
+    func: Callable[[], Awaitable[T]],
+    max_attempts: int = 3,
+    timeout: Optional[float] = None,
+    base_delay: float = 1.0,
+    max_delay: float = 20.0,
+    breaker: Optional[CircuitBreaker] = None,
+    retryable: Callable[[BaseException], bool] = is_retryable
+) -> T:
+    """
+    タイムアウト・リトライ・サーキットブレーカー付きで非同期関数を呼び出す
+
+    一時的な障害のみリトライし、それ以外の例外はそのまま送出する。
+    一時的な障害でリトライ上限に達した場合はLLMUnavailableErrorを送出する。
+
+    Raises:
+        CircuitOpenError: サーキットが開いている場合（呼び出しは行わない）
+        LLMUnavailableError: 一時的な障害が続いた場合
+    """
+    attempts = max(1, max_attempts)
+
+    for attempt in range(attempts):
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError("LLMが一時的に利用できません（サーキットオープン中）")
+
+        try:
+            if timeout:
+                result = await asyncio.wait_for(func(), timeout)
+            else:
+                result = await func()
+        except asyncio.CancelledError:
+            if breaker is not None:
+                breaker.release_trial()
+            raise
+        except Exception as e:
+            if not retryable(e):
+                # 入力不正などは障害として数えない
+                if breaker is not None:
+                    breaker.release_trial()
+                raise
+
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt + 1 >= attempts:
+                reason = "タイムアウト" if isinstance(e, asyncio.TimeoutError) else str(e)
+                raise LLMUnavailableError(f"LLM呼び出しが{attempts}回失敗しました: {reason}") from e
+
+            await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay))
+            continue
+
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+    raise LLMUnavailableError("LLM呼び出しに失敗しました")
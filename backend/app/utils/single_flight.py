@@ -0,0 +1,63 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+def input_hash(*values: Any) -> str:
+    """入力値（pydanticモデル・dict・文字列など）から決まるハッシュ"""
+    normalized = [value.model_dump() if isinstance(value, BaseModel) else value for value in values]
+    payload = json.dumps(normalized, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def flight_key(operation: str, subject_id: Optional[str], *inputs: Any) -> Tuple[str, Optional[str], str]:
+    """(処理名, 応募者ID, 入力のハッシュ) のキー"""
+    return operation, subject_id, input_hash(*inputs)
+
+class SingleFlight:
+    """
+    同じキーの処理が実行中なら、新しく実行せずにその結果を待つ
+
+    処理はタスクとして実行するため、最初の呼び出し元が切断・キャンセルされても
+    後から待っている呼び出し元には結果が返る。完了したキーは即座に削除する（結果はキャッシュしない）。
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._executed = 0
+        self._shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._shared += 1
+        else:
+            self._executed += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._in_flight.get(key) is t and self._in_flight.pop(key))
+            # 全員がキャンセルされた場合に「例外が取得されなかった」警告を出さない
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._in_flight),
+            "executed": self._executed,
+            "shared": self._shared,
+        }
+
+class _SingleFlightHolder:
+    _instance: SingleFlight = None
+
+    @classmethod
+    def get_instance(cls) -> SingleFlight:
+        if cls._instance is None:
+            cls._instance = SingleFlight()
+        return cls._instance
+
+def get_single_flight() -> SingleFlight:
+    return _SingleFlightHolder.get_instance()
@@ -0,0 +1,57 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, List, Sequence
+from app.utils.config import settings
+
+# backendディレクトリ（相対パス指定時の基準）
+BACKEND_DIR = Path(__file__).parent.parent.parent
+
+def get_data_dir() -> Path:
+    """ローカル永続データの保存先ディレクトリを取得"""
+    data_dir = Path(settings.local_data_dir)
+    if not data_dir.is_absolute():
+        data_dir = BACKEND_DIR / data_dir
+    data_dir.mkdir(parents=True, exist_ok=True)
+    return data_dir
+
+class SQLiteStore:
+    """ローカル永続化用のSQLiteラッパー（スレッド間で共有可能）"""
+
+    def __init__(self, filename: str, schema: str):
+        self.path = get_data_dir() / filename
+        self._lock = threading.RLock()
+        # isolation_level=None: 自動コミット。複数文をまとめる場合はtransaction()を使う
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(schema)
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        """SQLを実行して結果行を返す"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def execute_rowcount(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """更新系SQLを実行して影響を受けた行数を返す"""
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def executemany(self, sql: str, seq_of_params: Iterable[Sequence[Any]]) -> None:
+        """同じSQLを複数のパラメータで実行（1トランザクション）"""
+        with self.transaction() as conn:
+            conn.executemany(sql, seq_of_params)
+
+    @contextmanager
+    def transaction(self):
+        """明示的なトランザクション"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
@@ -0,0 +1,63 @@
+from typing import Any, Dict
+
+def estimate_tokens(text: str) -> int:
+    """
+    トークン数の概算（APIを呼ばずにローカルで計算）
+
+    Geminiのトークナイザーでは英数字はおよそ4文字で1トークン、
+    日本語などの非ASCII文字はおよそ1文字1トークンになる。
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ch.isascii())
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+class TokenUsageRecorder:
+    """LLM呼び出しごとの入力・出力トークン数と応答時間を用途別に集計"""
+
+    def __init__(self):
+        self._usage: Dict[str, Dict[str, float]] = {}
+
+    def record(
+        self,
+        purpose: str,
+        input_tokens: int,
+        output_tokens: int,
+        latency: float,
+        items: int = 1
+    ) -> None:
+        """1回の呼び出しを記録（itemsはまとめて処理した件数。1件あたりの値の算出に使う）"""
+        usage = self._get(purpose)
+        usage["calls"] += 1
+        usage["items"] += items
+        usage["input_tokens"] += input_tokens
+        usage["output_tokens"] += output_tokens
+        usage["latency_seconds"] += latency
+
+    def record_error(self, purpose: str) -> None:
+        usage = self._get(purpose)
+        usage["errors"] += 1
+
+    def _get(self, purpose: str) -> Dict[str, float]:
+        return self._usage.setdefault(purpose, {
+            "calls": 0, "items": 0, "input_tokens": 0, "output_tokens": 0, "latency_seconds": 0.0, "errors": 0
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        """用途別の合計と、1呼び出しあたり・1件あたりの平均"""
+        result = {}
+        for purpose, usage in self._usage.items():
+            calls = usage["calls"]
+            items = usage["items"]
+            result[purpose] = {
+                "calls": calls,
+                "items": items,
+                "errors": usage["errors"],
+                "input_tokens": usage["input_tokens"],
+                "output_tokens": usage["output_tokens"],
+                "avg_input_tokens_per_item": round(usage["input_tokens"] / items, 1) if items else 0.0,
+                "avg_output_tokens_per_item": round(usage["output_tokens"] / items, 1) if items else 0.0,
+                "avg_latency_seconds": round(usage["latency_seconds"] / calls, 3) if calls else 0.0,
+                "avg_latency_seconds_per_item": round(usage["latency_seconds"] / items, 3) if items else 0.0,
+            }
+        return result
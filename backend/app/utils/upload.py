@@ -0,0 +1,307 @@
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+from typing import AsyncIterator, BinaryIO, Callable, Iterator, Optional, Union
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.utils.config import settings
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# マルチパートの区切り・フォーム項目の分（リクエストボディの上限はファイルの上限にこれを足す）
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+class UploadTooLargeError(ValueError):
+    """アップロードされたファイルがサイズの上限を超えている"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"ファイルサイズが上限（{_format_size(max_bytes)}）を超えています")
+        self.max_bytes = max_bytes
+
+def _format_size(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.0f}MB"
+    if size >= 1024:
+        return f"{size / 1024:.0f}KB"
+    return f"{size}バイト"
+
+class SpooledUpload:
+    """
+    アップロードされたファイルの内容を上限付きで受け取る
+
+    UPLOAD_SPOOL_THRESHOLD_BYTES以下の間はメモリに持ち、超えた時点で一時ファイルに書き出す。
+    sourceは小さいファイルならバイト列、大きいファイルなら一時ファイルのパスを返すので、
+    PDF（PyMuPDF）・Word・Vision APIの前処理・Storageへのアップロードはパスから直接読み、
+    ファイル全体のコピーをメモリに持たない。
+    max_bytesを超えるとUploadTooLargeErrorを送出する（それ以上は受け取らない）。
+    adoptで既存のファイル（UploadFileの一時ファイル）を内容として使う場合は、コピーも削除もしない。
+    """
+
+    def __init__(
+        self,
+        filename: str = "",
+        content_type: str = "",
+        max_bytes: Optional[int] = None,
+        spool_threshold: Optional[int] = None
+    ):
+        self.filename = filename
+        self.content_type = content_type
+        self.max_bytes = settings.upload_max_bytes if max_bytes is None else max_bytes
+        self.spool_threshold = settings.upload_spool_threshold_bytes if spool_threshold is None else spool_threshold
+        self.size = 0
+        self._buffer = bytearray()
+        self._file: Optional[BinaryIO] = None
+        self._path: Optional[str] = None
+        self._adopted_path: Optional[str] = None
+
+    @property
+    def spooled(self) -> bool:
+        """一時ファイルに書き出したか"""
+        return self._path is not None or self._adopted_path is not None
+
+    @property
+    def source(self) -> Union[str, bytes]:
+        """内容（メモリ上のバイト列、または一時ファイルのパス）"""
+        if self._adopted_path is not None:
+            return self._adopted_path
+        if self._path is not None:
+            self._file.flush()
+            return self._path
+        return bytes(self._buffer)
+
+    def write(self, chunk: bytes) -> None:
+        """
+        内容を追加
+
+        Raises:
+            UploadTooLargeError: 合計がmax_bytesを超えた場合
+        """
+        self.size += len(chunk)
+        if self.max_bytes and self.size > self.max_bytes:
+            raise UploadTooLargeError(self.max_bytes)
+
+        if self._file is None and self.size > self.spool_threshold:
+            self._rollover()
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._buffer += chunk
+
+    def adopt(self, path: str, size: int) -> None:
+        """
+        既存のファイルを内容として使う（書き込み済みの内容がない場合だけ）
+
+        Raises:
+            UploadTooLargeError: sizeがmax_bytesを超えている場合
+        """
+        if self.max_bytes and size > self.max_bytes:
+            raise UploadTooLargeError(self.max_bytes)
+        self.size = size
+        self._adopted_path = path
+
+    @contextlib.contextmanager
+    def open_payload(self) -> Iterator[Union[bytes, BinaryIO]]:
+        """HTTPで送る内容（メモリ上ならバイト列、一時ファイルなら開いたファイル）"""
+        source = self.source
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                yield f
+        else:
+            yield source
+
+    def close(self) -> None:
+        """一時ファイルを削除（adoptしたファイルはそのまま）"""
+        self._buffer = bytearray()
+        self._adopted_path = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._path is not None:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self._path)
+            self._path = None
+
+    def _rollover(self) -> None:
+        # 拡張子を残す（パスから形式を判定する処理のため）
+        suffix = os.path.splitext(self.filename)[1].lower()
+        fd, self._path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=settings.upload_temp_dir or None)
+        self._file = os.fdopen(fd, "wb")
+        self._file.write(self._buffer)
+        self._buffer = bytearray()
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+async def receive_upload(
+    file: UploadFile,
+    max_bytes: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> SpooledUpload:
+    """
+    アップロードされたファイルを受け取る（使い終わったらclose()する）
+
+    starletteが受信時に一時ファイルへ書き出した内容は、コピーせずにそのファイルをパスで参照する。
+    メモリ上にある（小さい）内容はチャンク単位で読み込む。
+
+    Raises:
+        UploadTooLargeError: サイズの上限を超えた場合（読み込んだ分は破棄済み）
+    """
+    upload = SpooledUpload(file.filename or "", file.content_type or "", max_bytes=max_bytes)
+    path = _spool_path(file)
+    if path is not None:
+        upload.adopt(path, file.size if file.size is not None else os.path.getsize(path))
+        return upload
+    if upload.max_bytes and file.size is not None and file.size > upload.max_bytes:
+        raise UploadTooLargeError(upload.max_bytes)
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            if upload.spooled:
+                # ディスクへの書き込みはスレッドで行う
+                await asyncio.to_thread(upload.write, chunk)
+            else:
+                upload.write(chunk)
+    except BaseException:
+        upload.close()
+        raise
+    return upload
+
+def _spool_path(file: UploadFile) -> Optional[str]:
+    """
+    UploadFileの内容を書き出した一時ファイルのパス（メモリ上にある場合・参照できない環境ではNone）
+
+    starletteの一時ファイルは名前のないファイルなので /proc/<pid>/fd/<fd> で参照する（Linuxのみ）。
+    文書解析のワーカープロセスからも開けて、開くたびに別の読み取り位置になるので元のファイルに影響しない。
+    """
+    spool = file.file
+    # SpooledTemporaryFileはメモリ上にある間にfileno()を呼ぶと一時ファイルに書き出してしまう
+    if not getattr(spool, "_rolled", True):
+        return None
+    try:
+        path = f"/proc/{os.getpid()}/fd/{spool.fileno()}"
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+    return path if os.path.exists(path) else None
+
+def receive_stream(
+    stream: BinaryIO,
+    filename: str = "",
+    max_bytes: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> SpooledUpload:
+    """ファイルオブジェクト（ZIPのエントリなど）をチャンク単位で読み込む（同期版。スレッドから呼び出す）"""
+    upload = SpooledUpload(filename, max_bytes=max_bytes)
+    try:
+        for chunk in iter(lambda: stream.read(chunk_size), b""):
+            upload.write(chunk)
+    except BaseException:
+        upload.close()
+        raise
+    return upload
+
+@contextlib.asynccontextmanager
+async def spooled_upload(file: UploadFile, max_bytes: Optional[int] = None) -> AsyncIterator[SpooledUpload]:
+    """receive_uploadした内容を、ブロックを抜けた時点で破棄する"""
+    upload = await receive_upload(file, max_bytes=max_bytes)
+    try:
+        yield upload
+    finally:
+        upload.close()
+
+@contextlib.asynccontextmanager
+async def as_file_path(source: Union[str, bytes], suffix: str = "") -> AsyncIterator[str]:
+    """
+    内容をファイルのパスとして使う（別プロセスに内容を何度も送らずに済む）
+
+    パスはそのまま返す。バイト列は一時ファイルに書き出し、ブロックを抜けた時点で削除する。
+    """
+    if isinstance(source, str):
+        yield source
+        return
+    path = await asyncio.to_thread(_write_temp_file, source, suffix)
+    try:
+        yield path
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+
+def _write_temp_file(content: bytes, suffix: str) -> str:
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=settings.upload_temp_dir or None)
+    with os.fdopen(fd, "wb") as f:
+        f.write(content)
+    return path
+
+class RequestSizeLimitMiddleware:
+    """
+    リクエストボディのサイズを受信中に制限するASGIミドルウェア
+
+    starletteはハンドラーを呼ぶ前にマルチパートのファイルを最後まで受信して一時ファイルに書き出すため、
+    ハンドラーでの上限チェックだけでは上限を超えるファイルも全て受信してしまう。
+    Content-Lengthが上限を超えていれば本文を読まずに413を返し、Content-Lengthのない（chunked）
+    リクエストは受信したサイズが上限を超えた時点で受信をやめて413を返す。
+
+    limit_for: パスごとの上限（バイト。Noneまたは0で無制限）
+    """
+
+    def __init__(self, app: ASGIApp, limit_for: Callable[[str], Optional[int]]):
+        self.app = app
+        self.limit_for = limit_for
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self.limit_for(scope["path"]) if scope["type"] == "http" else None
+        if not limit:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > limit:
+            await self._reject(limit, scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # 以降は受信しない（アプリには切断として伝える）
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal started
+            if exceeded and not started:
+                # 受信をやめた後のアプリの応答（本文の解析エラーなど）は413に置き換える
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded or started:
+                raise
+        if exceeded and not started:
+            await self._reject(limit, scope, receive, send)
+
+    @staticmethod
+    async def _reject(limit: int, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse({"detail": str(UploadTooLargeError(limit))}, status_code=413)
+        await response(scope, receive, send)
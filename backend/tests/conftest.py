@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# appのimport前に必要な設定を用意する（外部サービスには接続しない）
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ["LOCAL_DATA_DIR"] = tempfile.mkdtemp(prefix="recruitment-test-")
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["LLM_FAKE_LATENCY_SECONDS"] = "0"
+os.environ["LLM_FAKE_ERROR_RATE"] = "0"
+# 解析はスレッドで行う（テストごとにワーカープロセスを起動しない）
+os.environ["PARSE_POOL_ENABLED"] = "false"
+# まとめて書き込み・まとめて評価の待ち時間を短くする
+os.environ["BATCH_INSERT_FLUSH_INTERVAL"] = "0.01"
+os.environ["EVALUATION_PACK_FLUSH_INTERVAL"] = "0.01"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from app.services.applicant_writer import BulkApplicantWriter
+
+@pytest.fixture
+def saved_records(monkeypatch):
+    """DB（Supabase）に書き込まず、書き込まれるはずだったレコードを記録する"""
+    records = []
+
+    async def write_chunk(self, chunk):
+        for record, future in chunk:
+            records.append(record)
+            if not future.done():
+                future.set_result(None)
+
+    monkeypatch.setattr(BulkApplicantWriter, "_write_chunk", write_chunk)
+    return records
@@ -0,0 +1,160 @@
+import copy
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+class FakeSupabase:
+    """
+    テスト用のメモリ上のSupabaseクライアント（このアプリが使うクエリだけを実装）
+
+    tables: テーブル名 → 行のリスト。calls: 実行した (テーブル名, 操作, フィルター) の記録
+    """
+
+    def __init__(self, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.tables = tables or {}
+        self.calls: List[tuple] = []
+        # 操作名 → 送出する例外（障害の再現用）
+        self.fail: Dict[str, Exception] = {}
+
+    def table(self, name: str) -> "_Query":
+        return _Query(self, name)
+
+class _Not:
+    def __init__(self, query: "_Query"):
+        self.query = query
+
+    def is_(self, column: str, value: str) -> "_Query":
+        self.query.filters.append(("not_is", column, value))
+        return self.query
+
+class _Query:
+    def __init__(self, client: FakeSupabase, name: str):
+        self.client = client
+        self.name = name
+        self.operation = "select"
+        self.columns = "*"
+        self.payload: Any = None
+        self.filters: List[tuple] = []
+        self.order_column: Optional[str] = None
+        self.order_desc = False
+        self.limit_count: Optional[int] = None
+        self.not_ = _Not(self)
+
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "_Query":
+        self.columns = columns
+        return self
+
+    def insert(self, payload: Any) -> "_Query":
+        self.operation, self.payload = "insert", payload
+        return self
+
+    def upsert(self, payload: Any) -> "_Query":
+        self.operation, self.payload = "upsert", payload
+        return self
+
+    def update(self, payload: Dict[str, Any]) -> "_Query":
+        self.operation, self.payload = "update", payload
+        return self
+
+    def delete(self) -> "_Query":
+        self.operation = "delete"
+        return self
+
+    def eq(self, column: str, value: Any) -> "_Query":
+        self.filters.append(("eq", column, value))
+        return self
+
+    def gt(self, column: str, value: Any) -> "_Query":
+        self.filters.append(("gt", column, value))
+        return self
+
+    def gte(self, column: str, value: Any) -> "_Query":
+        self.filters.append(("gte", column, value))
+        return self
+
+    def lte(self, column: str, value: Any) -> "_Query":
+        self.filters.append(("lte", column, value))
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> "_Query":
+        self.filters.append(("in", column, list(values)))
+        return self
+
+    def order(self, column: str, desc: bool = False) -> "_Query":
+        self.order_column, self.order_desc = column, desc
+        return self
+
+    def limit(self, count: int) -> "_Query":
+        self.limit_count = count
+        return self
+
+    def range(self, start: int, end: int) -> "_Query":
+        self.filters.append(("range", start, end))
+        return self
+
+    def execute(self) -> SimpleNamespace:
+        self.client.calls.append((self.name, self.operation, list(self.filters)))
+        if self.operation in self.client.fail:
+            raise self.client.fail[self.operation]
+
+        rows = self.client.tables.setdefault(self.name, [])
+        if self.operation in ("insert", "upsert"):
+            records = self.payload if isinstance(self.payload, list) else [self.payload]
+            for record in records:
+                existing = next((row for row in rows if row.get("id") == record.get("id")), None)
+                if existing is not None and self.operation == "upsert":
+                    existing.update(copy.deepcopy(record))
+                else:
+                    rows.append(copy.deepcopy(record))
+            return SimpleNamespace(data=copy.deepcopy(records), count=None)
+
+        matched = [row for row in rows if self._matches(row)]
+        if self.operation == "update":
+            for row in matched:
+                row.update(copy.deepcopy(self.payload))
+            return SimpleNamespace(data=copy.deepcopy(matched), count=None)
+        if self.operation == "delete":
+            self.client.tables[self.name] = [row for row in rows if row not in matched]
+            return SimpleNamespace(data=copy.deepcopy(matched), count=None)
+
+        if self.order_column:
+            matched.sort(key=lambda row: row.get(self.order_column), reverse=self.order_desc)
+        for kind, *args in self.filters:
+            if kind == "range":
+                matched = matched[args[0]:args[1] + 1]
+        if self.limit_count is not None:
+            matched = matched[:self.limit_count]
+        if self.columns != "*":
+            # "別名:列" の形式にも対応する
+            columns = [column.strip().partition(":") for column in self.columns.split(",")]
+            matched = [{name: _resolve(row, path or name) for name, _, path in columns} for row in matched]
+        return SimpleNamespace(data=copy.deepcopy(matched), count=len(matched))
+
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        for kind, *args in self.filters:
+            if kind == "range":
+                continue
+            column, value = args
+            actual = _resolve(row, column)
+            if kind == "eq" and actual != value:
+                return False
+            if kind == "gt" and not (actual is not None and actual > value):
+                return False
+            if kind == "gte" and not (actual is not None and actual >= value):
+                return False
+            if kind == "lte" and not (actual is not None and actual <= value):
+                return False
+            if kind == "in" and actual not in value:
+                return False
+            if kind == "not_is" and value == "null" and actual is None:
+                return False
+        return True
+
+def _resolve(row: Dict[str, Any], path: str) -> Any:
+    """PostgRESTの列指定（"evaluation->total_score"、->>は文字列）を行から取り出す"""
+    column, *keys = path.replace("->>", "->").split("->")
+    value = row.get(column)
+    for key in keys:
+        value = value.get(key) if isinstance(value, dict) else None
+    if "->>" in path and value is not None:
+        value = str(value)
+    return value
@@ -0,0 +1,47 @@
+import asyncio
+from app.services import applicant_writer
+from app.services.applicant_writer import BulkApplicantWriter
+from tests.fake_supabase import FakeSupabase, _Query
+
+def _write_all(writer, records):
+    async def run():
+        return await asyncio.gather(*(writer.write(record) for record in records), return_exceptions=True)
+    return asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+def test_writes_chunk_in_one_upsert(monkeypatch):
+    client = FakeSupabase()
+    monkeypatch.setattr(applicant_writer, "get_supabase", lambda: client)
+
+    results = _write_all(BulkApplicantWriter(chunk_size=3, flush_interval=0.01), [{"id": str(i)} for i in range(3)])
+
+    assert results == [None, None, None]
+    assert [call[1] for call in client.calls] == ["upsert"]
+    assert [row["id"] for row in client.tables["applicants"]] == ["0", "1", "2"]
+
+def test_falls_back_to_rows_when_chunk_fails(monkeypatch):
+    client = FakeSupabase()
+    monkeypatch.setattr(applicant_writer, "get_supabase", lambda: client)
+    original_execute = _Query.execute
+
+    # 一括書き込みと不正な行だけを失敗させる
+    def execute(query):
+        if isinstance(query.payload, list) or query.payload.get("id") == "bad":
+            raise ValueError("invalid row")
+        return original_execute(query)
+
+    monkeypatch.setattr(_Query, "execute", execute)
+    results = _write_all(BulkApplicantWriter(chunk_size=3, flush_interval=0.01), [{"id": "a"}, {"id": "bad"}, {"id": "c"}])
+
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], ValueError)
+    assert [row["id"] for row in client.tables["applicants"]] == ["a", "c"]
+
+def test_client_failure_fails_every_waiter(monkeypatch):
+    def get_supabase():
+        raise RuntimeError("no client")
+
+    monkeypatch.setattr(applicant_writer, "get_supabase", get_supabase)
+    results = _write_all(BulkApplicantWriter(chunk_size=2, flush_interval=0.01), [{"id": "a"}, {"id": "b"}, {"id": "c"}])
+
+    # wait_for がタイムアウトせず、全員が例外を受け取る
+    assert all(isinstance(result, RuntimeError) for result in results)
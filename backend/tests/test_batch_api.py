@@ -0,0 +1,109 @@
+import io
+import json
+import zipfile
+import pytest
+from docx import Document
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.config import settings
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+def _events(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+def _resume_docx(name: str) -> bytes:
+    doc = Document()
+    doc.add_heading("履歴書", 1)
+    doc.add_paragraph(f"氏名: {name}")
+    doc.add_paragraph("メール: resume@example.com")
+    doc.add_heading("職歴", 1)
+    doc.add_paragraph("2019年4月 株式会社サンプル入社 Pythonでの業務システム開発")
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+def test_upload_csv_stream(client, saved_records):
+    csv_text = (
+        "name,email,technical_skills,motivation\n"
+        "山田太郎,taro@example.com,Python,御社の理念に共感しました\n"
+        "鈴木花子,hanako@example.com,Go,新しい挑戦がしたい\n"
+    )
+    response = client.post(
+        "/api/batch/upload-csv/stream",
+        params={"packed": "false"},
+        files={"file": ("applicants.csv", csv_text.encode("cp932"), "text/csv")}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = _events(response)
+    results = [event for event in events if event["type"] == "result"]
+    assert sorted(result["row_index"] for result in results) == [0, 1]
+    assert {result["name"] for result in results} == {"山田太郎", "鈴木花子"}
+    assert all(result["status"] == "success" for result in results)
+    assert events[-1] == {"type": "summary", "total_count": 2, "success_count": 2, "error_count": 0}
+    assert len(saved_records) == 2
+
+def test_upload_csv_stream_reports_fatal_error(client, saved_records):
+    response = client.post(
+        "/api/batch/upload-csv/stream",
+        params={"encoding": "no-such-encoding"},
+        files={"file": ("applicants.csv", b"name\n\x82\xa0\n", "text/csv")}
+    )
+
+    assert response.status_code == 200
+    events = _events(response)
+    # 処理全体の失敗は1件の error イベントだけで、summary は送られない
+    assert [event["type"] for event in events] == ["error"]
+    assert events[0]["error"]
+    assert saved_records == []
+
+def test_ingest_resumes_from_zip(client, saved_records):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("resumes/山田太郎.docx", _resume_docx("山田太郎"))
+        zf.writestr("resumes/memo.txt", "対象外")
+        zf.writestr("__MACOSX/resumes/._山田太郎.docx", b"")
+
+    response = client.post(
+        "/api/batch/ingest-resumes",
+        files=[("files", ("resumes.zip", archive.getvalue(), "application/zip"))]
+    )
+
+    assert response.status_code == 200
+    events = _events(response)
+    results = {event["filename"]: event for event in events if event["type"] == "result"}
+    assert set(results) == {"resumes/山田太郎.docx", "resumes/memo.txt"}
+    assert results["resumes/山田太郎.docx"]["status"] == "success"
+    assert results["resumes/memo.txt"]["status"] == "skipped"
+    assert events[-1] == {
+        "type": "summary", "total_count": 2, "success_count": 1, "error_count": 0, "skipped_count": 1
+    }
+    assert len(saved_records) == 1
+    assert saved_records[0]["id"] == results["resumes/山田太郎.docx"]["applicant_id"]
+
+def test_ingest_resumes_limits(client, saved_records, monkeypatch):
+    monkeypatch.setattr(settings, "bulk_ingest_max_files", 3)
+    monkeypatch.setattr(settings, "bulk_ingest_max_file_bytes", 100_000)
+
+    response = client.post(
+        "/api/batch/ingest-resumes",
+        files=[
+            ("files", ("a.docx", _resume_docx("青木"), "application/octet-stream")),
+            ("files", ("large.pdf", b"%PDF" + b"x" * 200_000, "application/pdf")),
+            ("files", ("c.docx", _resume_docx("千葉"), "application/octet-stream")),
+            ("files", ("broken.pdf", b"not a pdf", "application/pdf")),
+        ]
+    )
+
+    assert response.status_code == 200
+    results = {event["filename"]: event for event in _events(response) if event["type"] == "result"}
+    assert results["a.docx"]["status"] == "success"
+    assert results["large.pdf"]["status"] == "skipped" and "上限" in results["large.pdf"]["error"]
+    assert results["c.docx"]["status"] == "success"
+    # サイズ超過のファイルも件数に数えるので、4件目で上限を超える
+    assert results["broken.pdf"]["status"] == "skipped" and "3件" in results["broken.pdf"]["error"]
+    assert len(saved_records) == 2
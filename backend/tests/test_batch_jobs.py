@@ -0,0 +1,112 @@
+import asyncio
+import uuid
+from app.services.batch_job_service import BatchJobManager, BatchJobStatus, BatchJobStore
+
+class _StubBatchService:
+    """行ごとに名前を返すだけのBatchService（releaseがセットされるまで各行で待つ）"""
+
+    def __init__(self, release: asyncio.Event = None):
+        self.release = release
+        self.seen = []
+
+    async def iter_results(self, indexed_rows, **kwargs):
+        async for row_index, row in indexed_rows:
+            if self.release is not None:
+                await self.release.wait()
+            self.seen.append(row_index)
+            status = "error" if row.get("name") == "bad" else "success"
+            yield row_index, {"status": status, "name": row["name"]}
+
+def _store() -> BatchJobStore:
+    return BatchJobStore(f"batch_jobs_{uuid.uuid4().hex}.sqlite3")
+
+async def _rows(names):
+    for name in names:
+        yield {"name": name}
+
+async def _wait_finished(manager, job_id):
+    for _ in range(200):
+        progress = await manager.get_progress(job_id)
+        if progress["status"] not in ("queued", "running"):
+            return progress
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+def test_submit_persists_rows_and_results():
+    store = _store()
+
+    async def run():
+        manager = BatchJobManager(_StubBatchService(), store)
+        job_id = await manager.submit(_rows(["a", "bad", "c"]), skill_ratio=0.3, mindset_ratio=0.7)
+        return job_id, await _wait_finished(manager, job_id), await manager.get_results(job_id, offset=1, limit=5)
+
+    job_id, progress, results = asyncio.run(run())
+
+    assert progress["status"] == "completed"
+    assert (progress["total_count"], progress["success_count"], progress["error_count"]) == (3, 2, 1)
+    assert results == [
+        {"row_index": 1, "status": "error", "name": "bad"},
+        {"row_index": 2, "status": "success", "name": "c"},
+    ]
+    assert store.get_job(job_id)["skill_ratio"] == 0.3
+
+def test_resume_processes_only_pending_rows():
+    store = _store()
+    job_id = store.create_job()
+    store.add_rows(job_id, [(index, {"name": name}) for index, name in enumerate(["a", "b", "c"])])
+    store.mark_queued(job_id, 3)
+    store.mark_started(job_id)
+    store.save_result(job_id, 0, {"status": "success", "name": "a"})
+    uploading_id = store.create_job()
+
+    service = _StubBatchService()
+
+    async def run():
+        manager = BatchJobManager(service, store)
+        resumed = await manager.resume_unfinished()
+        return resumed, await _wait_finished(manager, job_id)
+
+    resumed, progress = asyncio.run(run())
+
+    assert resumed == [job_id]
+    assert service.seen == [1, 2]
+    assert progress["status"] == "completed" and progress["processed_count"] == 3
+    uploading = store.get_job(uploading_id)
+    assert uploading["status"] == BatchJobStatus.FAILED.value and uploading["error"]
+
+def test_cancel_running_job():
+    store = _store()
+
+    async def run():
+        release = asyncio.Event()
+        manager = BatchJobManager(_StubBatchService(release), store)
+        job_id = await manager.submit(_rows(["a", "b"]))
+        await asyncio.sleep(0.05)
+        cancelled = await manager.cancel(job_id)
+        release.set()
+        await asyncio.sleep(0.05)
+        return cancelled, await manager.cancel(job_id), await manager.get_progress(job_id)
+
+    cancelled, cancelled_again, progress = asyncio.run(run())
+
+    assert cancelled and not cancelled_again
+    assert progress["status"] == "cancelled" and progress["processed_count"] == 0
+
+def test_submit_failure_marks_job_failed():
+    store = _store()
+
+    async def rows():
+        yield {"name": "a"}
+        raise ValueError("CSVの読み込みに失敗しました")
+
+    async def run():
+        manager = BatchJobManager(_StubBatchService(), store)
+        try:
+            await manager.submit(rows())
+        except ValueError:
+            pass
+        return store.db.execute("SELECT status, error FROM batch_jobs")
+
+    (job,) = asyncio.run(run())
+
+    assert job["status"] == "failed" and "CSV" in job["error"]
@@ -0,0 +1,58 @@
+import asyncio
+from app.models.applicant import EvaluationResult
+from app.services.batch_service import BatchService
+
+class _StubAIService:
+    """同時に実行中の評価数を記録する評価サービス"""
+
+    def __init__(self, degraded_names=()):
+        self.degraded_names = set(degraded_names)
+        self.active = 0
+        self.max_active = 0
+
+    async def evaluate_applicant(self, applicant_data, skill_ratio=None, mindset_ratio=None, priority=None):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            self.active -= 1
+        score = float(len(applicant_data.name) % 10)
+        return EvaluationResult(
+            skill_score=score,
+            mindset_score=score,
+            total_score=score,
+            summary="評価できませんでした" if applicant_data.name in self.degraded_names else "",
+            degraded=applicant_data.name in self.degraded_names
+        )
+
+def _rows(count: int):
+    return [{"name": f"応募者{i}", "email": f"user{i}@example.com"} for i in range(count)]
+
+def test_process_rows_bounds_concurrency(saved_records):
+    ai_service = _StubAIService()
+    results = asyncio.run(BatchService(ai_service).process_rows(_rows(20), concurrency=3, packed=False))
+
+    assert ai_service.max_active == 3
+    # 完了順ではなく入力順で返す
+    assert [result["name"] for result in results] == [f"応募者{i}" for i in range(20)]
+    assert all(result["status"] == "success" for result in results)
+    assert len(saved_records) == 20
+
+def test_degraded_rows_are_errors_and_not_saved(saved_records):
+    ai_service = _StubAIService(degraded_names={"応募者1"})
+    results = asyncio.run(BatchService(ai_service).process_rows(_rows(3), concurrency=2, packed=False))
+
+    assert results[1]["status"] == "error"
+    assert results[1]["degraded"] is True
+    assert [result["status"] for result in (results[0], results[2])] == ["success", "success"]
+    assert {record["name"] for record in saved_records} == {"応募者0", "応募者2"}
+
+def test_async_row_source(saved_records):
+    async def rows():
+        for row in _rows(5):
+            await asyncio.sleep(0)
+            yield row
+
+    results = asyncio.run(BatchService(_StubAIService()).process_rows(rows(), concurrency=2, packed=False))
+    assert [result["name"] for result in results] == [f"応募者{i}" for i in range(5)]
@@ -0,0 +1,159 @@
+import asyncio
+import json
+from app.models.applicant import ApplicantData, EvaluationResult
+from app.services.ai_evaluation_service import AIEvaluationService
+from app.services.evaluation_cache import EvaluationCache
+from app.utils import cache as cache_module
+from app.utils.cache import TieredCache
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class _CountingLLM:
+    """評価のJSONを返し、呼び出し回数を数えるLLMクライアント"""
+    available = True
+    model_name = "gemini-test"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, prompt, **kwargs):
+        self.calls += 1
+        return json.dumps({"skill_score": 6, "mindset_score": 8, "total_score": 7.4, "summary": "良い"})
+
+def _clock(monkeypatch, now=1000.0):
+    clock = _Clock(now)
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+def _applicant(**overrides):
+    return ApplicantData(**{"name": "山田太郎", "email": "taro@example.com", "motivation": "開発が したい", **overrides})
+
+def test_persists_across_instances(tmp_path):
+    filename = str(tmp_path / "cache.sqlite3")
+    TieredCache(filename).set("a", {"value": 1})
+
+    cache = TieredCache(filename)
+    assert cache.get("a") == {"value": 1}
+    assert cache.get("a") == {"value": 1}
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert (stats["persistent_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+
+def test_async_access(tmp_path):
+    cache = TieredCache(str(tmp_path / "cache.sqlite3"), memory_entries=1)
+
+    async def run():
+        await cache.aset("a", {"value": 1})
+        await cache.aset("b", {"value": 2})
+        # プロセス内LRUには最後の1件だけが残り、追い出された分はSQLiteから読む
+        return await cache.aget("b"), await cache.aget("a"), await cache.aget("a")
+
+    assert asyncio.run(run()) == ({"value": 2}, {"value": 1}, {"value": 1})
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["persistent_hits"]) == (2, 1)
+
+def test_expires_after_ttl(tmp_path, monkeypatch):
+    clock = _clock(monkeypatch)
+    filename = str(tmp_path / "cache.sqlite3")
+    cache = TieredCache(filename, ttl_seconds=60)
+    cache.set("a", {"value": 1})
+
+    clock.now += 30
+    assert cache.get("a") == {"value": 1}
+    # アクセスしても作成からの期限は延びない
+    clock.now += 31
+    assert cache.get("a") is None
+    assert TieredCache(filename, ttl_seconds=60).get("a") is None
+    assert cache.stats()["persistent_entries"] == 0
+
+def test_evicts_in_batches(tmp_path, monkeypatch):
+    clock = _clock(monkeypatch)
+    filename = str(tmp_path / "cache.sqlite3")
+    cache = TieredCache(filename, max_entries=3, evict_every=5)
+
+    for index in range(4):
+        clock.now += 1
+        cache.set(f"k{index}", {"value": index})
+    # 次の削除まではmax_entriesを超えて保持する
+    assert cache.stats()["persistent_entries"] == 4
+
+    # SQLiteから読むと最終アクセス時刻が更新される
+    clock.now += 1
+    assert TieredCache(filename).get("k0") == {"value": 0}
+    clock.now += 1
+    cache.set("k4", {"value": 4})
+
+    stats = cache.stats()
+    assert stats["persistent_entries"] == 3
+    assert stats["evictions"] == 2
+    # 最終アクセスが古いものから削除する
+    fresh = TieredCache(filename)
+    assert [key for key in ("k0", "k1", "k2", "k3", "k4") if fresh.get(key)] == ["k0", "k3", "k4"]
+
+def test_evicts_expired_and_oversized_entries(tmp_path, monkeypatch):
+    clock = _clock(monkeypatch)
+    cache = TieredCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=60, max_bytes=100, evict_every=1)
+
+    cache.set("old", {"value": "x"})
+    clock.now += 61
+    cache.set("a", {"value": "x" * 60})
+    assert cache.stats()["persistent_entries"] == 1
+
+    clock.now += 1
+    cache.set("b", {"value": "y" * 60})
+    stats = cache.stats()
+    assert stats["persistent_entries"] == 1
+    assert stats["persistent_bytes"] <= 100
+    assert stats["evictions"] == 2
+
+def test_evaluation_key_normalizes_inputs():
+    key = EvaluationCache.make_key(_applicant(), 0.3, 0.7, "gemini-test", "1")
+
+    assert key == EvaluationCache.make_key(
+        _applicant(motivation="  開発が\n したい ", ocr_confidence=0.4), 0.3, 0.7, "gemini-test", "1"
+    )
+    assert key != EvaluationCache.make_key(_applicant(), 0.4, 0.6, "gemini-test", "1")
+    assert key != EvaluationCache.make_key(_applicant(), 0.3, 0.7, "gemini-other", "1")
+    assert key != EvaluationCache.make_key(_applicant(), 0.3, 0.7, "gemini-test", "2")
+
+def test_evaluation_served_from_cache(tmp_path):
+    llm = _CountingLLM()
+    cache = EvaluationCache(TieredCache(str(tmp_path / "cache.sqlite3")))
+    service = AIEvaluationService(llm=llm, cache=cache)
+
+    async def run():
+        first = await service.evaluate_applicant(_applicant(), 0.3, 0.7)
+        second = await service.evaluate_applicant(_applicant(motivation="開発が\tしたい"), 0.3, 0.7)
+        await service.evaluate_applicant(_applicant(), 0.3, 0.7, use_cache=False)
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert isinstance(second, EvaluationResult)
+    assert second == first and not first.degraded
+    assert llm.calls == 2
+
+def test_degraded_evaluation_is_not_cached(tmp_path):
+    llm = _CountingLLM()
+
+    async def broken(prompt, **kwargs):
+        llm.calls += 1
+        return "not json"
+
+    llm.generate = broken
+    cache = EvaluationCache(TieredCache(str(tmp_path / "cache.sqlite3")))
+    service = AIEvaluationService(llm=llm, cache=cache)
+
+    async def run():
+        return [await service.evaluate_applicant(_applicant(), 0.3, 0.7) for _ in range(2)]
+
+    results = asyncio.run(run())
+
+    assert all(result.degraded for result in results)
+    assert llm.calls == 2
+    assert cache.stats()["persistent_entries"] == 0
@@ -0,0 +1,56 @@
+import io
+from app.utils.csv_stream import IncrementalCSVParser, iter_csv_rows
+
+HEADER = "name,email,motivation\n"
+
+def _rows(data: bytes, chunk_size: int, encoding=None):
+    return list(iter_csv_rows(io.BytesIO(data), encoding=encoding, chunk_size=chunk_size))
+
+def test_utf8_multibyte_split_across_chunks():
+    text = HEADER + "山田太郎,taro@example.com,御社の理念に共感しました\n"
+    for chunk_size in (1, 2, 5):
+        rows = _rows(text.encode("utf-8"), chunk_size)
+        assert rows == [{"name": "山田太郎", "email": "taro@example.com", "motivation": "御社の理念に共感しました"}]
+
+def test_utf8_bom_is_stripped():
+    rows = _rows(("﻿" + HEADER + "鈴木,suzuki@example.com,成長したい\n").encode("utf-8"), 3)
+    assert list(rows[0]) == ["name", "email", "motivation"]
+    assert rows[0]["name"] == "鈴木"
+
+def test_cp932_detected():
+    text = HEADER + "渡辺花子,hanako@example.com,関西で働きたい\n"
+    rows = _rows(text.encode("cp932"), 3)
+    assert rows[0]["name"] == "渡辺花子"
+    assert rows[0]["motivation"] == "関西で働きたい"
+
+def test_switches_to_cp932_after_ascii_head():
+    # 判定に使う先頭4096バイトがASCIIだけでも、後からShift_JISの文字が出てきたら切り替える
+    ascii_rows = "".join(f"user{i},user{i}@example.com,hello\n" for i in range(300))
+    data = (HEADER + ascii_rows + "山田,yamada@example.com,熊本出身\n").encode("cp932")
+    assert len((HEADER + ascii_rows).encode("ascii")) > 4096
+
+    parser = IncrementalCSVParser()
+    rows = []
+    # 「山」の1バイト目と2バイト目が別のチャンクに分かれる位置で区切る
+    split = data.index("山".encode("cp932")) + 1
+    rows.extend(parser.feed(data[:split]))
+    rows.extend(parser.feed(data[split:]))
+    rows.extend(parser.close())
+
+    assert parser.encoding == "cp932"
+    assert len(rows) == 301
+    assert rows[-1] == {"name": "山田", "email": "yamada@example.com", "motivation": "熊本出身"}
+
+def test_quoted_newline_across_chunks():
+    text = HEADER + '佐藤,sato@example.com,"一行目\n二行目"\n'
+    rows = _rows(text.encode("utf-8"), 4)
+    assert rows == [{"name": "佐藤", "email": "sato@example.com", "motivation": "一行目\n二行目"}]
+
+def test_short_and_long_rows_follow_dictreader():
+    rows = _rows((HEADER + "a,b\nc,d,e,f\n").encode("utf-8"), 64)
+    assert rows[0] == {"name": "a", "email": "b", "motivation": None}
+    assert rows[1] == {"name": "c", "email": "d", "motivation": "e", None: ["f"]}
+
+def test_explicit_encoding():
+    rows = _rows((HEADER + "高橋,t@example.com,よろしく\n").encode("cp932"), 2, encoding="cp932")
+    assert rows[0]["name"] == "高橋"
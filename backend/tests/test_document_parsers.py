@@ -0,0 +1,123 @@
+import asyncio
+import io
+import fitz  # PyMuPDF
+from docx import Document
+from app.services import file_processor_service
+from app.services.document_parsers import (
+    is_garbled,
+    page_needs_ocr,
+    parse_word_sections,
+    read_text_layer,
+    render_page_images,
+)
+from app.services.file_processor_service import FileProcessorService
+from app.services.ocr_service import pdf_extractor_version
+from app.utils.config import settings
+
+def _pdf(*pages) -> bytes:
+    """pages: ページごとの (テキスト, 画像を入れるか)"""
+    doc = fitz.open()
+    for text, with_image in pages:
+        page = doc.new_page()
+        if text:
+            page.insert_text((72, 72), text)
+        if with_image:
+            pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), False)
+            pixmap.clear_with(200)
+            page.insert_image(fitz.Rect(72, 100, 144, 172), stream=pixmap.tobytes("png"))
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def test_page_needs_ocr():
+    assert page_needs_ocr("", 0)
+    assert page_needs_ocr("abc", 10)
+    assert not page_needs_ocr("a" * 20, 10)
+    assert page_needs_ocr("�" * 10 + "a" * 10, 10)
+    assert is_garbled("�" * 10 + "a" * 10)
+    assert not is_garbled("   ")
+
+def test_read_text_layer_gates_short_pages_on_images():
+    pdf = _pdf(("Python engineer with ten years of experience", False), ("", False), ("", True))
+    layer = read_text_layer(pdf, 10)
+
+    assert [needs_ocr for _, needs_ocr in layer] == [False, False, True]
+    assert "Python" in layer[0][0]
+    assert [needs_ocr for _, needs_ocr in read_text_layer(pdf, 10, [3])] == [True]
+
+def test_read_text_layer_always_ocrs_garbled_pages(monkeypatch):
+    pdf = _pdf(("placeholder text for a garbled page", False))
+    # ToUnicodeのないフォントで書かれたページを再現する
+    monkeypatch.setattr(fitz.Page, "get_text", lambda self, *args, **kwargs: "�" * 30 + "ab")
+
+    assert read_text_layer(pdf, 10) == [("�" * 30 + "ab", True)]
+
+def test_render_page_images():
+    pdf = _pdf(("page one", False), ("page two", True))
+
+    pngs = render_page_images(pdf, [2], 72, True, "png", 80)
+    jpegs = render_page_images(pdf, [1, 2], 72, False, "jpeg", 80)
+
+    assert len(pngs) == 1 and pngs[0].startswith(b"\x89PNG")
+    assert len(jpegs) == 2 and all(image.startswith(b"\xff\xd8") for image in jpegs)
+
+def test_render_page_images_settings():
+    pdf = _pdf(("Python engineer with ten years of experience", True))
+
+    low, high = (fitz.Pixmap(render_page_images(pdf, [1], dpi, True, "png", 80)[0]) for dpi in (72, 144))
+    color = fitz.Pixmap(render_page_images(pdf, [1], 72, False, "png", 80)[0])
+    [webp] = render_page_images(pdf, [1], 72, True, "webp", 80)
+    [rough] = render_page_images(pdf, [1], 144, True, "jpeg", 20)
+    [fine] = render_page_images(pdf, [1], 144, True, "jpeg", 95)
+
+    # A4（595pt）を指定した解像度で描画する
+    assert (low.width, high.width) == (595, 1190)
+    assert (low.n, color.n) == (1, 3)
+    assert webp[:4] == b"RIFF" and webp[8:12] == b"WEBP"
+    assert len(rough) < len(fine)
+
+def test_extractor_version_includes_render_settings(monkeypatch):
+    versions = {pdf_extractor_version()}
+    # 描画の設定を変えると抽出キャッシュのキーが変わる
+    for name, value in (
+        ("ocr_render_dpi", 300), ("ocr_render_grayscale", False), ("ocr_image_format", "png"), ("ocr_image_quality", 50)
+    ):
+        monkeypatch.setattr(settings, name, value)
+        versions.add(pdf_extractor_version())
+
+    assert len(versions) == 5
+
+def _docx(section_count: int) -> bytes:
+    doc = Document()
+    for index in range(section_count):
+        doc.add_heading(f"見出し{index}", 1)
+        doc.add_paragraph(f"本文{index}")
+    table = doc.add_table(rows=1, cols=2)
+    table.rows[0].cells[0].text = "資格"
+    table.rows[0].cells[1].text = "基本情報技術者"
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+def test_parse_word_sections():
+    sections = parse_word_sections(_docx(3))
+
+    assert [section["section"] for section in sections] == [1, 2, 3, 4]
+    assert sections[0]["text"] == "見出し0\n本文0\n"
+    assert sections[-1]["text"] == "資格\t基本情報技術者\t\n"
+
+def test_word_is_parsed_once(monkeypatch):
+    calls = []
+
+    class Runner:
+        async def run(self, func, *args, timeout=None):
+            calls.append(func)
+            return func(*args)
+
+    monkeypatch.setattr(file_processor_service, "get_process_pool", lambda: Runner())
+
+    async def run():
+        return [section async for section in FileProcessorService()._iter_word_sections(_docx(50))]
+
+    assert len(asyncio.run(run())) == 51
+    assert calls == [parse_word_sections]
@@ -0,0 +1,90 @@
+import asyncio
+import fitz  # PyMuPDF
+from app.services import extraction_cache, ocr_service
+from app.services.document_parsers import read_text_layer
+from app.services.extraction_cache import stream_with_cache
+from app.services.file_processor_service import FileProcessorService
+from app.utils.config import settings
+from app.utils.prompt_budget import PAGE_BREAK
+
+def _pdf(page_count: int, tag: str) -> bytes:
+    doc = fitz.open()
+    for number in range(1, page_count + 1):
+        doc.new_page().insert_text((72, 72), f"{tag} page {number}: Python backend engineer, ten years of experience")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def _record_pages(monkeypatch):
+    pages = []
+
+    def record(source, min_text_chars, page_numbers=None):
+        pages.extend(page_numbers)
+        return read_text_layer(source, min_text_chars, page_numbers)
+
+    monkeypatch.setattr(ocr_service, "read_text_layer", record)
+    return pages
+
+def test_extract_document_text_stops_at_budget(monkeypatch):
+    monkeypatch.setattr(settings, "ocr_batch_size", 2)
+    monkeypatch.setattr(settings, "ocr_max_concurrent_batches", 2)
+    pages = _record_pages(monkeypatch)
+
+    result = asyncio.run(FileProcessorService().extract_document_text(_pdf(40, "budget"), "resume.pdf", "application/pdf", 30))
+
+    assert result["success"] and result["truncated"]
+    assert result["page_count"] == 2
+    assert result["text"].split(PAGE_BREAK)[0].startswith("budget page 1:")
+    # 先読みした範囲（2ページ×2リクエスト）より先は読まない
+    assert max(pages) <= 8
+
+def test_extract_document_text_reads_whole_document(monkeypatch):
+    pages = _record_pages(monkeypatch)
+
+    result = asyncio.run(FileProcessorService().extract_document_text(_pdf(5, "whole"), "resume.pdf", "application/pdf", 0))
+
+    assert result["success"] and not result["truncated"]
+    assert result["page_count"] == 5
+    assert len(result["text"].split(PAGE_BREAK)) == 5
+    assert sorted(pages) == [1, 2, 3, 4, 5]
+
+def test_extract_document_text_rejects_other_types():
+    result = asyncio.run(FileProcessorService().extract_document_text(b"a,b\n", "list.csv", "text/csv"))
+
+    assert not result["success"] and "サポートされていない" in result["error"]
+
+def _stream(source: bytes, chunk_count: int, text: str = "本文"):
+    iterated = []
+
+    async def iterate():
+        for index in range(chunk_count):
+            iterated.append(index)
+            yield {"page": index + 1, "text": text}
+
+    async def run():
+        return [chunk async for chunk in stream_with_cache(
+            source, "test", "1", iterate, lambda chunks: {"success": True, "pages": chunks}
+        )]
+
+    return asyncio.run(run()), iterated
+
+def test_stream_with_cache_replays_full_reads():
+    first, iterated = _stream(b"full-read", 3)
+    second, iterated_again = _stream(b"full-read", 3)
+
+    assert first == second and len(first) == 3
+    assert iterated == [0, 1, 2] and iterated_again == []
+
+def test_stream_with_cache_skips_oversized_results(monkeypatch):
+    monkeypatch.setattr(settings, "extraction_cache_max_entry_bytes", 10)
+    _stream(b"oversized", 3, "長いページのテキスト")
+    _, iterated = _stream(b"oversized", 3, "長いページのテキスト")
+
+    assert iterated == [0, 1, 2]
+
+def test_stream_with_cache_without_cache(monkeypatch):
+    monkeypatch.setattr(extraction_cache, "get_extraction_cache", lambda: None)
+
+    chunks, iterated = _stream(b"no-cache", 2)
+
+    assert len(chunks) == 2 and iterated == [0, 1]
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import re
+from app.models.applicant import ApplicantData
+from app.services.ai_evaluation_service import AIEvaluationService
+from app.services.evaluation_cache import EvaluationCache
+from app.services.evaluation_packer import EvaluationPacker
+from app.utils.cache import TieredCache
+
+class _ScriptedLLM:
+    """プロンプト中の応募者番号をスコアにした評価を返すLLMクライアント"""
+    available = True
+    model_name = "gemini-test"
+
+    def __init__(self, omit=(), truncate=False, fail=False):
+        self.calls = []
+        self.omit = set(omit)
+        self.truncate = truncate
+        self.fail = fail
+
+    async def generate(self, prompt, purpose=None, **kwargs):
+        self.calls.append(purpose)
+        numbers = [int(n) for n in re.findall(r"名前: 応募者(\d+)", prompt)]
+        if purpose == "evaluation":
+            return json.dumps(_evaluation(numbers[0]))
+        if self.fail:
+            raise RuntimeError("quota exceeded")
+        entries = [
+            {"id": index, "evaluation": _evaluation(number)}
+            for index, number in enumerate(numbers, start=1)
+            if number not in self.omit
+        ]
+        text = json.dumps({"results": entries})
+        # 最後の応募者の途中で出力が切れた応答
+        return text[:-30] if self.truncate else text
+
+def _evaluation(number):
+    return {"skill_score": number, "mindset_score": number, "total_score": number, "summary": f"応募者{number}"}
+
+def _applicants(count):
+    return [ApplicantData(name=f"応募者{n}", email=f"user{n}@example.com") for n in range(1, count + 1)]
+
+def _service(tmp_path, llm):
+    cache = EvaluationCache(TieredCache(str(tmp_path / "cache.sqlite3"), persistent=False))
+    return AIEvaluationService(llm=llm, cache=cache)
+
+async def _gather(packer, applicants):
+    return await asyncio.gather(*(packer.evaluate(applicant) for applicant in applicants))
+
+def _evaluate_all(packer, applicants):
+    async def run():
+        try:
+            return await _gather(packer, applicants)
+        finally:
+            packer.close()
+
+    return asyncio.run(run())
+
+def test_packs_applicants_into_one_request(tmp_path):
+    llm = _ScriptedLLM()
+    packer = EvaluationPacker(_service(tmp_path, llm), 0.5, 0.5, flush_interval=0.01)
+
+    results = _evaluate_all(packer, _applicants(3))
+
+    assert llm.calls == ["evaluation_packed"]
+    assert [result.total_score for result in results] == [1, 2, 3]
+    assert not any(result.degraded for result in results)
+
+def test_flushes_when_pack_is_full(tmp_path):
+    llm = _ScriptedLLM()
+    # 出力上限の人数に達したら待たずに送る
+    packer = EvaluationPacker(_service(tmp_path, llm), 0.5, 0.5, max_size=2, flush_interval=60)
+
+    results = asyncio.run(asyncio.wait_for(_gather(packer, _applicants(4)), 5))
+
+    assert llm.calls == ["evaluation_packed", "evaluation_packed"]
+    assert [result.total_score for result in results] == [1, 2, 3, 4]
+
+def test_splits_packs_by_token_budget(tmp_path):
+    llm = _ScriptedLLM()
+    service = _service(tmp_path, llm)
+    cost = service.pack_cost(_applicants(1)[0])
+    packer = EvaluationPacker(service, 0.5, 0.5, token_budget=cost * 2, flush_interval=0.01)
+
+    _evaluate_all(packer, _applicants(3))
+
+    # 2人分で予算に達し、残りの1人は個別に評価する
+    assert sorted(llm.calls) == ["evaluation", "evaluation_packed"]
+
+def test_retries_only_missing_applicants(tmp_path):
+    llm = _ScriptedLLM(omit={2})
+    packer = EvaluationPacker(_service(tmp_path, llm), 0.5, 0.5, flush_interval=0.01)
+
+    results = _evaluate_all(packer, _applicants(3))
+
+    assert llm.calls == ["evaluation_packed", "evaluation"]
+    assert [result.total_score for result in results] == [1, 2, 3]
+
+def test_truncated_response_uses_only_closed_entries(tmp_path):
+    llm = _ScriptedLLM(truncate=True)
+    service = _service(tmp_path, llm)
+    packer = EvaluationPacker(service, 0.5, 0.5, flush_interval=0.01)
+
+    results = _evaluate_all(packer, _applicants(3))
+
+    assert llm.calls == ["evaluation_packed", "evaluation"]
+    assert [result.total_score for result in results] == [1, 2, 3]
+    # 途中で切れた応答の評価はキャッシュしない（個別に再評価した1人分だけ）
+    assert service.cache.stats()["sets"] == 1
+
+def test_failed_request_is_not_retried_individually(tmp_path):
+    llm = _ScriptedLLM(fail=True)
+    packer = EvaluationPacker(_service(tmp_path, llm), 0.5, 0.5, flush_interval=0.01)
+
+    results = _evaluate_all(packer, _applicants(3))
+
+    assert llm.calls == ["evaluation_packed"]
+    assert all(result.degraded for result in results)
+
+def test_cached_applicants_are_not_packed(tmp_path):
+    llm = _ScriptedLLM()
+    service = _service(tmp_path, llm)
+    applicants = _applicants(3)
+
+    _evaluate_all(EvaluationPacker(service, 0.5, 0.5, flush_interval=0.01), applicants[:2])
+    results = _evaluate_all(EvaluationPacker(service, 0.5, 0.5, flush_interval=0.01), applicants)
+
+    # 2回目は未評価の1人だけを個別に評価する
+    assert llm.calls == ["evaluation_packed", "evaluation"]
+    assert [result.total_score for result in results] == [1, 2, 3]
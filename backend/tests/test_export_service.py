@@ -0,0 +1,79 @@
+import codecs
+import csv
+import io
+from openpyxl import load_workbook
+from app.services import export_service
+from app.services.export_service import EXPORT_COLUMNS, ExportService
+from tests.fake_supabase import FakeSupabase
+
+def _applicants(count):
+    return [
+        {
+            "id": f"id-{index:03d}",
+            "name": f"応募者{index}",
+            "email": f"user{index}@example.com",
+            "status": "passed" if index % 2 else "pending",
+            "created_at": "2024-01-01T00:00:00",
+            "applicant_data": {"raw": "x" * 100},
+            "evaluation": {"total_score": index, "skill_score": index, "mindset_score": index, "summary": "要約"},
+        }
+        for index in range(count)
+    ]
+
+def _service(monkeypatch, rows):
+    client = FakeSupabase({"applicants": rows})
+    monkeypatch.setattr(export_service, "get_supabase", lambda: client)
+    return ExportService(), client
+
+def test_iter_rows_pages_by_id(monkeypatch):
+    rows = _applicants(7)
+    rows.append({"id": "id-999", "name": "未評価", "evaluation": None})
+    service, client = _service(monkeypatch, rows)
+
+    result = list(service.iter_rows(page_size=3))
+
+    assert [row["id"] for row in result] == [f"id-{index:03d}" for index in range(7)]
+    assert result[0]["total_score"] == 0 and result[0]["summary"] == "要約"
+    # 出力に使わない列は取得しない
+    assert "applicant_data" not in result[0]
+    # 2ページ目以降は直前のIDより後ろから取得する（OFFSETを使わない）
+    filters = [call[2] for call in client.calls]
+    assert len(filters) == 3
+    assert ("gt", "id", "id-002") in filters[1]
+    assert ("gt", "id", "id-005") in filters[2]
+
+def test_iter_rows_filters_in_database(monkeypatch):
+    service, client = _service(monkeypatch, _applicants(10))
+
+    result = list(service.iter_rows(status="passed", min_score=5))
+
+    assert [row["id"] for row in result] == ["id-005", "id-007", "id-009"]
+    assert ("eq", "status", "passed") in client.calls[0][2]
+    assert ("gte", "evaluation->total_score", 5) in client.calls[0][2]
+
+def test_iter_csv_streams_chunks_with_bom():
+    service = ExportService()
+    rows = [{"id": f"id-{index}", "name": "山田", "total_score": None} for index in range(5)]
+
+    chunks = list(service.iter_csv(iter(rows), chunk_rows=2))
+
+    # ヘッダー + 2行ごと（2, 2, 1）
+    assert len(chunks) == 4
+    data = b"".join(chunks)
+    assert data.startswith(codecs.BOM_UTF8)
+    records = list(csv.reader(io.StringIO(data.decode("utf-8-sig"))))
+    assert records[0] == [header for header, _ in EXPORT_COLUMNS]
+    assert len(records) == 6
+    # スコアの欠損は0、その他の欠損は空欄
+    assert records[1][:5] == ["id-0", "山田", "", "", "0"]
+
+def test_iter_xlsx_writes_all_rows(monkeypatch):
+    service, _ = _service(monkeypatch, _applicants(4))
+
+    data = b"".join(service.iter_xlsx(service.iter_rows(), chunk_size=1024))
+
+    sheet = load_workbook(io.BytesIO(data), read_only=True)["評価結果"]
+    values = list(sheet.iter_rows(values_only=True))
+    assert list(values[0]) == [header for header, _ in EXPORT_COLUMNS]
+    assert len(values) == 5
+    assert values[4][0] == "id-003" and values[4][4] == 3
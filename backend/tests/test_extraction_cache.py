@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+from app.services import extraction_cache
+from app.services.extraction_cache import ExtractionCache, content_hash, extract_with_cache, stream_with_cache
+from app.utils.cache import TieredCache
+from app.utils.config import settings
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = ExtractionCache(TieredCache(str(tmp_path / "extraction.sqlite3")))
+    monkeypatch.setattr(extraction_cache, "_instance", cache)
+    return cache
+
+class _Extractor:
+    """呼び出し回数を数える抽出処理"""
+
+    def __init__(self, result=None, pages=3):
+        self.calls = 0
+        self.result = result
+        self.pages = [{"page": n, "text": f"page {n}"} for n in range(1, pages + 1)]
+
+    async def extract(self):
+        self.calls += 1
+        return self.result or {"text": "resume", "success": True, "pages": []}
+
+    async def iterate(self):
+        self.calls += 1
+        for page in self.pages:
+            yield page
+
+def _summarize(pages):
+    return {"text": "\n".join(page["text"] for page in pages), "success": True, "pages": pages}
+
+def _extract(source, extractor, version="1"):
+    return asyncio.run(extract_with_cache(source, "pdf", version, extractor.extract))
+
+def _stream(source, extractor, limit=None):
+    async def run():
+        pages = []
+        stream = stream_with_cache(source, "pdf", "1", extractor.iterate, _summarize)
+        async for page in stream:
+            pages.append(page)
+            if len(pages) == limit:
+                break
+        await stream.aclose()
+        return pages
+
+    return asyncio.run(run())
+
+def test_content_hash_of_bytes_and_path(tmp_path):
+    path = tmp_path / "resume.pdf"
+    path.write_bytes(b"%PDF resume")
+
+    assert content_hash(str(path)) == content_hash(b"%PDF resume")
+    assert content_hash(b"%PDF other") != content_hash(b"%PDF resume")
+
+def test_reuses_result_for_same_content(cache, tmp_path):
+    extractor = _Extractor()
+    path = tmp_path / "resume.pdf"
+    path.write_bytes(b"%PDF resume")
+
+    first = _extract(b"%PDF resume", extractor)
+    second = _extract(str(path), extractor)
+
+    assert extractor.calls == 1
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["text"] == "resume"
+
+def test_version_is_part_of_key(cache):
+    extractor = _Extractor()
+
+    _extract(b"%PDF resume", extractor, version="1")
+    _extract(b"%PDF resume", extractor, version="2")
+
+    assert extractor.calls == 2
+
+@pytest.mark.parametrize("result", [
+    {"text": "", "success": False, "error": "broken"},
+    {"text": "page 1", "success": True, "pages": [{"page": 1}, {"page": 2, "error": "OCR unavailable"}]},
+])
+def test_does_not_cache_failures(cache, result):
+    extractor = _Extractor(result)
+
+    _extract(b"%PDF resume", extractor)
+    second = _extract(b"%PDF resume", extractor)
+
+    assert extractor.calls == 2
+    assert not second["cached"]
+
+def test_disabled_cache(cache, monkeypatch):
+    monkeypatch.setattr(settings, "extraction_cache_enabled", False)
+    extractor = _Extractor()
+
+    _extract(b"%PDF resume", extractor)
+    _extract(b"%PDF resume", extractor)
+
+    assert extractor.calls == 2
+    assert cache.stats()["sets"] == 0
+
+def test_stream_stores_only_complete_reads(cache):
+    extractor = _Extractor()
+
+    assert len(_stream(b"%PDF resume", extractor, limit=1)) == 1
+    assert cache.stats()["sets"] == 0
+
+    pages = _stream(b"%PDF resume", extractor)
+    cached_pages = _stream(b"%PDF resume", extractor)
+
+    assert extractor.calls == 2
+    assert cached_pages == pages
+    # 1件の抽出結果として保存され、extract_with_cacheからも参照できる
+    result = _extract(b"%PDF resume", _Extractor())
+    assert result["cached"] and result["text"] == "page 1\npage 2\npage 3"
+
+def test_stream_skips_oversized_results(cache, monkeypatch):
+    monkeypatch.setattr(settings, "extraction_cache_max_entry_bytes", 10)
+    extractor = _Extractor()
+
+    assert len(_stream(b"%PDF resume", extractor)) == 3
+    assert len(_stream(b"%PDF resume", extractor)) == 3
+
+    assert extractor.calls == 2
+    assert cache.stats()["sets"] == 0
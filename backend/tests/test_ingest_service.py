@@ -0,0 +1,153 @@
+import asyncio
+import io
+import json
+import pytest
+from docx import Document
+from app.models.applicant import SelectionStage
+from app.services.ai_evaluation_service import AIEvaluationService
+from app.services.evaluation_cache import EvaluationCache
+from app.services.ingest_service import IngestService
+from app.utils.cache import TieredCache
+
+RESUME_TEXT = "氏名: 山田太郎\nメール: taro@example.com\n職歴: 株式会社サンプルでPythonによる業務システム開発"
+
+EVALUATION = {"skill_score": 6, "mindset_score": 8, "total_score": 7.4, "summary": "良い"}
+
+def _ingest_response(evaluation=EVALUATION, stage="first_interview"):
+    return json.dumps({
+        "applicant_data": {
+            "name": "山田太郎",
+            "email": "taro@example.com",
+            "phone": None,
+            "technical_skills": ["Python"],
+        },
+        "recommended_stage": stage,
+        "recommendation_reason": "開発経験が豊富",
+        "missing_info": ["学歴"],
+        "evaluation": evaluation,
+    })
+
+class _ScriptedLLM:
+    """用途（purpose）ごとに決めた応答を返すLLMクライアント"""
+    available = True
+    model_name = "gemini-test"
+
+    def __init__(self, ingest=None, error=None, latency=0):
+        self.calls = []
+        self.ingest = ingest if ingest is not None else _ingest_response()
+        self.error = error
+        self.latency = latency
+
+    async def generate(self, prompt, purpose=None, **kwargs):
+        self.calls.append(purpose)
+        await asyncio.sleep(self.latency)
+        if self.error is not None:
+            raise self.error
+        if purpose == "evaluation":
+            return json.dumps(EVALUATION)
+        return self.ingest
+
+def _service(tmp_path, llm):
+    cache = EvaluationCache(TieredCache(str(tmp_path / "cache.sqlite3"), persistent=False))
+    return IngestService(llm=llm, ai_service=AIEvaluationService(llm=llm, cache=cache))
+
+def _docx(*paragraphs):
+    doc = Document()
+    for paragraph in paragraphs:
+        doc.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+def test_ingests_with_a_single_call(tmp_path):
+    llm = _ScriptedLLM()
+    service = _service(tmp_path, llm)
+
+    result = asyncio.run(service.ingest_text(RESUME_TEXT, 0.3, 0.7, ocr_confidence=0.9))
+
+    assert llm.calls == ["ingest"]
+    assert result.llm_calls == 1
+    assert result.applicant_data.name == "山田太郎"
+    assert result.applicant_data.extracted_text == RESUME_TEXT
+    assert result.applicant_data.ocr_confidence == 0.9
+    assert result.recommended_stage == SelectionStage.FIRST_INTERVIEW
+    assert result.evaluation.recommended_stage == SelectionStage.FIRST_INTERVIEW
+    assert result.missing_info == ["学歴"]
+    assert not result.evaluation.degraded
+
+    # 取り込みで得た評価は、同じデータの再評価でキャッシュに当たる
+    reevaluated = asyncio.run(service.ai_service.evaluate_applicant(result.applicant_data, 0.3, 0.7))
+    assert reevaluated.total_score == 7.4
+    assert llm.calls == ["ingest"]
+
+def test_reevaluates_when_evaluation_is_incomplete(tmp_path):
+    llm = _ScriptedLLM(ingest=_ingest_response(evaluation={"summary": "スコアなし"}, stage="unknown"))
+
+    result = asyncio.run(_service(tmp_path, llm).ingest_text(RESUME_TEXT, 0.3, 0.7))
+
+    assert llm.calls == ["ingest", "evaluation"]
+    assert result.llm_calls == 2
+    assert result.evaluation.total_score == 7.4
+    # 不明なステージは書類選考として扱う
+    assert result.recommended_stage == SelectionStage.DOCUMENT_SCREENING
+
+@pytest.mark.parametrize("llm", [
+    _ScriptedLLM(ingest='{"applicant_data": {"name": "山田'),
+    _ScriptedLLM(ingest="[]"),
+    _ScriptedLLM(error=RuntimeError("quota exceeded")),
+])
+def test_returns_degraded_result_that_cannot_be_saved(tmp_path, llm, saved_records):
+    service = _service(tmp_path, llm)
+
+    result = asyncio.run(service.ingest_text(RESUME_TEXT, 0.3, 0.7))
+
+    assert result.evaluation.degraded
+    assert result.llm_calls == 0
+    assert result.applicant_data.extracted_text == RESUME_TEXT
+    with pytest.raises(ValueError):
+        asyncio.run(service.save(result))
+    assert saved_records == []
+
+def test_concurrent_identical_ingests_share_one_call(tmp_path):
+    llm = _ScriptedLLM(latency=0.05)
+    service = _service(tmp_path, llm)
+
+    async def run():
+        return await asyncio.gather(*(service.ingest_text(RESUME_TEXT, 0.3, 0.7) for _ in range(3)))
+
+    results = asyncio.run(run())
+
+    assert llm.calls == ["ingest"]
+    assert all(result == results[0] for result in results)
+
+def test_save_and_response(tmp_path, saved_records):
+    service = _service(tmp_path, _ScriptedLLM())
+    result = asyncio.run(service.ingest_text(RESUME_TEXT, 0.3, 0.7))
+
+    applicant_id = asyncio.run(service.save(result))
+
+    assert len(saved_records) == 1
+    record = saved_records[0]
+    assert record["id"] == applicant_id
+    assert record["name"] == "山田太郎"
+    assert record["evaluation"]["total_score"] == 7.4
+    assert record["applicant_data"]["extracted_text"] == RESUME_TEXT
+
+    response = service.to_response(result, applicant_id)
+    assert response["applicant_id"] == applicant_id
+    assert "extracted_text" not in response["applicant_data"]
+
+def test_ingest_file_extracts_text(tmp_path):
+    llm = _ScriptedLLM()
+    service = _service(tmp_path, llm)
+
+    result = asyncio.run(service.ingest_file(
+        _docx("氏名: 山田太郎", "Pythonでの業務システム開発"), "resume.docx", "application/octet-stream"
+    ))
+
+    assert "業務システム開発" in result.applicant_data.extracted_text
+    assert llm.calls == ["ingest"]
+
+    with pytest.raises(ValueError):
+        asyncio.run(service.ingest_file(_docx(), "empty.docx", "application/octet-stream"))
+    assert llm.calls == ["ingest"]
@@ -0,0 +1,47 @@
+import pytest
+from app.utils.json_response import JSONResponseError, JSONStreamParser, parse_complete_items, parse_json
+
+def test_parse_json_plain_and_fenced():
+    assert parse_json('{"a": 1}') == {"a": 1}
+    assert parse_json('結果です:\n```json\n{"a": [1, 2]}\n```\n以上') == {"a": [1, 2]}
+
+def test_parse_json_trailing_comma():
+    assert parse_json('{"a": [1, 2,], "b": 3,}') == {"a": [1, 2], "b": 3}
+
+def test_parse_json_repairs_truncation():
+    assert parse_json('{"summary": "途中で', allow_repair=True) == {"summary": "途中で"}
+    assert parse_json('{"scores": [1, 2, 3') == {"scores": [1, 2, 3]}
+
+def test_parse_json_strict_rejects_truncation():
+    with pytest.raises(JSONResponseError):
+        parse_json('{"skill_score": 7.', allow_repair=False)
+    assert parse_json('{"skill_score": 7.5}', allow_repair=False) == {"skill_score": 7.5}
+
+def test_parse_json_empty():
+    with pytest.raises(JSONResponseError):
+        parse_json("")
+
+def test_parse_complete_items_drops_unclosed_entries():
+    text = '{"results": [{"id": 1, "evaluation": {"skill_score": 5}}, {"id": 2, "evaluation": {"skill'
+    assert parse_complete_items(text, "results") == [{"id": 1, "evaluation": {"skill_score": 5}}]
+    # 末尾の数値は続きがあるかもしれないので使わない
+    assert parse_complete_items("[1, 2, 3") == [1, 2]
+
+def test_stream_parser_partial_values():
+    text = '{"name": "山田", "skills": ["Python", "Go"], "note": "途中'
+    parser = JSONStreamParser()
+    for ch in text[:text.index('"Go"')]:
+        parser.feed(ch)
+    assert parser.value() == {"name": "山田", "skills": ["Python"]}
+    assert not parser.complete
+
+    parser.feed(text[text.index('"Go"'):])
+    # 書きかけの要素は捨てる
+    assert parser.value() == {"name": "山田", "skills": ["Python", "Go"]}
+
+def test_stream_parser_complete():
+    parser = JSONStreamParser()
+    for chunk in ('前置き {"a": [1, 2,', ' 3,], "b": "}"}', " 後の文章"):
+        parser.feed(chunk)
+    assert parser.complete
+    assert parser.value() == {"a": [1, 2, 3], "b": "}"}
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import pytest
+from google.api_core import exceptions as gexc
+from app.utils.llm_backends import FakeBackend, LLMBackend, LLMResponse, RecordReplayBackend, create_backend
+from app.utils.sqlite_store import get_data_dir
+
+EVALUATION_PROMPT = """
+【応募者データ】
+氏名: 山田太郎
+技術スキル: Python
+【評価基準】
+※ total_scoreは (skill_score × 0.3) + (mindset_score × 0.7)
+"""
+
+JSON_CONFIG = {"response_mime_type": "application/json"}
+
+def _generate(backend, prompt, config=None):
+    return asyncio.run(backend.generate(prompt, "gemini-test", config))
+
+def test_backend_requires_generate():
+    class Incomplete(LLMBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        LLMBackend()
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_fake_backend_is_deterministic():
+    backend = FakeBackend(latency=0)
+    first = _generate(backend, EVALUATION_PROMPT, JSON_CONFIG)
+    second = _generate(FakeBackend(latency=0), EVALUATION_PROMPT, JSON_CONFIG)
+
+    assert first.text == second.text
+    data = json.loads(first.text)
+    assert data["total_score"] == round(data["skill_score"] * 0.3 + data["mindset_score"] * 0.7, 2)
+    assert first.total_tokens == first.input_tokens + first.output_tokens
+
+def test_fake_backend_wraps_text_outside_json_mode():
+    response = _generate(FakeBackend(latency=0), EVALUATION_PROMPT)
+
+    assert response.text.startswith("```json\n") and response.text.endswith("\n```")
+
+def test_fake_backend_packed_evaluation():
+    prompt = (
+        "--- 応募者ID: 0 ---\n氏名: 山田太郎\n"
+        "--- 応募者ID: 1 ---\n氏名: 鈴木花子\n"
+        "【評価基準】\n"
+    )
+    data = json.loads(_generate(FakeBackend(latency=0), prompt, JSON_CONFIG).text)
+
+    assert [result["id"] for result in data["results"]] == [0, 1]
+    assert data["results"][0]["evaluation"] != data["results"][1]["evaluation"]
+
+def test_fake_backend_transient_errors():
+    backend = FakeBackend(latency=0, error_rate=1.0, seed=1)
+
+    for _ in range(5):
+        with pytest.raises((gexc.TooManyRequests, gexc.ServiceUnavailable)):
+            _generate(backend, EVALUATION_PROMPT)
+
+class _CountingBackend(LLMBackend):
+    name = "counting"
+    available = True
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate(self, prompt, model_name, generation_config=None):
+        self.calls += 1
+        return LLMResponse(f"応答: {prompt}", 10, 4, 6)
+
+def test_record_then_replay(tmp_path):
+    inner = _CountingBackend()
+    recorded = _generate(RecordReplayBackend("record", tmp_path, inner), "こんにちは", JSON_CONFIG)
+    replayed = _generate(RecordReplayBackend("replay", tmp_path), "こんにちは", JSON_CONFIG)
+
+    assert inner.calls == 1
+    assert (replayed.text, replayed.total_tokens, replayed.input_tokens, replayed.output_tokens) == (
+        recorded.text, 10, 4, 6
+    )
+    (path,) = tmp_path.glob("*/*.json")
+    assert json.loads(path.read_text(encoding="utf-8"))["prompt"] == "こんにちは"
+
+def test_replay_without_recording(tmp_path):
+    backend = RecordReplayBackend("replay", tmp_path)
+    _generate(RecordReplayBackend("record", tmp_path, _CountingBackend()), "記録済み")
+
+    with pytest.raises(LookupError):
+        _generate(backend, "未記録")
+    # 生成設定が違えば別の記録になる
+    with pytest.raises(LookupError):
+        _generate(backend, "記録済み", JSON_CONFIG)
+
+def test_record_replay_validation(tmp_path):
+    with pytest.raises(ValueError):
+        RecordReplayBackend("live", tmp_path)
+    with pytest.raises(ValueError):
+        RecordReplayBackend("record", tmp_path)
+
+def test_create_backend():
+    assert isinstance(create_backend("fake", "us-central1"), FakeBackend)
+    replay = create_backend("replay", "us-central1")
+    assert isinstance(replay, RecordReplayBackend) and replay.directory.is_relative_to(get_data_dir())
+    with pytest.raises(ValueError):
+        create_backend("unknown", "us-central1")
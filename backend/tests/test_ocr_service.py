@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+import fitz  # PyMuPDF
+import pytest
+from app.services import ocr_service
+from app.services.ocr_service import OCR_UNAVAILABLE_MESSAGE, OCRService
+from app.utils.config import settings
+
+class _FakeVisionClient:
+    """画像の内容をそのままテキストとして返すVision APIクライアント（同時実行数を記録する）"""
+
+    def __init__(self, latency=0.0, fail_pages=(), fail_request=False):
+        self.latency = latency
+        self.fail_pages = set(fail_pages)
+        self.fail_request = fail_request
+        self.batch_sizes = []
+        self.contents = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def batch_annotate_images(self, requests, timeout=None):
+        with self._lock:
+            self.batch_sizes.append(len(requests))
+            self.contents.extend(request.image.content for request in requests)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.latency)
+            if self.fail_request:
+                raise RuntimeError("deadline exceeded")
+            return SimpleNamespace(responses=[self._response(request.image.content) for request in requests])
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def _response(self, content):
+        text = content.decode() if content.startswith(b"image-") else "scanned page"
+        error = f"bad image {text}" if text in self.fail_pages else ""
+        return SimpleNamespace(
+            error=SimpleNamespace(message=error),
+            full_text_annotation=SimpleNamespace(text=text, pages=[SimpleNamespace(confidence=0.8)]),
+            text_annotations=[]
+        )
+
+@pytest.fixture
+def ocr(monkeypatch):
+    monkeypatch.setattr(settings, "ocr_batch_size", 4)
+    monkeypatch.setattr(settings, "ocr_max_concurrent_batches", 2)
+    monkeypatch.setattr(settings, "extraction_cache_enabled", False)
+
+    def create(client):
+        service = OCRService()
+        service.client = client
+        return service
+
+    return create
+
+def _images(count):
+    return [f"image-{n}".encode() for n in range(1, count + 1)]
+
+def _pdf(*texts) -> bytes:
+    """texts: ページごとのテキスト（Noneのページは画像だけのスキャンページ）"""
+    doc = fitz.open()
+    for text in texts:
+        page = doc.new_page()
+        if text is None:
+            pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), False)
+            pixmap.clear_with(200)
+            page.insert_image(fitz.Rect(72, 100, 144, 172), stream=pixmap.tobytes("png"))
+        else:
+            page.insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+def test_batches_respect_request_limit(monkeypatch):
+    monkeypatch.setattr(settings, "ocr_batch_size", 3)
+    assert [len(batch) for batch in ocr_service._batches(list(range(7)))] == [3, 3, 1]
+
+    monkeypatch.setattr(settings, "ocr_batch_size", 100)
+    assert [len(batch) for batch in ocr_service._batches(list(range(20)))] == [16, 4]
+
+def test_annotate_images_batches_and_keeps_order(ocr):
+    client = _FakeVisionClient(latency=0.02)
+
+    pages = asyncio.run(ocr(client).annotate_images(_images(10)))
+
+    assert client.batch_sizes == [4, 4, 2]
+    # 同時に送るリクエストはOCR_MAX_CONCURRENT_BATCHES件まで
+    assert client.max_running == 2
+    assert [page["page"] for page in pages] == list(range(1, 11))
+    assert [page["text"] for page in pages] == [f"image-{n}" for n in range(1, 11)]
+    assert all(page["confidence"] == 0.8 for page in pages)
+
+def test_annotate_images_reports_page_errors(ocr):
+    client = _FakeVisionClient(fail_pages={"image-2"})
+
+    pages = asyncio.run(ocr(client).annotate_images(_images(3)))
+
+    assert pages[1] == {"page": 2, "text": "", "confidence": 0.0, "error": "bad image image-2"}
+    assert "error" not in pages[0] and "error" not in pages[2]
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(ocr(_FakeVisionClient(fail_request=True)).annotate_images(_images(3)))
+
+def test_pdf_ocrs_only_scanned_pages(ocr):
+    client = _FakeVisionClient()
+    pdf = _pdf("Python engineer with ten years of experience", None, "Team lead for a payment platform", None)
+
+    result = asyncio.run(ocr(client).extract_text_from_pdf_bytes(pdf))
+
+    assert result["success"] and result["page_count"] == 4
+    assert result["ocr_page_count"] == 2
+    # OCRするページだけをまとめて1リクエストで送る
+    assert client.batch_sizes == [2]
+    assert [page["source"] for page in result["pages"]] == ["text_layer", "ocr", "text_layer", "ocr"]
+    assert "Python engineer" in result["text"] and "scanned page" in result["text"]
+
+def test_pdf_pages_are_rendered_with_configured_format(ocr, monkeypatch):
+    client = _FakeVisionClient()
+
+    asyncio.run(ocr(client).extract_text_from_pdf_bytes(_pdf(None)))
+    monkeypatch.setattr(settings, "ocr_image_format", "png")
+    asyncio.run(ocr(client).extract_text_from_pdf_bytes(_pdf(None)))
+
+    jpeg, png = client.contents
+    assert jpeg.startswith(b"\xff\xd8") and png.startswith(b"\x89PNG")
+    # 既定はグレースケールで描画する
+    assert fitz.Pixmap(png).n == 1
+
+def test_pdf_without_text_layer_pages_skips_vision(ocr):
+    client = _FakeVisionClient()
+
+    result = asyncio.run(ocr(client).extract_text_from_pdf_bytes(_pdf("Electronic resume without scanned pages")))
+
+    assert result["success"] and result["ocr_page_count"] == 0
+    assert client.batch_sizes == []
+
+def test_pdf_stream_stops_requesting_when_closed(ocr, monkeypatch):
+    monkeypatch.setattr(settings, "ocr_batch_size", 1)
+    monkeypatch.setattr(settings, "ocr_max_concurrent_batches", 1)
+    client = _FakeVisionClient()
+    pdf = _pdf(*([None] * 6))
+
+    async def first_page():
+        pages = ocr(client).iter_pdf_pages(pdf)
+        page = await pages.__anext__()
+        await pages.aclose()
+        return page
+
+    page = asyncio.run(first_page())
+
+    assert page["page"] == 1 and page["source"] == "ocr"
+    # 先読みは1リクエスト分まで
+    assert len(client.batch_sizes) <= 2
+
+def test_pdf_without_ocr_client(ocr):
+    result = asyncio.run(ocr(None).extract_text_from_pdf_bytes(_pdf(None)))
+
+    assert not result["success"]
+    assert result["error"] == OCR_UNAVAILABLE_MESSAGE
+
+    partial = asyncio.run(ocr(None).extract_text_from_pdf_bytes(_pdf("Readable first page of the resume", None)))
+    assert partial["success"]
+    assert partial["pages"][1]["error"] == OCR_UNAVAILABLE_MESSAGE
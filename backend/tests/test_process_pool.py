@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+import pytest
+from app.utils.process_pool import ParseTimeoutError, ProcessPool, WorkerCrashedError
+
+# ワーカーで実行する関数（spawnで起動したプロセスから読み込めるよう、モジュールの最上位で定義する）
+
+def _pid_after(seconds: float) -> int:
+    time.sleep(seconds)
+    return os.getpid()
+
+def _fail(message: str) -> None:
+    raise ValueError(message)
+
+def _crash() -> None:
+    os._exit(3)
+
+@pytest.fixture
+def pool():
+    pool = ProcessPool(max_workers=1, task_timeout=10)
+    yield pool
+    pool.shutdown()
+
+def test_reuses_worker(pool):
+    async def run():
+        return [await pool.run(_pid_after, 0) for _ in range(3)]
+
+    pids = asyncio.run(run())
+
+    assert len(set(pids)) == 1 and pids[0] != os.getpid()
+    stats = pool.stats()
+    assert stats["tasks"] == 3 and stats["workers_started"] == 1 and stats["idle_workers"] == 1
+
+def test_function_error_keeps_worker(pool):
+    async def run():
+        pid = await pool.run(_pid_after, 0)
+        with pytest.raises(ValueError, match="不正なファイル"):
+            await pool.run(_fail, "不正なファイル")
+        return pid, await pool.run(_pid_after, 0)
+
+    before, after = asyncio.run(run())
+
+    assert before == after
+    assert pool.stats()["errors"] == 1
+
+def test_timeout_replaces_worker(pool):
+    async def run():
+        pid = await pool.run(_pid_after, 0)
+        with pytest.raises(ParseTimeoutError):
+            await pool.run(_pid_after, 30, timeout=0.5)
+        return pid, await pool.run(_pid_after, 0)
+
+    before, after = asyncio.run(run())
+
+    assert before != after
+    stats = pool.stats()
+    assert stats["timeouts"] == 1 and stats["workers_started"] == 2 and stats["workers"] == 1
+
+def test_crash_replaces_worker(pool):
+    async def run():
+        with pytest.raises(WorkerCrashedError):
+            await pool.run(_crash)
+        return await pool.run(_pid_after, 0)
+
+    assert asyncio.run(run()) != os.getpid()
+    stats = pool.stats()
+    assert stats["crashes"] == 1 and stats["workers_started"] == 2 and stats["workers"] == 1
+
+def test_cancel_returns_worker_to_pool(pool):
+    async def run():
+        pid = await pool.run(_pid_after, 0)
+        task = asyncio.ensure_future(pool.run(_pid_after, 0.5))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # 実行中のタスクが終わるまで実行枠は空かず、終わったら同じワーカーを使う
+        return pid, await pool.run(_pid_after, 0)
+
+    before, after = asyncio.run(run())
+
+    assert before == after
+    stats = pool.stats()
+    assert stats["workers_started"] == 1 and stats["idle_workers"] == 1
+
+def test_cancel_while_starting_worker_keeps_it(pool):
+    acquire = pool._acquire
+
+    def slow_acquire():
+        time.sleep(0.3)
+        return acquire()
+
+    pool._acquire = slow_acquire
+
+    async def run():
+        task = asyncio.ensure_future(pool.run(_pid_after, 0))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.5)
+
+    asyncio.run(run())
+
+    # 起動したワーカーはプールに戻り、実行枠も解放されている
+    stats = pool.stats()
+    assert stats["workers"] == 1 and stats["idle_workers"] == 1
+    assert pool._slots._value == 1
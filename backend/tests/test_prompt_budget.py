@@ -0,0 +1,48 @@
+from app.utils.prompt_budget import (
+    PAGE_BREAK,
+    TRUNCATION_MARKER,
+    prepare_document_text,
+    remove_repeated_lines,
+    truncate_to_budget,
+)
+from app.utils.tokens import estimate_tokens
+
+def test_keeps_month_columns():
+    # 履歴書の年月の欄（数字だけの行）は本文なので残す
+    text = "学歴\n2015\n4\n入学\n2019\n3\n卒業\n2019\n4\n入社"
+    assert remove_repeated_lines(text) == text
+
+def test_removes_repeated_header_at_page_edges():
+    pages = [
+        "株式会社サンプル 応募書類\n氏名 山田太郎\n4\n4\n- 1 -",
+        "株式会社サンプル 応募書類\n職歴\n4\n4\n- 2 -",
+        "株式会社サンプル 応募書類\n自己PR\n4\n4\n- 3 -",
+    ]
+    lines = remove_repeated_lines(PAGE_BREAK.join(pages)).splitlines()
+    assert lines.count("株式会社サンプル 応募書類") == 1
+    assert not any(line.startswith("- ") for line in lines)
+    # ページの途中の繰り返し行は残す
+    assert lines.count("4") == 6
+
+def test_page_number_patterns():
+    pages = ["氏名\n本文A\nPage 1 of 2", "2024/3\n本文B\n2 / 2"]
+    lines = remove_repeated_lines(PAGE_BREAK.join(pages)).splitlines()
+    assert "Page 1 of 2" not in lines
+    assert "2 / 2" not in lines
+    # 分母が総ページ数と一致しない「N/M」は日付として残す
+    assert "2024/3" in lines
+    assert remove_repeated_lines("面接日\n3/12\n午後") == "面接日\n3/12\n午後"
+
+def test_truncate_to_budget_keeps_head_and_tail():
+    text = "頭" * 500 + "中" * 2000 + "尾" * 500
+    truncated = truncate_to_budget(text, 1000)
+    assert TRUNCATION_MARKER in truncated
+    assert truncated.startswith("頭")
+    assert truncated.endswith("尾")
+    assert estimate_tokens(truncated) <= 1000
+    assert truncate_to_budget("短い", 1000) == "短い"
+
+def test_prepare_document_text():
+    pages = ["ヘッダー\n本文1\n\n\n\n本文2   \n- 1 -", "ヘッダー\n本文3\n- 2 -"]
+    assert prepare_document_text(PAGE_BREAK.join(pages), max_tokens=1000) == "ヘッダー\n本文1\n\n本文2\n\n本文3"
+    assert prepare_document_text("") == ""
@@ -0,0 +1,91 @@
+import asyncio
+from app.utils import rate_limiter
+from app.utils.rate_limiter import AdmissionController, Priority, TokenBucket
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+def test_token_bucket(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    bucket = TokenBucket(per_minute=60)
+
+    assert bucket.wait_time(60) == 0.0
+    bucket.consume(60)
+    assert bucket.wait_time(1) == 1.0
+    clock.now += 0.5
+    assert bucket.wait_time(1) == 0.5
+    clock.now += 10
+    assert bucket.wait_time(10) == 0.0
+    # 容量を超える量は容量まで待てばよい
+    assert bucket.wait_time(1000) == (60 - bucket.tokens) / bucket.rate
+
+def test_token_bucket_adjust(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    bucket = TokenBucket(per_minute=100)
+    bucket.consume(50)
+    bucket.adjust(-30)
+    assert bucket.tokens == 80
+    bucket.adjust(-1000)
+    assert bucket.tokens == 100
+
+def test_admission_priority_order():
+    async def run():
+        controller = AdmissionController(requests_per_minute=6000, tokens_per_minute=10 ** 9, max_in_flight=1)
+        order = []
+        release = asyncio.Event()
+
+        async def call(name: str, priority: Priority):
+            async with controller.acquire(10, priority):
+                order.append(name)
+                if name == "first":
+                    await release.wait()
+
+        first = asyncio.create_task(call("first", Priority.BATCH))
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.create_task(call("batch-1", Priority.BATCH)),
+            asyncio.create_task(call("batch-2", Priority.BATCH)),
+            asyncio.create_task(call("interactive", Priority.INTERACTIVE)),
+        ]
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == {"interactive": 1, "batch": 2}
+
+        release.set()
+        await asyncio.gather(first, *waiting)
+        assert order == ["first", "interactive", "batch-1", "batch-2"]
+        assert controller.in_flight == 0
+
+    asyncio.run(run())
+
+def test_admission_cancelled_waiter_is_skipped():
+    async def run():
+        controller = AdmissionController(requests_per_minute=6000, tokens_per_minute=10 ** 9, max_in_flight=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.acquire(1):
+                await release.wait()
+
+        async def quick():
+            async with controller.acquire(1):
+                return True
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(quick())
+        waiting = asyncio.create_task(quick())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        release.set()
+
+        assert await waiting is True
+        await holder
+        assert controller.in_flight == 0
+
+    asyncio.run(run())
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+from app.utils import resilience
+from app.utils.resilience import CircuitBreaker
+
+def _breaker(monkeypatch, **kwargs):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(resilience, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return CircuitBreaker(**kwargs), clock
+
+def test_opens_after_consecutive_failures(monkeypatch):
+    breaker, _ = _breaker(monkeypatch, failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+    assert breaker.stats()["retry_in_seconds"] == 30
+
+def test_half_open_allows_single_trial(monkeypatch):
+    breaker, clock = _breaker(monkeypatch, failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+def test_half_open_failure_reopens(monkeypatch):
+    breaker, clock = _breaker(monkeypatch, failure_threshold=5, reset_timeout=10)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    # ハーフオープン中の失敗は1回でオープンに戻る
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 9
+    assert not breaker.allow()
+
+def test_release_trial(monkeypatch):
+    breaker, clock = _breaker(monkeypatch, failure_threshold=1, reset_timeout=1)
+    breaker.record_failure()
+    clock.now += 1
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.allow()
@@ -0,0 +1,23 @@
+import zipfile
+from app.services.resume_batch_service import _zip_entry_name
+
+def test_utf8_flagged_name():
+    info = zipfile.ZipInfo("履歴書/山田太郎.pdf")
+    info.flag_bits |= 0x800
+    assert _zip_entry_name(info) == "履歴書/山田太郎.pdf"
+
+def test_cp932_name_without_utf8_flag():
+    # Windowsの「圧縮フォルダー」はShift_JISのまま格納し、zipfileはcp437として読む
+    info = zipfile.ZipInfo("履歴書/山田太郎.pdf".encode("cp932").decode("cp437"))
+    info.flag_bits = 0
+    assert _zip_entry_name(info) == "履歴書/山田太郎.pdf"
+
+def test_ascii_name():
+    info = zipfile.ZipInfo("resumes/taro.docx")
+    assert _zip_entry_name(info) == "resumes/taro.docx"
+
+def test_undecodable_name_is_kept():
+    name = b"\x81\x7f.pdf".decode("cp437")
+    info = zipfile.ZipInfo(name)
+    info.flag_bits = 0
+    assert _zip_entry_name(info) == name
@@ -0,0 +1,96 @@
+import numpy as np
+from app.services.reweight_service import compute_total_scores, reweight_evaluation
+
+def test_compute_total_scores():
+    totals = compute_total_scores(np.array([8.0, 5.0, 10.0]), np.array([6.0, 5.0, 10.0]), 0.2, 0.8)
+    assert totals.tolist() == [6.4, 5.0, 10.0]
+
+def test_compute_total_scores_rounds_and_clips():
+    totals = compute_total_scores(np.array([3.333, 12.0, -1.0]), np.array([6.667, 12.0, 0.0]), 0.5, 0.5)
+    assert totals.tolist() == [5.0, 10.0, 0.0]
+
+def test_reweight_evaluation_keeps_other_fields():
+    evaluation = {"skill_score": 9.0, "mindset_score": 4.0, "total_score": 5.0, "summary": "概要"}
+    result = reweight_evaluation(evaluation, 0.5, 0.5)
+    assert result == {
+        "skill_score": 9.0,
+        "mindset_score": 4.0,
+        "total_score": 6.5,
+        "summary": "概要",
+        "skill_ratio": 0.5,
+        "mindset_ratio": 0.5,
+    }
+    assert isinstance(result["total_score"], float)
+
+def test_reweight_evaluation_missing_scores():
+    assert reweight_evaluation({"skill_score": None}, 0.2, 0.8)["total_score"] == 0.0
+
+import asyncio
+from app.services import reweight_service
+from app.services.reweight_service import ReweightService
+from tests.fake_supabase import FakeSupabase, _Query
+
+def _applicants(count: int):
+    return [
+        {
+            "id": f"id-{i:03d}",
+            "name": f"応募者{i}",
+            "email": f"user{i}@example.com",
+            "status": "screening",
+            "updated_at": "2026-01-01T00:00:00+00:00",
+            "evaluation": {"skill_score": 8.0, "mindset_score": 6.0, "total_score": 6.4, "summary": f"概要{i}"},
+        }
+        for i in range(count)
+    ]
+
+def _service(monkeypatch, rows):
+    client = FakeSupabase({"applicants": rows})
+    monkeypatch.setattr(reweight_service, "get_supabase", lambda: client)
+    return ReweightService(), client
+
+def test_reweight_many_updates_only_evaluation(monkeypatch):
+    service, client = _service(monkeypatch, _applicants(5))
+    result = asyncio.run(service.reweight_many(0.5, 0.5, page_size=2))
+
+    assert result["updated_count"] == 5
+    assert result["mean_total_score"] == 7.0
+    updates = [call for call in client.calls if call[1] == "update"]
+    assert len(updates) == 5
+    assert not any(call[1] == "upsert" for call in client.calls)
+    row = client.tables["applicants"][0]
+    assert row["evaluation"]["total_score"] == 7.0
+    assert row["evaluation"]["summary"] == "概要0"
+    assert row["name"] == "応募者0"
+
+def test_reweight_many_does_not_resurrect_or_overwrite(monkeypatch):
+    rows = _applicants(3)
+    service, client = _service(monkeypatch, rows)
+    original_update = _Query.update
+
+    # 取得後・書き戻し前に1件削除、1件が別の処理で更新された状態を再現する
+    def update(query, payload):
+        if not getattr(client, "_changed", False):
+            client._changed = True
+            client.tables["applicants"] = [row for row in client.tables["applicants"] if row["id"] != "id-000"]
+            client.tables["applicants"][0]["updated_at"] = "2026-02-01T00:00:00+00:00"
+            client.tables["applicants"][0]["evaluation"] = {"skill_score": 1.0, "mindset_score": 1.0, "total_score": 1.0}
+        return original_update(query, payload)
+
+    monkeypatch.setattr(_Query, "update", update)
+    result = asyncio.run(service.reweight_many(0.5, 0.5))
+
+    assert result["updated_count"] == 1
+    assert result["conflict_count"] == 2
+    ids = [row["id"] for row in client.tables["applicants"]]
+    assert ids == ["id-001", "id-002"]
+    assert client.tables["applicants"][0]["evaluation"]["total_score"] == 1.0
+
+def test_reweight_many_chunks_applicant_ids(monkeypatch):
+    monkeypatch.setattr(reweight_service, "REWEIGHT_ID_CHUNK_SIZE", 2)
+    service, client = _service(monkeypatch, _applicants(5))
+    result = asyncio.run(service.reweight_many(0.5, 0.5, applicant_ids=[f"id-{i:03d}" for i in range(5)], dry_run=True))
+
+    assert result["updated_count"] == 5
+    in_filters = [f for _, op, filters in client.calls if op == "select" for f in filters if f[0] == "in"]
+    assert [len(f[2]) for f in in_filters] == [2, 2, 1]
+    assert not any(call[1] == "update" for call in client.calls)
@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from app.utils.single_flight import SingleFlight, flight_key
+
+def test_concurrent_calls_share_one_execution():
+    async def run():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        assert results == ["done"] * 5
+        assert calls == 1
+        assert flight.stats() == {"in_flight": 0, "executed": 1, "shared": 4}
+
+        # 完了したキーは結果をキャッシュしない
+        assert await flight.do("key", work) == "done"
+        assert calls == 2
+
+    asyncio.run(run())
+
+def test_cancelled_caller_does_not_cancel_others():
+    async def run():
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(0.01)
+            return 42
+
+        first = asyncio.create_task(flight.do("key", work))
+        await started.wait()
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == 42
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(run())
+
+def test_exception_is_shared():
+    async def run():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(run())
+
+def test_flight_key_depends_on_inputs():
+    assert flight_key("structure", "a", "text") == flight_key("structure", "a", "text")
+    assert flight_key("structure", "a", "text") != flight_key("structure", "a", "other")
+    assert flight_key("structure", "a", {"x": 1, "y": 2}) == flight_key("structure", "a", {"y": 2, "x": 1})
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import tempfile
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.config import settings
+from app.utils.upload import SpooledUpload, UploadTooLargeError, receive_upload
+
+def _upload_file(content: bytes, spool_max_size: int = 1024) -> UploadFile:
+    """starletteのマルチパート解析と同じく、SpooledTemporaryFileに書き込んだUploadFile"""
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_max_size)
+    spool.write(content)
+    spool.seek(0)
+    return UploadFile(file=spool, size=len(content), filename="resume.pdf")
+
+def test_spooled_upload_rolls_over_and_cleans_up():
+    upload = SpooledUpload("resume.pdf", max_bytes=100, spool_threshold=10)
+    upload.write(b"12345")
+    assert upload.source == b"12345" and not upload.spooled
+
+    upload.write(b"678901")
+    path = upload.source
+    assert upload.spooled and path.endswith(".pdf")
+    with open(path, "rb") as f:
+        assert f.read() == b"12345678901"
+
+    with pytest.raises(UploadTooLargeError):
+        upload.write(b"x" * 100)
+    upload.close()
+    assert not os.path.exists(path)
+
+def test_receive_upload_reads_in_memory_spool():
+    upload = asyncio.run(receive_upload(_upload_file(b"small")))
+
+    assert upload.source == b"small" and upload.size == 5
+
+def test_receive_upload_reuses_rolled_spool():
+    file = _upload_file(b"x" * 5000)
+    upload = asyncio.run(receive_upload(file))
+
+    # 一時ファイルを作らずに、UploadFileの一時ファイルをパスで参照する
+    assert upload.spooled and upload.size == 5000
+    with open(upload.source, "rb") as f:
+        assert f.read() == b"x" * 5000
+    upload.close()
+    assert not file.file.closed and file.file.read(3) == b"xxx"
+
+def test_receive_upload_checks_size_before_reading():
+    file = _upload_file(b"x" * 500, spool_max_size=10000)
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(receive_upload(file, max_bytes=100))
+    # 内容は読まれていない
+    assert file.file.tell() == 0
+
+@pytest.fixture
+def small_limit(monkeypatch):
+    monkeypatch.setattr(settings, "upload_max_bytes", 1000)
+    return TestClient(app)
+
+def test_rejects_large_content_length(small_limit):
+    response = small_limit.post(
+        "/api/applicants/ingest",
+        files={"file": ("resume.pdf", b"x" * 200 * 1024, "application/pdf")}
+    )
+
+    assert response.status_code == 413
+    assert "上限" in response.json()["detail"]
+
+def test_rejects_large_chunked_body(small_limit):
+    def body():
+        for _ in range(200):
+            yield b"x" * 1024
+
+    response = small_limit.post(
+        "/api/applicants/ingest",
+        content=body(),
+        headers={"content-type": "multipart/form-data; boundary=boundary"}
+    )
+
+    assert response.status_code == 413
+
+def test_allows_requests_within_limit(small_limit):
+    response = small_limit.post(
+        "/api/applicants/ingest",
+        files={"file": ("memo.txt", b"x" * 500, "text/plain")}
+    )
+
+    # サイズの上限ではなく、ファイル形式のエラーになる
+    assert response.status_code == 400
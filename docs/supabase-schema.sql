@@ -68,6 +68,8 @@ CREATE INDEX IF NOT EXISTS idx_applicants_created_at ON public.applicants(create
 
 -- 評価スコアでのフィルタリング用インデックス（JSONB）
 CREATE INDEX IF NOT EXISTS idx_applicants_total_score ON public.applicants((evaluation->>'total_score'));
+-- エクスポート等で数値として絞り込む（evaluation->total_score=gte.X）ためのjsonb式インデックス
+CREATE INDEX IF NOT EXISTS idx_applicants_total_score_jsonb ON public.applicants((evaluation->'total_score'));
 
 -- 更新日時の自動更新トリガー
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -34,6 +34,17 @@ export const applicantsApi = {
       headers: { 'Content-Type': 'multipart/form-data' },
     })
   },
+
+  // 履歴書から応募者を登録（構造化・ステージ推奨・AI評価まで一括）
+  ingestResume: (file, skillRatio = 0.2, mindsetRatio = 0.8) => {
+    const formData = new FormData()
+    formData.append('file', file)
+    formData.append('skill_ratio', skillRatio)
+    formData.append('mindset_ratio', mindsetRatio)
+    return api.post('/api/applicants/ingest', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    })
+  },
 }
 
 // 評価API
@@ -88,8 +99,57 @@ export const batchApi = {
     })
   },
 
-  // 結果エクスポート
-  exportResults: (params = {}) => api.get('/api/batch/export-results', { params }),
+  // CSVアップロード（行ごとの結果をNDJSONで逐次受信）
+  uploadCsvStream: async (file, skillRatio = 0.2, mindsetRatio = 0.8, onEvent = () => {}) => {
+    const formData = new FormData()
+    formData.append('file', file)
+    const params = new URLSearchParams({ skill_ratio: skillRatio, mindset_ratio: mindsetRatio })
+    const response = await fetch(`${API_BASE_URL}/api/batch/upload-csv/stream?${params}`, {
+      method: 'POST',
+      body: formData,
+    })
+    if (!response.ok) {
+      throw new Error(`HTTP ${response.status}`)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    try {
+      for (;;) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        const lines = buffer.split('\n')
+        buffer = lines.pop()
+        lines.filter((line) => line.trim()).forEach((line) => onEvent(JSON.parse(line)))
+      }
+      if (buffer.trim()) onEvent(JSON.parse(buffer))
+    } catch (error) {
+      // onEventが例外を投げたら残りのストリームを読まずに接続を閉じる
+      await reader.cancel().catch(() => {})
+      throw error
+    }
+  },
+
+  // バックグラウンドジョブとして登録
+  createJob: (file, skillRatio = 0.2, mindsetRatio = 0.8) => {
+    const formData = new FormData()
+    formData.append('file', file)
+    return api.post('/api/batch/jobs', formData, {
+      params: { skill_ratio: skillRatio, mindset_ratio: mindsetRatio },
+      headers: { 'Content-Type': 'multipart/form-data' },
+    })
+  },
+
+  // ジョブ進捗・結果・キャンセル
+  getJob: (jobId) => api.get(`/api/batch/jobs/${jobId}`),
+  getJobResults: (jobId, params = {}) => api.get(`/api/batch/jobs/${jobId}/results`, { params }),
+  cancelJob: (jobId) => api.post(`/api/batch/jobs/${jobId}/cancel`),
+
+  // 結果エクスポート（CSV/XLSXファイルとして受け取る）
+  exportResults: (params = {}) =>
+    api.get('/api/batch/export-results', { params, responseType: 'blob' }),
 }
 
 // 評価基準API
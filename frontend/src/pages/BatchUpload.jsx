@@ -25,6 +25,9 @@ import DownloadIcon from '@mui/icons-material/Download'
 import DeleteIcon from '@mui/icons-material/Delete'
 import { batchApi, criteriaApi } from '@/lib/api'
 
+// サーバーから {"type": "error"} イベントを受け取った（処理全体の失敗）
+class StreamError extends Error {}
+
 export default function BatchUpload() {
   const [file, setFile] = useState(null)
   const [results, setResults] = useState(null)
@@ -128,13 +131,34 @@ export default function BatchUpload() {
     setLoading(true)
     setError(null)
 
+    setResults({ total_count: 0, success_count: 0, error_count: 0, results: [] })
+
     try {
-      const response = await batchApi.uploadCsv(file, skillRatio, mindsetRatio)
-      setResults(response.data)
+      // 行ごとの結果を受信した時点で表に追加する
+      await batchApi.uploadCsvStream(file, skillRatio, mindsetRatio, (event) => {
+        if (event.type === 'summary') {
+          setResults((prev) => ({ ...prev, ...event }))
+          return
+        }
+        if (event.type === 'error') {
+          // CSV全体の処理失敗は行単位のエラーとして数えず、ストリームを打ち切る
+          throw new StreamError(event.error)
+        }
+        setResults((prev) => ({
+          total_count: prev.total_count + 1,
+          success_count: prev.success_count + (event.status === 'success' ? 1 : 0),
+          error_count: prev.error_count + (event.status === 'success' ? 0 : 1),
+          results: [...prev.results, event],
+        }))
+      })
       alert('バッチ処理が完了しました')
     } catch (error) {
       console.error('アップロードエラー:', error)
-      setError('バッチ処理に失敗しました')
+      setError(
+        error instanceof StreamError
+          ? `バッチ処理に失敗しました: ${error.message}`
+          : 'バッチ処理に失敗しました'
+      )
     } finally {
       setLoading(false)
     }
@@ -142,28 +166,19 @@ export default function BatchUpload() {
 
   const handleExportResults = async () => {
     try {
-      const response = await batchApi.exportResults()
-      const data = response.data.data
-
-      // CSVダウンロード
-      const csv = convertToCSV(data)
-      const blob = new Blob([csv], { type: 'text/csv;charset=utf-8;' })
+      // サーバー側で生成したCSV（UTF-8 BOM付き）をそのままダウンロード
+      const response = await batchApi.exportResults({ format: 'csv' })
       const link = document.createElement('a')
-      link.href = URL.createObjectURL(blob)
+      link.href = URL.createObjectURL(response.data)
       link.download = 'evaluation_results.csv'
       link.click()
+      URL.revokeObjectURL(link.href)
     } catch (error) {
       console.error('エクスポートエラー:', error)
       setError('結果のエクスポートに失敗しました')
     }
   }
 
-  const convertToCSV = (data) => {
-    const headers = Object.keys(data[0]).join(',')
-    const rows = data.map((row) => Object.values(row).join(',')).join('\n')
-    return `${headers}\n${rows}`
-  }
-
   return (
     <Box>
       {/* 応募者CSVバッチ処理 */}